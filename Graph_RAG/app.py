@@ -530,6 +530,25 @@ except Exception as e:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# Results are fetched one page at a time; "Load more results" pulls the next page on demand
+PAGE_SIZE = 10
+
+def load_more_results(msg: Dict):
+    """Fetch the next keyset page for an answered message and merge it into its retrieval data."""
+    data = msg["data"]
+    page = pipeline.safe_next_page(data, limit=PAGE_SIZE)
+    combined = data.setdefault("combined", {})
+    hotels = combined.setdefault("hotels", [])
+    seen = {(h.get("h") or {}).get("hotel_id") or (h.get("h") or {}).get("name") for h in hotels}
+    for item in page.get("combined", {}).get("hotels", []):
+        node = item.get("h") or {}
+        if (node.get("hotel_id") or node.get("name")) not in seen:
+            hotels.append(item)
+    data["baseline"] = data.get("baseline", []) + page.get("baseline", [])
+    if page.get("context_text"):
+        data["context_text"] = data.get("context_text", "") + "\n" + page["context_text"]
+    data["next_cursor"] = page.get("next_cursor")
+
 # --- 2. Visualization Helper ---
 def visualize_subgraph(combined_results: Dict):
     hotels = combined_results.get("hotels", [])
@@ -749,6 +768,11 @@ for i, msg in enumerate(st.session_state.messages):
                     else:
                         st.info("No Cypher query was executed for this request (or Embeddings Only mode used).")
 
+            if msg["data"].get("next_cursor") and backend_ready:
+                if st.button("Load more results", key=f"more_{i}"):
+                    load_more_results(msg)
+                    st.rerun()
+
 # Handle pending quick-query clicks
 pending_prompt = st.session_state.pop("pending_prompt", None)
 
@@ -782,7 +806,7 @@ if user_input:
                 # CRITICAL: Ensure the flags match the UI selection
                 retrieval_result = pipeline.safe_retrieve(
                     query=user_input,
-                    limit=1000,
+                    limit=PAGE_SIZE,
                     user_embeddings=use_embeddings,  # This controls whether embeddings are used
                     user_baseline=use_baseline,      # This controls whether baseline Cypher is used
                     use_llm=True
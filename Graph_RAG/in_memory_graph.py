@@ -0,0 +1,682 @@
+# Graph_RAG/in_memory_graph.py
+"""
+InMemoryGraph: embedded, in-process graph backend for the retrieval layer.
+
+Loads the Knowledge_Graph_DB CSVs (hotels, users, reviews, visa) into indexed
+Python structures and answers the same template operations as Neo4jConnector,
+plus the filtered vector search used by EmbeddingRetriever.
+
+The graph is tiny (25 hotels, ~380 visa rules), so everything fits in RAM and
+every lookup is a dict access instead of a Bolt round trip. Useful for tests,
+demos and small deployments without a Neo4j server.
+"""
+
+import bisect
+import csv
+import itertools
+import os
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from retrieval.query_templates import (
+    FEATURED_REVIEWS, LEADERBOARD_FIELDS, SEGMENT_ANY, leaderboard_key, name_key, segment_params,
+)
+from retrieval.lexical_index import LexicalIndex
+from retrieval.vector_store import REVIEW_BATCH_SIZE, ReviewVectorStore, VectorStore
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+KG_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "..", "Knowledge_Graph_DB"))
+
+# Review score columns aggregated per hotel (template suffix -> review property)
+CATEGORY_FIELDS = {
+    "cleanliness": "score_cleanliness",
+    "comfort": "score_comfort",
+    "facilities": "score_facilities",
+    "staff": "score_staff",
+    "value_for_money": "score_value_for_money",
+}
+
+REVIEW_SCORE_FIELDS = [
+    "score_overall", "score_cleanliness", "score_comfort", "score_facilities",
+    "score_location", "score_staff", "score_value_for_money",
+]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _avg(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return sum(values) / len(values)
+
+
+class InMemoryGraph:
+    """
+    Drop-in replacement for Neo4jConnector backed by the KG CSV files.
+    Exposes run_template(key, params) for every entry in QUERY_TEMPLATES and
+    search_hotels(...) for semantic search over hotel embeddings.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None):
+        self.data_dir = data_dir or KG_DIR
+
+        # Node stores
+        self.hotels: Dict[int, Dict[str, Any]] = {}
+        self.travellers: Dict[int, Dict[str, Any]] = {}
+        self.reviews_by_hotel: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        # name_key of a name or alias -> canonical name (Country / City name_key and Alias nodes)
+        self.countries: Dict[str, str] = {}
+        self.cities: Dict[str, str] = {}
+
+        # Indexes
+        self.hotel_city: Dict[int, str] = {}
+        self.city_country: Dict[str, str] = {}
+        self.hotel_ids_by_name: Dict[str, int] = {}
+        self.hotel_name_keys: Dict[int, str] = {}
+        self.hotel_ids_by_name_key: Dict[str, int] = {}
+        self.hotel_ids_by_city: Dict[str, List[int]] = defaultdict(list)
+        self.hotel_ids_by_country: Dict[str, List[int]] = defaultdict(list)
+        # Segment cube: (traveller_type, age_group, gender) -> hotel id -> counts / averages
+        self.segments: Dict[tuple, Dict[int, Dict[str, Any]]] = {}
+        self.needs_visa: Dict[tuple, str] = {}
+        # Leaderboard key -> hotel ids best-first (same content as the (:Leaderboard) nodes)
+        self.leaderboards: Dict[str, List[int]] = {}
+        # Hotel id -> featured reviews, latest first (same as the FEATURED_REVIEW edges)
+        self.featured_reviews: Dict[int, List[Dict[str, Any]]] = {}
+
+        # Vector stores: property name -> VectorStore over the embedded hotels
+        self.embeddings: Dict[str, VectorStore] = {}
+        # Review vector stores: property name -> ReviewVectorStore over every review with text
+        self.review_embeddings: Dict[str, ReviewVectorStore] = {}
+        # BM25 index over hotel feature text and review text, built on first use
+        self.lexical: Optional[LexicalIndex] = None
+
+        self._load()
+        self.templates = self._build_template_table()
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _read_csv(self, file_name: str) -> List[Dict[str, str]]:
+        path = os.path.join(self.data_dir, file_name)
+        if not os.path.exists(path):
+            # same files Knowledge_Graph_DB/create_kg.py loads into Neo4j
+            raise FileNotFoundError(f"InMemoryGraph: {file_name} not found at {path}. The embedded backend needs "
+                                    f"the KG CSVs (users, hotels, reviews, visa, aliases) in {self.data_dir}")
+        with open(path, "r", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def _add_country(self, name: str):
+        if name:
+            self.countries.setdefault(name_key(name), name)
+
+    def _load(self):
+        for row in self._read_csv("users.csv"):
+            uid = int(row["user_id"])
+            self.travellers[uid] = {
+                "user_id": uid,
+                "age": row["age_group"],
+                "type": row["traveller_type"],
+                "gender": row["user_gender"],
+                "country": row["country"],
+            }
+            self._add_country(row["country"])
+
+        for row in self._read_csv("hotels.csv"):
+            hid = int(row["hotel_id"])
+            self.hotels[hid] = {
+                "hotel_id": hid,
+                "name": row["hotel_name"],
+                "star_rating": int(row["star_rating"]),
+                "cleanliness_base": _to_float(row["cleanliness_base"]),
+                "comfort_base": _to_float(row["comfort_base"]),
+                "facilities_base": _to_float(row["facilities_base"]),
+            }
+            city, country = row["city"], row["country"]
+            self.hotel_city[hid] = city
+            self.city_country[city] = country
+            self.hotel_ids_by_name[row["hotel_name"]] = hid
+            self.hotel_name_keys[hid] = name_key(row["hotel_name"])
+            self.hotel_ids_by_name_key[self.hotel_name_keys[hid]] = hid
+            self.cities.setdefault(name_key(city), city)
+            self.hotel_ids_by_city[city].append(hid)
+            self.hotel_ids_by_country[country].append(hid)
+            self._add_country(country)
+
+        for row in self._read_csv("reviews.csv"):
+            hid = int(row["hotel_id"])
+            uid = int(row["user_id"])
+            if hid not in self.hotels or uid not in self.travellers:
+                continue
+            review = {
+                "review_id": int(row["review_id"]),
+                "user_id": uid,
+                "text": row["review_text"],
+                "date": row["review_date"],
+            }
+            for field in REVIEW_SCORE_FIELDS:
+                review[field] = _to_float(row.get(field))
+            self.reviews_by_hotel[hid].append(review)
+
+        for row in self._read_csv("visa.csv"):
+            self._add_country(row["from"])
+            self._add_country(row["to"])
+            if row["requires_visa"] == "Yes":
+                self.needs_visa[(row["from"], row["to"])] = row["visa_type"]
+
+        # (:Alias)-[:ALIAS_OF]->(:Country | :City): an alias key resolves like the node's own name_key
+        for row in self._read_csv("aliases.csv"):
+            names = self.countries if row["kind"] == "country" else self.cities
+            canonical = names.get(name_key(row["canonical"]))
+            if canonical is not None:
+                names.setdefault(name_key(row["alias"]), canonical)
+
+        self._compute_aggregates()
+        self._build_leaderboards()
+        self._build_segment_cube()
+        for hid in self.hotels:
+            self.build_featured_reviews(hid)
+
+    def _compute_aggregates(self):
+        """Mirrors the compute_average_* aggregation steps of create_kg.py."""
+        for hid, hotel in self.hotels.items():
+            reviews = self.reviews_by_hotel.get(hid, [])
+            avg_overall = _avg([r["score_overall"] for r in reviews])
+            if avg_overall is not None:
+                hotel["average_reviews_score"] = avg_overall
+
+            by_type = defaultdict(list)
+            for r in reviews:
+                by_type[self.travellers[r["user_id"]]["type"]].append(r["score_overall"])
+            for ttype, scores in by_type.items():
+                avg_type = _avg(scores)
+                if avg_type is not None:
+                    hotel["avg_score_" + ttype.lower().replace(" ", "_")] = avg_type
+
+            for cat, field in CATEGORY_FIELDS.items():
+                hotel[f"avg_score_{cat}"] = _avg([r[field] for r in reviews])
+
+            # newest first, so "latest review" lookups are a list head
+            reviews.sort(key=lambda r: (r["date"] or "", r["review_id"]), reverse=True)
+
+    def _build_segment_cube(self):
+        """Mirrors create_kg.build_segment_cube, including the "any" roll-up cells."""
+        grouped = defaultdict(lambda: {"travellers": set(), "reviews": []})
+        for hid, reviews in self.reviews_by_hotel.items():
+            for r in reviews:
+                t = self.travellers[r["user_id"]]
+                dims = [(t[key] or "unknown").lower() for key in ("type", "age", "gender")]
+                for keep in itertools.product((True, False), repeat=3):
+                    seg = tuple(d if k else SEGMENT_ANY for d, k in zip(dims, keep))
+                    grouped[(seg, hid)]["travellers"].add(r["user_id"])
+                    grouped[(seg, hid)]["reviews"].append(r)
+
+        self.segments = defaultdict(dict)
+        for (seg, hid), cell in grouped.items():
+            entry = {"travellers": len(cell["travellers"]), "reviews": len(cell["reviews"])}
+            for field in REVIEW_SCORE_FIELDS:
+                entry["avg_" + field[len("score_"):]] = _avg([r[field] for r in cell["reviews"]])
+            self.segments[seg][hid] = entry
+
+    def build_featured_reviews(self, hid: int):
+        """Mirrors create_kg.build_featured_reviews: latest review, then the ones closest to the hotel average."""
+        reviews = self.reviews_by_hotel.get(hid, [])
+        if not reviews:
+            self.featured_reviews[hid] = []
+            return
+        latest, average = reviews[0], self.hotels[hid].get("average_reviews_score")
+        # reviews are newest first and sorted() is stable, so ties keep the newest review
+        representative = sorted(
+            (r for r in reviews[1:] if r["score_overall"] is not None and average is not None),
+            key=lambda r: abs(r["score_overall"] - average),
+        )
+        self.featured_reviews[hid] = ([latest] + representative)[:FEATURED_REVIEWS]
+
+    def featured_review_texts(self, hid: int) -> List[str]:
+        return [r["text"] for r in self.featured_reviews.get(hid, [])]
+
+    def _leaderboard_scopes(self, hid: int):
+        return [("global", "all"), ("city", self.hotel_city[hid]), ("country", self._country_of(hid))]
+
+    def _build_leaderboards(self):
+        """Mirrors create_kg.build_leaderboards (score DESC, hotel_id ASC per scope and category)."""
+        self.leaderboards = {}
+        for category, field in LEADERBOARD_FIELDS.items():
+            ranked = sorted((hid for hid, h in self.hotels.items() if h.get(field) is not None),
+                            key=lambda hid: (-self.hotels[hid][field], hid))
+            for hid in ranked:
+                for scope_type, scope in self._leaderboard_scopes(hid):
+                    self.leaderboards.setdefault(leaderboard_key(scope_type, scope, category), []).append(hid)
+
+    def update_leaderboards_for_hotel(self, hid: int):
+        """Mirrors create_kg.update_leaderboards_for_hotel: re-position one hotel after its scores changed."""
+        for category, field in LEADERBOARD_FIELDS.items():
+            score = self.hotels[hid].get(field)
+            for scope_type, scope in self._leaderboard_scopes(hid):
+                key = leaderboard_key(scope_type, scope, category)
+                ids = [other for other in self.leaderboards.get(key, []) if other != hid]
+                if score is not None:
+                    ranks = [(-self.hotels[other][field], other) for other in ids]
+                    ids.insert(bisect.bisect_left(ranks, (-score, hid)), hid)
+                self.leaderboards[key] = ids
+        # keep the rating-filter columns of the vector stores in step
+        lexical = [self.lexical] if self.lexical is not None else []
+        for store in itertools.chain(self.embeddings.values(), self.review_embeddings.values(), lexical):
+            store.update_hotel(self.hotels[hid])
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _limit(params: Dict[str, Any]) -> int:
+        limit = params.get("limit")
+        return int(limit) if limit is not None else 10
+
+    def _country_of(self, hid: int) -> str:
+        return self.city_country[self.hotel_city[hid]]
+
+    def _canonical_country(self, name: Optional[str]) -> Optional[str]:
+        if not name:
+            return None
+        return self.countries.get(name_key(name))
+
+    @staticmethod
+    def _resolve(names: Optional[List[str]], lookup: Dict[str, str]) -> List[str]:
+        """Canonical names of the known entries of `names` (names or name keys), in order."""
+        resolved = (lookup.get(name_key(name)) for name in names or [])
+        return [name for name in resolved if name is not None]
+
+    def _in_scope(self, hid: int, cities: Optional[List[str]], countries: Optional[List[str]]) -> bool:
+        """
+        ($cities IS NULL OR size($cities) = 0 OR c.name_key IN $cities) AND (same for countries).
+        Expects canonical names, see _resolve.
+        """
+        if cities and self.hotel_city[hid] not in cities:
+            return False
+        if countries and self._country_of(hid) not in countries:
+            return False
+        return True
+
+    def _value(self, hid: int, field: str) -> Optional[float]:
+        return self.hotels[hid].get(field)
+
+    def _project(self, hid: int) -> Dict[str, Any]:
+        """Equivalent of `h { <HOTEL_PROPERTIES>, city: c.name, country: co.name }`."""
+        hotel = dict(self.hotels[hid])
+        hotel["city"] = self.hotel_city[hid]
+        hotel["country"] = self._country_of(hid)
+        return hotel
+
+    @staticmethod
+    def _sort_key(value: Optional[float], descending: bool):
+        # Missing aggregates always sort last
+        if value is None:
+            return (1, 0)
+        return (0, -value if descending else value)
+
+    def _ranked(self, hotel_ids, field: str, descending: bool = True) -> List[int]:
+        # hotel_id breaks ties, matching the (score, hotel_id) keyset order of the templates
+        return sorted(hotel_ids, key=lambda hid: (self._sort_key(self._value(hid, field), descending), hid))
+
+    # ------------------------------------------------------------------
+    # Template operations
+    # ------------------------------------------------------------------
+    def _build_template_table(self) -> Dict[str, Callable[[Dict[str, Any]], List[Dict[str, Any]]]]:
+        table = {
+            "hotel_search_by_city": self._hotel_search_by_city,
+            "hotel_search_by_country": self._hotel_search_by_country,
+            "hotel_search_by_city_or_country": self._hotel_search_by_city_or_country,
+            "hotel_search_top_k_per_group": self._hotel_search_top_k_per_group,
+            "hotel_by_name_substring": self._hotel_by_name_substring,
+            "hotel_reviews_by_name": self._hotel_reviews_by_name,
+            "hotel_reviews_by_id": self._hotel_reviews_by_id,
+            "hotel_details_by_id": self._hotel_details_by_id,
+            "hotel_vectors": self._hotel_vectors,
+            "hotel_records": self._hotel_records,
+            "recommend_hotels_by_traveller_type": self._recommend_by_traveller_type,
+            "recommend_hotels_by_segment": self._recommend_by_segment,
+            "visa_requirements": self._visa_requirements,
+            "resolve_location_aliases": self._resolve_location_aliases,
+            "visa_requirements_by_origin": self._visa_requirements_by_origin,
+            "visa_free_countries_by_origin": self._visa_free_countries_by_origin,
+            "hotel_search_visa_free": self._hotel_search_visa_free,
+            "hotel_search_min_avg_score": self._hotel_search_min_avg_score,
+            "hotel_leaderboard": self._hotel_leaderboard,
+            "top_hotels": lambda p: self._hotel_leaderboard({**p, "key": "global:all:overall"}),
+            "best_hotel_overall": lambda p: self._hotel_leaderboard({**p, "key": "global:all:overall"}),
+        }
+        return table
+
+    def run_template(self, key: str, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Execute the in-memory equivalent of QUERY_TEMPLATES[key]."""
+        params = parameters or {}
+        handler = self.templates.get(key)
+        if handler is None:
+            print("InMemoryGraph: unknown template", key)
+            return []
+        return handler(params)
+
+    def run_query(self, cypher: str, parameters: Optional[Dict[str, Any]] = None, fetch_one: bool = False) -> List[Dict[str, Any]]:
+        """Raw Cypher is not interpreted; callers should go through run_template / search_hotels."""
+        print("InMemoryGraph: raw Cypher is not supported by the embedded backend")
+        return []
+
+    def run_filter(self, compiled, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Evaluate a CompiledFilter (see retrieval.filter_engine) over the hotel store."""
+        params = parameters or {}
+        cities = self._resolve(params.get("cities"), self.cities) if params.get("cities") else None
+        countries = self._resolve(params.get("countries"), self.countries) if params.get("countries") else None
+        ids = [hid for hid, hotel in self.hotels.items()
+               if self._in_scope(hid, cities, countries) and compiled.matches(hotel, params)]
+        ranked = self._ranked(ids, compiled.order_field, compiled.descending)[:self._limit(params)]
+        return [{"hotel": self._project(hid)} for hid in ranked]
+
+    def _hotel_leaderboard(self, params):
+        ids = self.leaderboards.get(params.get("key"), [])
+        k = self._limit(params)
+        offset = params.get("offset") or 0
+        if k <= 0:
+            return []
+        ordered = ids if params.get("descending", True) is not False else ids[::-1]
+        return [{"hotel": self._project(hid)} for hid in ordered[offset:offset + k]]
+
+    def _hotel_search_min_avg_score(self, params):
+        scores = {hid: self._value(hid, "average_reviews_score") for hid in self.hotels}
+        ids = [hid for hid, score in scores.items() if score is not None and score >= params["min_score"]]
+        ranked = self._ranked(ids, "average_reviews_score")[:self._limit(params)]
+        return [{"hotel": self._project(hid)} for hid in ranked]
+
+    def _hotel_search_by_city(self, params):
+        cities = self._resolve(params.get("cities"), self.cities)
+        ids = [hid for city in cities for hid in self.hotel_ids_by_city.get(city, [])]
+        ids.sort(key=lambda hid: (self.hotel_city[hid],
+                                  self._sort_key(self._value(hid, "average_reviews_score"), True)))
+        return [{"hotel": self._project(hid)} for hid in ids[:self._limit(params)]]
+
+    def _hotel_search_by_country(self, params):
+        countries = self._resolve(params.get("countries"), self.countries)
+        ids = [hid for co in countries for hid in self.hotel_ids_by_country.get(co, [])]
+        ranked = self._ranked(ids, "average_reviews_score")[:self._limit(params)]
+        return [{"hotel": self._project(hid)} for hid in ranked]
+
+    def _hotel_search_by_city_or_country(self, params):
+        cities = set(self._resolve(params.get("cities"), self.cities))
+        countries = set(self._resolve(params.get("countries"), self.countries))
+        after_score, after_id = params.get("after_score"), params.get("after_id")
+        ids = [hid for hid in self.hotels
+               if self.hotel_city[hid] in cities or self._country_of(hid) in countries]
+        if after_id is not None:
+            # keyset page: (score DESC, hotel_id ASC) strictly after the previous page's last row
+            score = lambda hid: self._value(hid, "average_reviews_score") or 0.0
+            ids = [hid for hid in ids if score(hid) < after_score or (score(hid) == after_score and hid > after_id)]
+        ranked = self._ranked(ids, "average_reviews_score")[:self._limit(params)]
+        return [{"hotel": self._project(hid)} for hid in ranked]
+
+    def _hotel_search_top_k_per_group(self, params):
+        rows = []
+        groups = [("city", "cities", self.cities, self.hotel_ids_by_city),
+                  ("country", "countries", self.countries, self.hotel_ids_by_country)]
+        for group_type, param, lookup, index in groups:
+            for grp in self._resolve(params.get(param), lookup):
+                for hid in self._ranked(index.get(grp, []), "average_reviews_score")[:self._limit(params)]:
+                    rows.append({"hotel": dict(self._project(hid), group=grp, group_type=group_type)})
+        return rows
+
+    def _hotel_by_name_substring(self, params):
+        rows = []
+        for entity in params.get("names") or []:
+            q = name_key(entity["key"])
+            ids = [hid for hid, key in self.hotel_name_keys.items() if q in key]
+            for hid in self._ranked(ids, "average_reviews_score")[:self._limit(params)]:
+                rows.append({"hotel": dict(self._project(hid), entity=entity["name"])})
+        return rows
+
+    def _hotel_reviews_by_name(self, params):
+        rows = []
+        for name in params.get("hotels") or []:
+            hid = self.hotel_ids_by_name_key.get(name_key(name))
+            if hid is not None and self.featured_reviews.get(hid):
+                rows.append(self._latest_review_row(hid))
+        return rows
+
+    def _latest_review_row(self, hid: int) -> Dict[str, Any]:
+        latest = self.featured_reviews[hid][0]
+        hotel = self.hotels[hid]
+        return {
+            "hotel_name": self.hotels[hid]["name"],
+            "latest_review_id": latest["review_id"],
+            "latest_review_text": latest["text"],
+            "total_avg_score": hotel.get("average_reviews_score"),
+            "avg_score_cleanliness": hotel.get("avg_score_cleanliness"),
+            "avg_score_comfort": hotel.get("avg_score_comfort"),
+            "avg_score_facilities": hotel.get("avg_score_facilities"),
+            "avg_score_staff": hotel.get("avg_score_staff"),
+            "avg_score_value_for_money": hotel.get("avg_score_value_for_money"),
+            "date": latest["date"],
+            "city": self.hotel_city[hid],
+            "country": self._country_of(hid),
+            "review_texts": self.featured_review_texts(hid),
+        }
+
+    def _hotel_reviews_by_id(self, params):
+        reviews = self.reviews_by_hotel.get(params.get("hotel_id"), [])
+        if params.get("after_id") is not None:
+            # reviews are kept sorted by (date, review_id) desc, so the next page starts right after the cursor
+            after = (params.get("after_date") or "", params["after_id"])
+            reviews = [r for r in reviews if (r["date"] or "", r["review_id"]) < after]
+        return [
+            {"review_id": r["review_id"], "text": r["text"], "score": r["score_overall"], "date": r["date"]}
+            for r in reviews[:self._limit(params)]
+        ]
+
+    def _hotel_details_by_id(self, params):
+        hid = params.get("hotel_id")
+        if hid not in self.hotels:
+            return []
+        return [{"h": dict(self.hotels[hid]), "city": self.hotel_city[hid], "country": self._country_of(hid)}]
+
+    def _hotel_vectors(self, params):
+        store = self.embeddings.get(params.get("property"))
+        if store is None:
+            return []
+        rows = [dict(rec, h=dict(rec["h"]), embedding=store.matrix[i].tolist()) for i, rec in enumerate(store.records)]
+        return sorted(rows, key=lambda row: row["h"]["hotel_id"])
+
+    def _hotel_records(self, params):
+        ids = [hid for hid in params.get("hotel_ids") or [] if hid in self.hotels]
+        return [dict(rec, h=dict(rec["h"])) for rec in self._store_records(ids)]
+
+    def _recommend_by_segment(self, params):
+        cells = self.segments.get((params.get("traveller_type"), params.get("age_group"), params.get("gender")), {})
+        cities = self._resolve(params.get("cities"), self.cities) if params.get("cities") else None
+        countries = self._resolve(params.get("countries"), self.countries) if params.get("countries") else None
+        ids = [hid for hid in cells if self._in_scope(hid, cities, countries)]
+        ids.sort(key=lambda hid: (-cells[hid]["travellers"], self._sort_key(cells[hid]["avg_overall"], True)))
+        rows = []
+        for hid in ids[:self._limit(params)]:
+            cell = cells[hid]
+            hotel = self._project(hid)
+            hotel["segment_score"] = cell["avg_overall"]
+            hotel["segment_reviews"] = cell["reviews"]
+            for cat in ("cleanliness", "comfort", "facilities", "location", "staff", "value_for_money"):
+                hotel[f"segment_{cat}"] = cell[f"avg_{cat}"]
+            rows.append({"hotel": hotel, "freq": cell["travellers"]})
+        return rows
+
+    def _recommend_by_traveller_type(self, params):
+        return self._recommend_by_segment(dict(params, **segment_params(params.get("traveller_type"))))
+
+    def _visa_requirements(self, params):
+        rows = []
+        for origin in self._resolve(params.get("origins"), self.countries):
+            for dest in self._resolve(params.get("destinations"), self.countries):
+                if origin == dest:
+                    continue
+                visa_type = self.needs_visa.get((origin, dest), "Visa Free")
+                rows.append({"origin_country": origin, "destination_country": dest, "visa_type": visa_type})
+        return rows
+
+    def _resolve_location_aliases(self, params):
+        rows = []
+        for alias in params.get("aliases") or []:
+            for kind, names in (("country", self.countries), ("city", self.cities)):
+                canonical = names.get(name_key(alias))
+                if canonical is not None:
+                    rows.append({"alias": alias, "kind": kind, "canonical": canonical})
+        return rows
+
+    def _visa_rows(self, origin: Optional[str], visa_free_only: bool) -> List[Dict[str, Any]]:
+        origin = self._canonical_country(origin)
+        if origin is None:
+            return []
+        rows = []
+        for dest in sorted(set(self.countries.values())):
+            if dest == origin:
+                continue
+            visa_type = self.needs_visa.get((origin, dest))
+            if visa_free_only and visa_type is not None:
+                continue
+            rows.append({
+                "origin_country": origin,
+                "destination_country": dest,
+                "visa_type": visa_type or "Visa Free",
+            })
+        return rows
+
+    def _visa_requirements_by_origin(self, params):
+        origins = sorted(params.get("origins") or [], key=lambda o: self._canonical_country(o) or "")
+        return [row for origin in origins for row in self._visa_rows(origin, visa_free_only=False)]
+
+    def _visa_free_countries_by_origin(self, params):
+        origins = sorted(params.get("origins") or [], key=lambda o: self._canonical_country(o) or "")
+        return [row for origin in origins for row in self._visa_rows(origin, visa_free_only=True)]
+
+    def _hotel_search_visa_free(self, params):
+        # destination country -> origins it is visa-free for
+        allowed = defaultdict(list)
+        for row in self._visa_free_countries_by_origin(params):
+            allowed[row["destination_country"]].append(row["origin_country"])
+        ids = [hid for hid in self.hotels if self._country_of(hid) in allowed]
+        ranked = self._ranked(ids, "average_reviews_score")[:self._limit(params)]
+        results = []
+        for hid in ranked:
+            hotel = self._project(hid)
+            hotel["visa_status"] = "Visa Free"
+            hotel["visa_free_for"] = allowed[self._country_of(hid)]
+            results.append({"hotel": hotel})
+        return results
+
+    # ------------------------------------------------------------------
+    # Vector search
+    # ------------------------------------------------------------------
+    def feature_records(self) -> List[Dict[str, Any]]:
+        """Same shape as EmbeddingIndexer.fetch_hotels(), used to build feature text."""
+        return [
+            {
+                "h": dict(hotel),
+                "city_name": self.hotel_city[hid],
+                "country_name": self._country_of(hid),
+                "review_texts": self.featured_review_texts(hid),
+            }
+            for hid, hotel in self.hotels.items()
+        ]
+
+    def _store_records(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """Hotel rows of a vector store; "h" is the live hotel dict (see update_leaderboards_for_hotel)."""
+        return [
+            {
+                "h": self.hotels[hid],
+                "city_name": self.hotel_city[hid],
+                "country_name": self._country_of(hid),
+                "review_texts": self.featured_review_texts(hid),
+            }
+            for hid in ids
+        ]
+
+    def set_embeddings(self, property_name: str, vectors: Dict[int, List[float]]):
+        """Register hotel vectors (hotel_id -> vector) under a property name."""
+        ids = [hid for hid in self.hotels if vectors.get(hid)]
+        if not ids:
+            return
+        self.embeddings[property_name] = VectorStore(self._store_records(ids), [vectors[hid] for hid in ids])
+
+    def ensure_embeddings(self, property_name: str, encoder) -> None:
+        """Embed every hotel once with the given encoder (same text as EmbeddingIndexer)."""
+        if property_name in self.embeddings:
+            return
+        from retrieval.feature_builder import build_feature_text
+
+        records = self.feature_records()
+        texts = [build_feature_text(rec) for rec in records]
+        vectors = encoder.encode_batch(texts)
+        self.set_embeddings(property_name, {
+            rec["h"]["hotel_id"]: vec for rec, vec in zip(records, vectors)
+        })
+
+    def search_hotels(self, property_name: str, embedding: List[float], cities: List[str] = None,
+                      countries: List[str] = None, top_k: int = 10, rating_filter: dict = None) -> List[Dict[str, Any]]:
+        """
+        Exact cosine search over the filtered hotel set (see VectorStore).
+        Returns rows shaped like EmbeddingRetriever._search_hotels_generic.
+        """
+        if property_name not in self.embeddings:
+            return []
+        # aliases -> canonical names; unknown names are kept and simply match no hotel
+        cities = [self.cities.get(name_key(c), c) for c in cities or []]
+        countries = [self.countries.get(name_key(c), c) for c in countries or []]
+        return self.embeddings[property_name].search(embedding, cities, countries, top_k, rating_filter)
+
+    def review_records(self) -> List[Dict[str, Any]]:
+        """Every review with text, as {review_id, hotel_id, text}."""
+        return [
+            {"review_id": review["review_id"], "hotel_id": hid, "text": review["text"]}
+            for hid, reviews in self.reviews_by_hotel.items()
+            for review in reviews
+            if review.get("text") and review["text"].strip()
+        ]
+
+    def set_review_embeddings(self, property_name: str, vectors: Dict[int, List[float]]):
+        """Register review vectors (review_id -> vector) under a property name."""
+        reviews = [r for r in self.review_records() if vectors.get(r["review_id"])]
+        if not reviews:
+            return
+        self.review_embeddings[property_name] = ReviewVectorStore(
+            self._store_records(list(self.hotels)), reviews, [vectors[r["review_id"]] for r in reviews])
+
+    def ensure_review_embeddings(self, property_name: str, encoder, batch_size: int = REVIEW_BATCH_SIZE) -> None:
+        """Embed every review once, batch_size texts per encode_batch call."""
+        if property_name in self.review_embeddings:
+            return
+        reviews = self.review_records()
+        vectors = {}
+        for start in range(0, len(reviews), batch_size):
+            batch = reviews[start:start + batch_size]
+            for review, vec in zip(batch, encoder.encode_batch([r["text"] for r in batch])):
+                vectors[review["review_id"]] = vec
+        self.set_review_embeddings(property_name, vectors)
+
+    def search_reviews(self, property_name: str, embedding: List[float], cities: List[str] = None,
+                       countries: List[str] = None, top_k: int = 10, rating_filter: dict = None,
+                       pooling: str = "top_n", top_n: int = 3, snippets: int = 3) -> List[Dict[str, Any]]:
+        """Review-level search pooled to hotels (see ReviewVectorStore.search)."""
+        if property_name not in self.review_embeddings:
+            return []
+        cities = [self.cities.get(name_key(c), c) for c in cities or []]
+        countries = [self.countries.get(name_key(c), c) for c in countries or []]
+        return self.review_embeddings[property_name].search(embedding, cities, countries, top_k, rating_filter,
+                                                            pooling=pooling, top_n=top_n, snippets=snippets)
+
+    def ensure_lexical_index(self) -> LexicalIndex:
+        """BM25 index over every hotel's feature text and every review (see LexicalIndex), built once."""
+        if self.lexical is None:
+            self.lexical = LexicalIndex.build(self._store_records(list(self.hotels)), self.review_records())
+        return self.lexical
+
+    def close(self):
+        pass
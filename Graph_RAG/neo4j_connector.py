@@ -1,28 +1,130 @@
 # Graph_RAG/neo4j_connector.py
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, Query
+from neo4j.exceptions import ClientError
 from typing import Any, Dict, List, Optional
 import os
+import threading
+import time
+from retrieval.query_templates import QUERY_TEMPLATES, TEMPLATE_TIMEOUTS
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker around graph access.
+
+    - closed: queries go through; consecutive failures are counted.
+    - open: after `failure_threshold` consecutive failures every query fails fast
+      (degraded, empty result) for `reset_timeout_s` seconds.
+    - half-open: once the cool-down elapses, up to `half_open_max_calls` probe
+      queries are let through. A successful probe closes the breaker, a failed
+      one re-opens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout_s: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout_s:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probes_in_flight = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_max_calls:
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probes_in_flight = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probes_in_flight = 0
+
 
 class Neo4jConnector:
     """
     Small wrapper for basic Neo4j operations used by the retrieval layer.
     Expects environment variables (or a config file) to supply connection info.
+
+    Every query runs with a transaction timeout (per template, see TEMPLATE_TIMEOUTS)
+    and behind a circuit breaker, so a slow or unreachable database degrades to
+    empty results instead of hanging the caller.
     """
-    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None):
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+                 default_timeout_s: Optional[float] = None, breaker: Optional[CircuitBreaker] = None):
         uri = uri or os.getenv("NEO4J_URI", "neo4j://127.0.0.1:7687")
         user = user or os.getenv("NEO4J_USER", "neo4j")
         password = password or os.getenv("NEO4J_PASSWORD", "password")
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.default_timeout_s = default_timeout_s or float(os.getenv("NEO4J_QUERY_TIMEOUT", "10"))
+        # Bound connection setup as well, otherwise an unreachable server blocks before the tx timeout applies
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            connection_timeout=self.default_timeout_s,
+            connection_acquisition_timeout=self.default_timeout_s,
+        )
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=int(os.getenv("NEO4J_BREAKER_FAILURES", "3")),
+            reset_timeout_s=float(os.getenv("NEO4J_BREAKER_RESET_S", "30")),
+        )
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "queries": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "short_circuited": 0,
+        }
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    @staticmethod
+    def _is_timeout(error: Exception) -> bool:
+        return "TransactionTimedOut" in (getattr(error, "code", None) or "")
 
-    def run_query(self, cypher: str, parameters: Optional[Dict[str, Any]] = None, fetch_one: bool = False) -> List[Dict[str, Any]]:
+    def run_query(self, cypher: str, parameters: Optional[Dict[str, Any]] = None, fetch_one: bool = False,
+                  timeout: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Execute a Cypher query and return a list of dicts (records).
         If fetch_one=True, return a single record or empty list.
+        `timeout` (seconds) is sent as the transaction timeout; defaults to NEO4J_QUERY_TIMEOUT.
         """
         params = parameters or {}
+        self._count("queries")
+        if not self.breaker.allow_request():
+            self._count("short_circuited")
+            print("Neo4j circuit breaker open: returning degraded (empty) result")
+            return []
+
+        query = Query(cypher, timeout=timeout or self.default_timeout_s)
         with self.driver.session() as session:
             try:
-                result = session.run(cypher, params)
+                result = session.run(query, params)
                 records = []
                 for r in result:
                     # Convert Neo4j Record to plain dict
@@ -30,12 +132,63 @@ class Neo4jConnector:
                     for key in r.keys():
                         rec[key] = r.get(key)
                     records.append(rec)
+                self._count("successes")
+                self.breaker.record_success()
                 if fetch_one:
                     return records[:1]
                 return records
             except Exception as e:
                 print("Neo4j query error:", e)
+                self._count("failures")
+                if self._is_timeout(e):
+                    self._count("timeouts")
+                    self.breaker.record_failure()
+                elif isinstance(e, ClientError):
+                    # Bad Cypher / parameters: the database itself is healthy
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
                 return []
 
+    def run_template(self, key: str, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Execute a named template from QUERY_TEMPLATES.
+        Same interface as InMemoryGraph.run_template, so retrievers can run on either backend.
+        """
+        return self.run_query(QUERY_TEMPLATES[key], parameters, timeout=TEMPLATE_TIMEOUTS.get(key))
+
+    def run_filter(self, compiled, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Execute a CompiledFilter (see retrieval.filter_engine) with its bound parameters."""
+        return self.run_query(compiled.cypher, parameters, timeout=compiled.timeout)
+
+    def query_plan(self, cypher: str, parameters: Optional[Dict[str, Any]] = None,
+                   profile: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Execution plan of a query: PROFILE (runs it, reports db hits and rows) or
+        EXPLAIN (planner estimates only). Returns the raw plan tree
+        (operatorType, args, identifiers, children), or None on error.
+        Used by tests/test_query_plans.py; bypasses the circuit breaker and stats.
+        """
+        prefix = "PROFILE " if profile else "EXPLAIN "
+        with self.driver.session() as session:
+            try:
+                summary = session.run(Query(prefix + cypher, timeout=self.default_timeout_s), parameters or {}).consume()
+            except Exception as e:
+                print("Neo4j query plan error:", e)
+                return None
+        return summary.profile if profile else summary.plan
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Query counters plus the current circuit breaker state."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update({
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "default_timeout_s": self.default_timeout_s,
+        })
+        return stats
+
     def close(self):
         self.driver.close()
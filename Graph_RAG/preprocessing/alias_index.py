@@ -0,0 +1,92 @@
+"""
+AliasIndex: O(1) resolution of country / city name variants to the canonical
+names used in the KG ("United States of America", "USA", "US", "American" ->
+"United States"; "Bombay" -> "Mumbai").
+
+Backed by Knowledge_Graph_DB/aliases.csv (kind, alias, canonical), the same file
+create_kg.py loads as (:Alias)-[:ALIAS_OF]->(:Country|:City) nodes. Lookups go
+through name_key(), so case and accents never matter and no fuzzy search is
+needed at query time. Names that are not in the table resolve to themselves.
+"""
+
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from retrieval.query_templates import name_key
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+KG_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "..", "..", "Knowledge_Graph_DB"))
+ALIAS_CSV_PATH = os.path.join(KG_DIR, "aliases.csv")
+HOTEL_CSV_PATH = os.path.join(KG_DIR, "hotels.csv")
+
+# Entity fields holding location names -> AliasIndex resolver
+LOCATION_FIELDS = {
+    "cities": "resolve_cities",
+    "countries": "resolve_countries",
+    "origin_country": "resolve_countries",
+    "destination_country": "resolve_countries",
+}
+
+
+class AliasIndex:
+    def __init__(self, alias_path: str = ALIAS_CSV_PATH, hotel_path: str = HOTEL_CSV_PATH):
+        # kind -> name_key(alias or canonical name) -> canonical name
+        self.aliases: Dict[str, Dict[str, str]] = {"country": {}, "city": {}}
+        # canonical city -> canonical country (KG cities)
+        self.city_country: Dict[str, str] = {}
+
+        for row in self._read_csv(hotel_path):
+            self.add("city", row["city"], row["city"])
+            self.add("country", row["country"], row["country"])
+            self.city_country[row["city"]] = row["country"]
+        for row in self._read_csv(alias_path):
+            self.add(row["kind"], row["alias"], row["canonical"])
+            self.add(row["kind"], row["canonical"], row["canonical"])
+
+    @staticmethod
+    def _read_csv(path: str) -> List[Dict[str, str]]:
+        if not os.path.exists(path):
+            print(f"Warning: alias source not found at {path}")
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def add(self, kind: str, alias: str, canonical: str):
+        key = name_key(alias)
+        if key:
+            # first mapping wins: KG names (hotels.csv) are added before the alias rows
+            self.aliases.setdefault(kind, {}).setdefault(key, canonical)
+
+    def country(self, name: Optional[str]) -> Optional[str]:
+        """Canonical country for a name / alias / ISO code / demonym, or None if unknown."""
+        return self.aliases["country"].get(name_key(name))
+
+    def city(self, name: Optional[str]) -> Optional[str]:
+        return self.aliases["city"].get(name_key(name))
+
+    def country_of_city(self, name: Optional[str]) -> Optional[str]:
+        return self.city_country.get(self.city(name))
+
+    def resolve_countries(self, names) -> List[str]:
+        """Canonical names, unknown names kept as given, duplicates dropped (order kept)."""
+        return list(dict.fromkeys(self.country(n) or n for n in names or []))
+
+    def resolve_cities(self, names) -> List[str]:
+        return list(dict.fromkeys(self.city(n) or n for n in names or []))
+
+    def canonicalize(self, entities: Dict) -> Dict:
+        """Copy of an entity dict with every city / country field resolved to canonical names."""
+        out = dict(entities or {})
+        for field, resolve in LOCATION_FIELDS.items():
+            if out.get(field):
+                names = [out[field]] if isinstance(out[field], str) else out[field]
+                out[field] = getattr(self, resolve)(names)
+        return out
+
+
+@lru_cache(maxsize=1)
+def get_alias_index() -> AliasIndex:
+    """Process-wide AliasIndex (the table is small and read-only)."""
+    return AliasIndex()
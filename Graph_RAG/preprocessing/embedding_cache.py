@@ -0,0 +1,224 @@
+"""
+EmbeddingCache: query-embedding cache for EmbeddingEncoder.
+
+Keyed by (model name, normalized query text), so the suggested example prompts
+and repeated questions are encoded once. Two tiers:
+  - memory: LRU of the most recent `capacity` queries
+  - disk (optional, `cache_dir`): one float32 memmap of vectors per model plus
+    an append-only key index (<model>.keys.jsonl, one {"key", "row"} per line),
+    so the cache survives restarts. A row is written before its key, so a crash
+    can only lose the last entry, never map a key to a half-written vector.
+    Several processes (app workers, the indexer) may share one cache_dir: rows
+    are allocated and keys appended under an exclusive lock on <model>.lock,
+    after re-reading the keys other processes added. Without fcntl (Windows)
+    there is no lock, so give each process its own QUERY_CACHE_DIR there.
+
+Configured from the environment by EmbeddingEncoder:
+  QUERY_CACHE_SIZE (default 2048, 0 disables), QUERY_CACHE_DIR (no disk tier if unset).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, see the module docstring
+    fcntl = None
+
+# Initial rows of a new memmap; the file doubles when full
+DISK_INITIAL_ROWS = 1024
+
+
+def normalize_query(text: str) -> str:
+    """Cache key text: NFKC, case-folded, whitespace collapsed (both models are uncased)."""
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha1(f"{model_name}\x00{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+class DiskTier:
+    """Memory-mapped vectors + key index for one model."""
+
+    def __init__(self, cache_dir: str, model_name: str, dim: int):
+        os.makedirs(cache_dir, exist_ok=True)
+        safe_name = re.sub(r"[^\w.-]", "_", model_name)
+        self.vectors_path = os.path.join(cache_dir, f"{safe_name}.f32")
+        self.keys_path = os.path.join(cache_dir, f"{safe_name}.keys.jsonl")
+        self.lock_path = os.path.join(cache_dir, f"{safe_name}.lock")
+        self.dim = dim
+        self.rows: Dict[str, int] = {}
+        self.next_row = 0
+        self._offset = 0  # bytes of the key index read so far
+        self.capacity = 0
+        self.matrix: Optional[np.memmap] = None
+        with self._locked():
+            self._read_index()
+            existing = self._file_rows()
+            # drop keys whose rows never made it to disk
+            self.rows = {key: row for key, row in self.rows.items() if row < existing}
+            self._map(max(existing, DISK_INITIAL_ROWS))
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock shared by every process using this cache_dir."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self):
+        """Keys appended since the last read, by this or another process."""
+        if not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn last line after a crash
+                self._offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.rows[entry["key"]] = entry["row"]
+                self.next_row = max(self.next_row, entry["row"] + 1)
+
+    def _file_rows(self) -> int:
+        return os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+
+    def _map(self, rows: int):
+        if self.matrix is not None:
+            self.matrix.flush()
+            del self.matrix
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(max(os.path.getsize(self.vectors_path), rows * 4 * self.dim))
+        self.capacity = rows
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+
+    def get(self, key: str) -> Optional[List[float]]:
+        row = self.rows.get(key)
+        if row is None:
+            # another process may have added it; its row is written before its key
+            self._read_index()
+            row = self.rows.get(key)
+            if row is None:
+                return None
+        if row >= self.capacity:
+            self._map(self._file_rows())  # grown by another process
+        return self.matrix[row].tolist()
+
+    def put(self, key: str, vector: List[float]):
+        if key in self.rows:
+            return
+        with self._locked():
+            self._read_index()
+            if key in self.rows:
+                return
+            row = self.next_row
+            if row >= self.capacity:
+                self._map(max(self.capacity * 2, self._file_rows()))
+            self.matrix[row] = vector
+            self.matrix.flush()
+            with open(self.keys_path, "ab") as f:
+                # a torn line left by a crash must not swallow this entry
+                torn = f.tell() > self._offset
+                f.write((b"\n" if torn else b"") + json.dumps({"key": key, "row": row}).encode("utf-8") + b"\n")
+                self._offset = f.tell()
+            self.rows[key] = row
+            self.next_row = row + 1
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def close(self):
+        if self.matrix is not None:
+            self.matrix.flush()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, dim: int, capacity: int = 2048, cache_dir: Optional[str] = None):
+        self.model_name = model_name
+        self.capacity = capacity
+        self.memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.disk = DiskTier(cache_dir, model_name, dim) if cache_dir else None
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @classmethod
+    def from_env(cls, model_name: str, dim: int) -> Optional["EmbeddingCache"]:
+        capacity = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+        if capacity <= 0:
+            return None
+        return cls(model_name, dim, capacity=capacity, cache_dir=os.getenv("QUERY_CACHE_DIR") or None)
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = cache_key(self.model_name, text)
+        with self._lock:
+            self.stats["lookups"] += 1
+            vector = self.memory.get(key)
+            if vector is not None:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return vector
+            vector = self.disk.get(key) if self.disk is not None else None
+            if vector is not None:
+                self._remember(key, vector)
+                self.stats["disk_hits"] += 1
+                return vector
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, text: str, vector: List[float]):
+        if not vector:
+            return
+        key = cache_key(self.model_name, text)
+        with self._lock:
+            self._remember(key, vector)
+            if self.disk is not None:
+                self.disk.put(key, vector)
+
+    def _remember(self, key: str, vector: List[float]):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Lookup counters, hit rates and tier sizes."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                "memory_entries": len(self.memory),
+                "disk_entries": len(self.disk) if self.disk is not None else 0,
+            })
+        lookups = stats["lookups"] or 1
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups
+        stats["memory_hit_rate"] = stats["memory_hits"] / lookups
+        return stats
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+@lru_cache(maxsize=None)
+def get_query_cache(model_name: str, dim: int) -> Optional[EmbeddingCache]:
+    """Process-wide cache per model: encoders of the same model share it (and its disk files)."""
+    return EmbeddingCache.from_env(model_name, dim)
@@ -4,12 +4,24 @@ using the same model that is used for KG node embeddings.
 
 Model: sentence-transformers/all-MiniLM-L6-v2
 or BAAI/bge-small-en-v1.5
+
+Query embeddings are cached (see embedding_cache.py); encode_batch, used to
+embed hotel documents, bypasses the cache.
+
+EMBEDDING_BACKEND=onnx-int8 runs the same models as int8-quantized ONNX on
+CPU (see onnx_backend.py); the default is PyTorch ("torch"). Models are
+shared by every encoder in the process through model_registry.py.
 """
 
+import os
+
 from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import Any, Dict, List, Optional
 import numpy as np
 
+from preprocessing.embedding_cache import EmbeddingCache, get_query_cache
+from preprocessing.model_registry import get_model_registry
+
 class EmbeddingEncoder:
     """
     This class loads the embedding model and provides methods to encode text into vectors.
@@ -18,15 +30,44 @@ class EmbeddingEncoder:
     MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
     MODEL_2_NAME = "BAAI/bge-small-en-v1.5"
 
-    def __init__(self, model_name="minilm"):
+    BACKENDS = ("torch", "onnx-int8")
+
+    def __init__(self, model_name="minilm", cache: EmbeddingCache = None, backend: str = None):
         if model_name == "bge":
-            self.model = SentenceTransformer(self.MODEL_2_NAME)
-            self.dim = 768
+            self.model_id = self.MODEL_2_NAME
+            self.dim = 384  # bge-small-en-v1.5 is 384-d, like MiniLM
             self.is_bge = True
         else:
-            self.model = SentenceTransformer(self.MODEL_NAME)
+            self.model_id = self.MODEL_NAME
             self.dim = 384
             self.is_bge = False
+        self.backend = (backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"Unknown embedding backend {self.backend!r}, expected one of {self.BACKENDS}")
+        # quantized vectors differ slightly: never mix them with PyTorch ones (registry or cache)
+        self.model_key = self.model_id if self.backend == "torch" else f"{self.model_id}:{self.backend}"
+        self._cache = cache
+        self._cache_ready = cache is not None
+
+    @property
+    def model(self) -> SentenceTransformer:
+        """The shared model instance (loaded on first use, see model_registry.py)."""
+        return get_model_registry().get(self.model_key, self._load_model)
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        """The shared query cache (None when disabled), created on first use with the model."""
+        if not self._cache_ready:
+            # Cache rows are sized by what the model actually returns
+            self._cache = get_query_cache(self.model_key, self.model.get_sentence_embedding_dimension())
+            self._cache_ready = True
+        return self._cache
+
+    def _load_model(self) -> SentenceTransformer:
+        if self.backend == "onnx-int8":
+            from preprocessing.onnx_backend import load_int8
+            return load_int8(self.model_id)
+        return SentenceTransformer(self.model_id)
 
     def encode(self, text: str) -> List[float]:
         """
@@ -35,8 +76,18 @@ class EmbeddingEncoder:
         if not text or not text.strip():
             return []
 
-        embedding = self.model.encode(text)
-        return embedding.tolist()
+        if self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return cached
+        embedding = self.model.encode(text).tolist()
+        if self.cache is not None:
+            self.cache.put(text, embedding)
+        return embedding
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Query-cache hit rates (empty when the cache is disabled or nothing was encoded yet)."""
+        return self._cache.get_stats() if self._cache is not None else {}
     
     def encode_batch(self, texts: List[str]) -> List[List[float]]:
         """
@@ -0,0 +1,131 @@
+"""
+EncoderService: dynamic micro-batching in front of an EmbeddingEncoder.
+
+Streamlit sessions share one cached RetrievalPipeline, so concurrent requests
+used to call SentenceTransformer.encode on one string each, from their own
+threads. The service queues those calls instead: a single worker thread takes
+the first waiting query, keeps collecting until `max_batch` queries are queued
+or `max_wait_ms` has passed, runs them through one encode_batch call and
+resolves each caller's Future with its own vector.
+
+Same interface as EmbeddingEncoder (encode, encode_batch, cache_stats, dim,
+...), so EmbeddingRetriever uses it transparently. Enabled with
+ENCODER_MAX_BATCH > 1 (ENCODER_MAX_WAIT_MS, default 5, bounds the added latency).
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+
+class EncoderService:
+    def __init__(self, encoder, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.encoder = encoder
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "batched_texts": 0, "largest_batch": 0, "failures": 0}
+        self._worker = threading.Thread(target=self._run, name="encoder-service", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def from_env(cls, encoder):
+        """Wrap `encoder` when ENCODER_MAX_BATCH > 1, else return it unchanged."""
+        max_batch = int(os.getenv("ENCODER_MAX_BATCH", "1"))
+        if max_batch <= 1:
+            return encoder
+        return cls(encoder, max_batch=max_batch, max_wait_ms=float(os.getenv("ENCODER_MAX_WAIT_MS", "5")))
+
+    def __getattr__(self, name):
+        # dim, is_bge, model, cache, ... of the wrapped encoder
+        return getattr(self.encoder, name)
+
+    # ------------------------------------------------------------------
+    # Client side
+    # ------------------------------------------------------------------
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str) -> List[float]:
+        """Same contract as EmbeddingEncoder.encode; blocks until the batch holding `text` is encoded."""
+        if not text or not text.strip():
+            return []
+        cache = getattr(self.encoder, "cache", None)
+        if cache is not None:
+            cached = cache.get(text)
+            if cached is not None:
+                return cached
+        return self.submit(text).result()
+
+    def encode_batch(self, texts: List[str]) -> List[List[float]]:
+        # already a batch: no point queueing it
+        return self.encoder.encode_batch(texts)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, stopping = [item], False
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch):
+        # identical queries in one batch are encoded once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(texts, self.encoder.encode_batch(texts)))
+        except Exception as e:
+            with self._stats_lock:
+                self.stats["failures"] += 1
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        cache = getattr(self.encoder, "cache", None)
+        if cache is not None:
+            for text, vector in vectors.items():
+                cache.put(text, vector)
+        with self._stats_lock:
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["batched_texts"] += len(texts)
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(texts))
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batching counters: requests served, batches run, mean batch size."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["mean_batch"] = stats["batched_texts"] / stats["batches"] if stats["batches"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def close(self, timeout: Optional[float] = None):
+        """Encode what is already queued, then stop the worker."""
+        self._queue.put(None)
+        self._worker.join(timeout)
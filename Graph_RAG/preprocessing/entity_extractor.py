@@ -20,6 +20,7 @@ from .spacy_extractor import (
 )
 from .hotel_matcher import HotelMatcher
 from .hotel_loader import load_hotels
+from .alias_index import get_alias_index
 from .llm_entity_extractor import extract_with_llm
 
 
@@ -36,6 +37,7 @@ class EntityExtractor:
         self.rating_ex = RatingExtractor()
         hotel_names = load_hotels()
         self.hotel_matcher = HotelMatcher(hotel_names)
+        self.aliases = get_alias_index()
 
     @staticmethod
     def normalize_rating_filter(rf: dict) -> dict:
@@ -69,7 +71,8 @@ class EntityExtractor:
                 rf = llm_result.get("rating_filter", {})
                 llm_result["rating_filter"] = EntityExtractor.normalize_rating_filter(rf)
 
-                return llm_result
+                # pycountry names ("United States of America") -> KG names ("United States")
+                return self.aliases.canonicalize(llm_result)
             
             except Exception as e:
                 print(f"LLM extraction failed: {e}. Falling back to rule-based extractor.")
@@ -113,8 +116,8 @@ class EntityExtractor:
         # 7) Rating Extraction
         rating = self.rating_ex.extract_rating(text)
 
-        # 8) Return clean, unified entity dictionary
-        return {
+        # 8) Return clean, unified entity dictionary (locations resolved to KG names)
+        return self.aliases.canonicalize({
             "cities": cities,
             "countries": countries,
             "hotels": hotels,
@@ -124,7 +127,7 @@ class EntityExtractor:
             "age_group": age_group,
             "gender": gender,
             "rating": rating
-        }
+        })
     
 
 _global_extractor = EntityExtractor()
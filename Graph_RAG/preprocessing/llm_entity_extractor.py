@@ -83,7 +83,7 @@ STRICT RULES:
    or implied by cities.
 
 9. The limit is the number of results that should be returned by the search engine.
-   if the user doesn't specify a limit, default to 100.
+   if the user doesn't specify a limit, default to 10. More results are fetched page by page on request.
 
 """
 
@@ -0,0 +1,127 @@
+"""
+ModelRegistry: one copy of each embedding model per process.
+
+RetrievalPipeline, EmbeddingRetriever, EmbeddingIndexer and every cached
+get_pipeline in app.py create their own EmbeddingEncoder; the encoders are
+cheap, the models are not. Encoders therefore fetch their model from the
+process-wide registry on every use: a model is loaded the first time any
+encoder needs it and shared by reference afterwards.
+
+When the loaded models exceed EMBEDDING_MODEL_BUDGET_MB (default 1024, 0 = no
+limit), the least recently used ones are dropped from the registry; an evicted
+model is loaded again on its next use.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict
+
+
+def _torch_bytes(module) -> int:
+    if not hasattr(module, "parameters"):
+        return 0
+    return (sum(p.numel() * p.element_size() for p in module.parameters())
+            + sum(b.numel() * b.element_size() for b in module.buffers()))
+
+
+def _onnx_path(model):
+    """File behind an onnxruntime-backed SentenceTransformer or CrossEncoder, if any."""
+    for inner in ("auto_model", "model"):
+        try:
+            ort_model = model[0].auto_model if inner == "auto_model" else model.model
+        except Exception:
+            continue
+        # optimum ORTModel, or the onnxruntime InferenceSession itself / behind it
+        for holder in (ort_model, getattr(ort_model, "model", None)):
+            path = next((getattr(holder, attr) for attr in ("model_path", "path", "_model_path")
+                         if getattr(holder, attr, None)), None)
+            if path:
+                return str(path)
+    return None
+
+
+def model_bytes(model) -> int:
+    """
+    Approximate resident size: torch parameters + buffers (a CrossEncoder's are on
+    its .model), else the size of the ONNX file its onnxruntime session runs.
+    """
+    size = _torch_bytes(model) or _torch_bytes(getattr(model, "model", None))
+    if size == 0:
+        path = _onnx_path(model)
+        if path and os.path.isfile(path):
+            size = os.path.getsize(path)
+    return size
+
+
+class ModelRegistry:
+    def __init__(self, budget_mb: float = 1024, sizer: Callable[[Any], int] = model_bytes):
+        self.budget_bytes = int(budget_mb * 1024 * 1024) if budget_mb else 0
+        self.sizer = sizer
+        # key -> (model, size in bytes), least recently used first
+        self._models: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """The model registered under `key`, loading it with `loader()` if needed."""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._models[key][0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # one loader per key; other threads asking for the same model wait for it
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return self._models[key][0]
+            model = loader()
+            size = self.sizer(model)
+            with self._lock:
+                self._models[key] = (model, size)
+                self.stats["loads"] += 1
+                self._evict(keep=key)
+            return model
+
+    def _evict(self, keep: str):
+        if not self.budget_bytes:
+            return
+        while self.used_bytes() > self.budget_bytes:
+            victim = next((key for key in self._models if key != keep), None)
+            if victim is None:
+                return  # a single model larger than the budget stays loaded
+            del self._models[victim]
+            self.stats["evictions"] += 1
+            print(f"ModelRegistry: unloaded {victim} (memory budget {self.budget_bytes // 2**20} MB)")
+
+    def used_bytes(self) -> int:
+        return sum(size for _, size in self._models.values())
+
+    def release(self, key: str) -> bool:
+        """Drop a model explicitly; returns whether it was loaded."""
+        with self._lock:
+            return self._models.pop(key, None) is not None
+
+    def loaded(self) -> Dict[str, int]:
+        """Loaded model keys -> size in bytes, least recently used first."""
+        with self._lock:
+            return {key: size for key, (_, size) in self._models.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({"models": list(self._models), "used_mb": self.used_bytes() / 2**20,
+                          "budget_mb": self.budget_bytes / 2**20})
+        return stats
+
+
+@lru_cache(maxsize=1)
+def get_model_registry() -> ModelRegistry:
+    """Process-wide registry shared by every EmbeddingEncoder."""
+    return ModelRegistry(budget_mb=float(os.getenv("EMBEDDING_MODEL_BUDGET_MB", "1024")))
@@ -0,0 +1,74 @@
+"""
+Quantized ONNX backend for EmbeddingEncoder (EMBEDDING_BACKEND=onnx-int8).
+
+Exports a sentence-transformers model to ONNX once, applies int8 dynamic
+quantization (onnxruntime, through sentence-transformers'
+export_dynamic_quantized_onnx_model) and loads the quantized file back with
+backend="onnx". Inference is then an onnxruntime InferenceSession, but the
+model's own tokenizer, pooling and normalization modules are kept, so
+encode() / encode_batch() return the same kind of vector as the PyTorch model.
+
+Needs `pip install "sentence-transformers[onnx]"` (optimum + onnxruntime).
+Exports are kept under ONNX_MODEL_DIR (default ~/.cache/graph_rag/onnx).
+ONNX_QUANTIZATION picks the kernel set: avx2 (default), avx512, avx512_vnni or arm64.
+
+tests/benchmark_onnx_backend.py checks parity (cosine >= PARITY_MIN_COSINE against
+PyTorch) and measures the latency gain. The backend stays opt-in until its
+results are recorded in tests/results/onnx_benchmark.json; until then
+load_int8 prints a warning.
+"""
+
+import os
+import re
+from typing import Dict, List
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "graph_rag", "onnx"))
+QUANTIZATION_CONFIG = os.getenv("ONNX_QUANTIZATION", "avx2")
+PARITY_MIN_COSINE = 0.99
+BENCHMARK_RESULTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "tests", "results", "onnx_benchmark.json")
+
+
+def export_dir(model_id: str) -> str:
+    return os.path.join(ONNX_MODEL_DIR, re.sub(r"[^\w.-]", "_", model_id))
+
+
+def quantized_file(config: str = QUANTIZATION_CONFIG) -> str:
+    """Path of the int8 model inside export_dir (naming used by export_dynamic_quantized_onnx_model)."""
+    return f"onnx/model_qint8_{config}.onnx"
+
+
+def export_int8(model_id: str, config: str = QUANTIZATION_CONFIG) -> str:
+    """Export + quantize `model_id` unless already done; returns the export directory."""
+    path = export_dir(model_id)
+    if not os.path.exists(os.path.join(path, quantized_file(config))):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        print(f"Exporting {model_id} to int8 ONNX ({config}) in {path}")
+        model = SentenceTransformer(model_id, backend="onnx")
+        model.save_pretrained(path)
+        export_dynamic_quantized_onnx_model(model, config, path)
+    return path
+
+
+def load_int8(model_id: str, config: str = QUANTIZATION_CONFIG) -> SentenceTransformer:
+    """SentenceTransformer running the int8 ONNX export of `model_id` on CPU."""
+    if not os.path.exists(BENCHMARK_RESULTS):
+        print("EMBEDDING_BACKEND=onnx-int8: parity with PyTorch is not recorded yet "
+              "(tests/results/onnx_benchmark.json); run python -m tests.benchmark_onnx_backend first")
+    path = export_int8(model_id, config)
+    return SentenceTransformer(path, backend="onnx", device="cpu",
+                               model_kwargs={"file_name": quantized_file(config),
+                                             "provider": "CPUExecutionProvider"})
+
+
+def parity(reference: SentenceTransformer, candidate: SentenceTransformer, texts: List[str]) -> Dict[str, float]:
+    """Per-text cosine similarity between two models' embeddings of the same texts."""
+    a = reference.encode(texts, convert_to_numpy=True)
+    b = candidate.encode(texts, convert_to_numpy=True)
+    cosines = np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {"min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean()),
+            "passed": bool(cosines.min() >= PARITY_MIN_COSINE)}
@@ -10,6 +10,7 @@ import pycountry
 import geonamescache
 import re
 import difflib
+from .alias_index import get_alias_index
 """
 we use both pycountry and geonamescache to classify GPEs into cities and countries.
 - pycountry has comprehensive country data, including alternative names (and fuzzy search).
@@ -40,6 +41,8 @@ class Country_City_Classifier:
 
     def __init__(self):
         self.gc = geonamescache.GeonamesCache()
+        # KG names, ISO codes, demonyms and known variants: checked before any fuzzy matching
+        self.aliases = get_alias_index()
         
         self.city_map = {}
         
@@ -67,7 +70,10 @@ class Country_City_Classifier:
 
 
     def canonical_country_name(self, name: str) -> str:
-        """Normalize country name to ISO standard."""
+        """Normalize country name to ISO standard (or the KG name when it is a known alias)."""
+        known = self.aliases.country(name)
+        if known:
+            return known
         name_clean = name.strip().title()
 
         # Fuzzy match via pycountry
@@ -88,6 +94,10 @@ class Country_City_Classifier:
 
 
     def is_country(self, name: str) -> bool:
+        if self.aliases.country(name):
+            return True
+        if self.aliases.city(name):
+            return False
         name_low = name.lower().strip()
 
         if name_low in self.country_names_pc: return True
@@ -106,6 +116,8 @@ class Country_City_Classifier:
     
 
     def is_city(self, name: str) -> bool:
+        if self.aliases.city(name):
+            return True
         name_low = name.lower().strip()
         # lookup using our smart map
         if name_low in self.city_map:
@@ -120,7 +132,10 @@ class Country_City_Classifier:
         return False
     
     def normalize_city_name(self, name: str) -> str:
-        """Returns the canonical name (e.g. 'new york' -> 'New York City')"""
+        """Returns the canonical name (KG name for known aliases, e.g. 'bombay' -> 'Mumbai', else 'new york' -> 'New York City')"""
+        known = self.aliases.city(name)
+        if known:
+            return known
         name_low = name.lower().strip()
         
         # 1. Direct Map Lookup
@@ -189,6 +204,10 @@ class OriginDestinationDetector:
         Prioritizes: 1. Explicit Country 2. City with Highest Population
         """
         name_clean = name.strip()
+        # Known KG countries / cities resolve without fuzzy search
+        known = self.classifier.aliases.country(name_clean) or self.classifier.aliases.country_of_city(name_clean)
+        if known:
+            return known
         # Normalize (New York -> New York City)
         name_clean = self.classifier.normalize_city_name(name_clean)
 
@@ -1,6 +1,9 @@
 # Graph_RAG/retrieval/baseline_retriever.py
 from typing import Dict, Any, Optional
-from retrieval.query_templates import QUERY_TEMPLATES
+from retrieval.query_templates import QUERY_TEMPLATES, SEGMENT_ANY, is_multi_destination, name_key, name_keys, segment_params
+from retrieval.filter_engine import compile_filter, leaderboard_for, normalize_conditions
+from retrieval.pagination import decode_cursor, keyset_params, split_page
+from preprocessing.alias_index import get_alias_index
 from neo4j_connector import Neo4jConnector
 
 class BaselineRetriever:
@@ -12,14 +15,38 @@ class BaselineRetriever:
         self.db = neo4j_connector or Neo4jConnector()
 
     def retrieve(self, intent: str, entities: Dict[str, Any], limit: int = 10):
+        records, cypher, _ = self.retrieve_page(intent, entities, limit=limit)
+        return records, cypher
+
+    def retrieve_page(self, intent: str, entities: Dict[str, Any], limit: int = 10, cursor: Optional[str] = None):
+        """
+        Same as retrieve(), plus keyset pagination: returns (records, cypher, next_cursor).
+        Pass next_cursor back (with the same intent/entities) to get the following page;
+        it is None when there are no more results. Hotel lists page on
+        (score, hotel_id), precomputed leaderboards on their list offset.
+        """
+        page = {"next_cursor": None}
+        records, cypher = self._retrieve(intent, entities, limit, decode_cursor(cursor), page)
+        return records, cypher, page["next_cursor"]
+
+    def browse_reviews(self, hotel_id: int, limit: int = 10, cursor: Optional[str] = None):
+        """
+        One page of a hotel's reviews, newest first, keyset-paginated on (date, review_id).
+        Returns (reviews, cypher, next_cursor).
+        """
+        params = dict(keyset_params(decode_cursor(cursor), key="date"), hotel_id=hotel_id, limit=limit + 1)
+        records = self.db.run_template("hotel_reviews_by_id", params)
+        records, next_cursor = split_page(records, limit, lambda r: {"date": r.get("date"), "id": r.get("review_id")})
+        return records, QUERY_TEMPLATES["hotel_reviews_by_id"], next_cursor
+
+    def _retrieve(self, intent: str, entities: Dict[str, Any], limit: int, after: Dict[str, Any], page: Dict[str, Any]):
         intent = intent or "hotel_search"
-        e = entities or {}
-        limit = e.get("limit")
+        # aliases / ISO codes / demonyms -> KG names, in O(1) (see preprocessing.alias_index)
+        e = get_alias_index().canonicalize(entities)
+        limit = e.get("limit") or limit
 
-        def _exec_and_extract(cypher_key, params):
-            """Run template, extract hotel dicts when available."""
-            print(QUERY_TEMPLATES[cypher_key],cypher_key)
-            records = self.db.run_query(QUERY_TEMPLATES[cypher_key], params)
+        def _clean(records):
+            """Extract hotel dicts when available."""
             cleaned = []
             for rec in records or []:
                 # If record carries a hotel map:
@@ -39,390 +66,129 @@ class BaselineRetriever:
                 else:
                     # fallback: return the raw record (for queries like reviews or visa)
                     cleaned.append(rec)
-                    
+            return cleaned
 
-            return cleaned, QUERY_TEMPLATES[cypher_key]
+        def _exec_and_extract(cypher_key, params):
+            """Run template, extract hotel dicts when available."""
+            print(QUERY_TEMPLATES[cypher_key],cypher_key)
+            records = self.db.run_template(cypher_key, params)
+            return _clean(records), QUERY_TEMPLATES[cypher_key]
+
+        def _exec_page(cypher_key, params, next_key):
+            """Run a paginated template: fetch one extra row to know whether a next page exists."""
+            records, cypher = _exec_and_extract(cypher_key, dict(params, limit=limit + 1))
+            records, page["next_cursor"] = split_page(records, limit, next_key)
+            return records, cypher
+
+        def _exec_ranked(cities, countries):
+            """Hotels ordered by (score DESC, hotel_id ASC), one keyset page at a time."""
+            params = {"cities": name_keys(cities), "countries": name_keys(countries)}
+            if is_multi_destination(params["cities"], params["countries"]):
+                # grouped mode: top `limit` per city / country in one query (not paginated)
+                return _exec_and_extract("hotel_search_top_k_per_group", dict(params, limit=limit))
+            params = dict(params, **keyset_params(after))
+            return _exec_page("hotel_search_by_city_or_country", params,
+                              lambda h: {"score": h.get("average_reviews_score") or 0.0, "id": h.get("hotel_id")})
+
+        def _exec_leaderboard(key, params):
+            """A precomputed leaderboard list, paged by offset (the list is already ranked)."""
+            offset = int(after.get("offset") or 0)
+            return _exec_page(key, dict(params, offset=offset), lambda h: {"offset": offset + limit})
+
+        def _exec_filter(conditions, cities, countries):
+            """Compile the rating conditions into one parameterized query and run it."""
+            if is_multi_destination(cities, countries):
+                return _exec_filter_per_group(conditions, cities, countries)
+            board = leaderboard_for(conditions, cities, countries)
+            if board:
+                # plain best/worst ranking over one scope: read the precomputed leaderboard
+                key, descending = board
+                return _exec_leaderboard("hotel_leaderboard", {"key": key, "descending": descending})
+            compiled = compile_filter(conditions)
+            params = compiled.bind(conditions, cities=cities, countries=countries, limit=limit + 1, after=after)
+            records = _clean(self.db.run_filter(compiled, params))
+            records, page["next_cursor"] = split_page(
+                records, limit, lambda h: {"score": h.get(compiled.order_field), "id": h.get("hotel_id")})
+            return records, compiled.cypher
+
+        def _exec_filter_per_group(conditions, cities, countries):
+            """Grouped mode, like _exec_ranked: the filter's top `limit` per city / country (not paginated)."""
+            compiled = compile_filter(conditions)
+            records = []
+            for group_type, names in (("city", cities or []), ("country", countries or [])):
+                for grp in names:
+                    scope = {"cities": [grp]} if group_type == "city" else {"countries": [grp]}
+                    params = compiled.bind(conditions, limit=limit, **scope)
+                    for hotel in _clean(self.db.run_filter(compiled, params)):
+                        hotel.update(group=hotel.get(group_type), group_type=group_type)
+                        records.append(hotel)
+            return records, compiled.cypher
 
         print("BaselineRetriever: intent =", intent, "entities =", e)
-        # --- hotel_search intent ---
-        if intent == "hotel_search":
-            rf = e.get("rating_filter") or {"type": "none", "operator": None}
+        # --- hotel_search / review_query intents ---
+        if intent in ("hotel_search", "review_query"):
             cities = e.get("cities") or None
             countries = e.get("countries") or None
-            if rf and rf.get("type") != "none" and rf.get("type") == "stars":
-                op = rf.get("operator")
-                if op == "gte" and rf.get("value") is not None:
-                    params = {"stars": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                if op == "gte" and rf.get("value") is not None:
-                    params = {"stars": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_stars", params)
-
-                if op == "lte" and rf.get("value") is not None:
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_stars", params)
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_stars_range", params)
-
-                if op == "eq" and rf.get("value") is not None:
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_stars", params)
-            elif rf and rf.get("type") == "cleanliness":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_cleanliness", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_cleanliness", params)
-
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_cleanliness_range", params)
-
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_cleanliness", params)
-                
-                if op == "gte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_cleanliness", params)
-                
-                if op == "lte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("worst_hotel_cleanliness", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_cleanliness", params)
-            elif rf and rf.get("type") == "comfort":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_comfort", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_comfort", params)
-
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_comfort_range", params)
-
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_comfort", params)  
-                if op == "gte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_comfort", params)
-                if op == "lte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("worst_hotel_comfort", params) 
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_comfort", params)
-            elif rf and rf.get("type") == "facilities":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_facilities", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_facilities", params)
-
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_facilities_range", params)
-
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_facilities", params)  
-                if op == "gte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_facilities", params)
-                if op == "lte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("worst_hotel_facilities", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_facilities", params)
-            elif rf and rf.get("type") == "staff":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_staff", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_staff", params)
-
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_staff_range", params)
-
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_staff", params)  
-                if op == "gte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_staff", params)
-                if op == "lte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("worst_hotel_staff", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_staff", params)
-            elif rf and rf.get("type") == "money":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_value_for_money", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_value_for_money", params)
-
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_value_for_money_range", params)
-
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_value_for_money", params)  
-                if op == "gte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_value_for_money", params)
-                if op == "lte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("worst_hotel_value_for_money", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_value_for_money", params)
-            elif rf and rf.get("type") != "none":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_rating", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_rating", params)
-
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_rating_range", params)
-
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_rating", params)
-                
-                if op == "gte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotels", params)
-                
-                if op == "lte" :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("worst_hotels", params)
+            # Any category / operator / number of conditions -> one compiled query (see filter_engine)
+            conditions = normalize_conditions(e.get("rating_filter"))
+            if conditions:
+                return _exec_filter(conditions, cities, countries)
 
             # Combined city + country search
             if e.get("cities") or e.get("countries"):
-                return _exec_and_extract("hotel_search_by_city_or_country",
-                                        {"cities": e.get("cities", []), "countries": e.get("countries", []), "limit": limit})
-
-            # fallback free text substring
-            if e.get("hotels"):
-                return _exec_and_extract("hotel_by_name_substring", {"q": e["hotels"][0], "limit": limit})
-
-            return _exec_and_extract("top_hotels", {"limit": limit})
-
-        # --- review_query ---
-        if intent == "review_query":
-            rf = e.get("rating_filter") or {"type": "none", "operator": None}
-            cities = e.get("cities") or None
-            countries = e.get("countries") or None
-            if rf and rf.get("type") != "none" and rf.get("type") == "stars":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_stars", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_stars", params)
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_stars_range", params)
+                return _exec_ranked(e.get("cities"), e.get("countries"))
 
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_stars", params)
-            elif rf and rf.get("type") == "cleanliness":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_cleanliness", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_cleanliness", params)
-
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_cleanliness_range", params)
-
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_cleanliness", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_cleanliness", params)
-            elif rf and rf.get("type") == "comfort":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_comfort", params)
-                
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_comfort", params)
-                
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_comfort_range", params)
-                
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_comfort", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_comfort", params)
-            elif rf and rf.get("type") == "facilities":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_facilities", params)
-                
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_facilities", params)
-                
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_facilities_range", params)
-                
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_facilities", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_facilities", params)
-            elif rf and rf.get("type") == "staff":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_staff", params)
-                
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_staff", params)
-                
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_staff_range", params)
-                
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_staff", params)
-                if op is None:
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_staff", params)
-            elif rf and rf.get("type") == "money":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_value_formoney", params)
-                
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_value_for_money", params)
-                
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_value_for_money_range", params)
-                
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_value_for_money", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotel_value_for_money", params)
-            elif rf and rf.get("type") != "none":
-                op = rf.get("operator")
-                if op == "gte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"rating": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_min_rating", params)
-
-                if op == "lte" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"max": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_max_rating", params)
-
-                if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
-                    params = {"min": rf["min"], "max": rf["max"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_rating_range", params)
-
-                if op == "eq" and (rf.get("value") is not None and rf.get("value") != 0):
-                    params = {"value": rf["value"], "cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("hotel_search_exact_rating", params)
-                if op is None :
-                    params = {"cities": cities, "countries": countries, "limit": limit}
-                    return _exec_and_extract("top_hotels", params)
-
-            # Combined city + country search
-            if e.get("cities") or e.get("countries"):
-                return _exec_and_extract("hotel_search_by_city_or_country",
-                                        {"cities": e.get("cities", []), "countries": e.get("countries", []), "limit": limit})
+            if intent == "review_query":
+                if e.get("hotels"):
+                    return _exec_and_extract("hotel_reviews_by_name", {"hotels": name_keys(e["hotels"]), "limit": limit})
+                return [], ""
 
+            # fallback free text substring (every mentioned hotel, one round trip)
             if e.get("hotels"):
-                return _exec_and_extract("hotel_reviews_by_name", {"hotel": e["hotels"][0], "limit": limit})
-            return []
+                return _exec_and_extract("hotel_by_name_substring", {
+                    "names": [{"name": name, "key": name_key(name)} for name in e["hotels"]], "limit": limit})
+
+            return _exec_leaderboard("top_hotels", {})
 
         # --- recommendation ---
         if intent == "recommendation":
-            traveller_type = e.get("traveller_type")
-            if traveller_type:
-                # keep same params shape (template returns hotel + freq, _exec_and_extract will pick hotel)
-                return _exec_and_extract("recommend_hotels_by_traveller_type", {"traveller_type": traveller_type, "limit": limit})
+            segment = segment_params(e.get("traveller_type"), e.get("age_group"), e.get("gender"))
+            if any(value != SEGMENT_ANY for value in segment.values()):
+                # segment cube lookup (template returns hotel + freq, _exec_and_extract will pick hotel)
+                params = dict(segment, cities=name_keys(e.get("cities")), countries=name_keys(e.get("countries")), limit=limit)
+                results, cypher = _exec_and_extract("recommend_hotels_by_segment", params)
+                if results:
+                    return results, cypher
             if e.get("cities") or e.get("countries"):
-                return _exec_and_extract("hotel_search_by_city_or_country",
-                                        {"cities": e.get("cities", []), "countries": e.get("countries", []), "limit": limit})
+                return _exec_ranked(e.get("cities"), e.get("countries"))
             
 
-            return _exec_and_extract("top_hotels", {"limit": limit})
+            return _exec_leaderboard("top_hotels", {})
 
         # --- visa_query ---
         if intent == "visa_query":
-            origins = e.get("origin_country") or []
-            dests = e.get("destination_country") or []
+            origins = name_keys(e.get("origin_country"))
+            dests = name_keys(e.get("destination_country"))
+            # all origins x destinations in one query; rows carry origin/destination_country
             if origins and dests:
                 params = {
-                    "from": origins[0], 
-                    "to": dests[0]
+                    "origins": origins, 
+                    "destinations": dests
                 }
                 return _exec_and_extract("visa_requirements", params)
             if origins:
-                params = {"from": origins[0]}
+                params = {"origins": origins}
                 return _exec_and_extract("visa_requirements_by_origin", params)
             return [],""
         
         if intent == "hotel_visa":
-            origins = e.get("origin_country") or []
+            origins = name_keys(e.get("origin_country"))
             if origins:
-                params = {"origin": origins[0], "limit": limit}
+                params = {"origins": origins, "limit": limit}
                 return _exec_and_extract("hotel_search_visa_free", params)
             
             # If origin is missing, fallback to generic top hotels
-            return _exec_and_extract("top_hotels", {"limit": limit})
+            return _exec_leaderboard("top_hotels", {})
 
         # Generic fallback
-        return _exec_and_extract("top_hotels", {"limit": limit})
+        return _exec_leaderboard("top_hotels", {})
@@ -1,7 +1,12 @@
-from typing import Any, List, Dict
+import os
+from typing import Any, List, Dict, Optional
 from neo4j_connector import Neo4jConnector
 from retrieval.feature_builder import build_feature_text
 from preprocessing.embedding_encoder import EmbeddingEncoder
+from retrieval.query_templates import HOTEL_PROJECTION, featured_review_texts
+from retrieval.lexical_index import LEXICAL_INDEX_DIR, LexicalIndex
+from retrieval.vector_sidecar import sidecar_path, write_sidecar
+from retrieval.vector_store import REVIEW_BATCH_SIZE
 
 class EmbeddingIndexer:
     """
@@ -9,18 +14,26 @@ class EmbeddingIndexer:
 
     Output properties added to each (:Hotel):
         - h.embedding_minilm   (List[float])
+    and, with index_all_reviews, to each (:Review) with text:
+        - r.embedding_minilm   (List[float])
+
+    With sidecar="float16" | "int8" (or VECTOR_SIDECAR) hotel vectors go to a
+    memory-mapped sidecar file instead of the Hotel nodes (see retrieval/vector_sidecar.py).
     """
 
-    def __init__(self, neo4j_connector: Neo4jConnector = None, model_name="minilm"):
+    def __init__(self, neo4j_connector: Neo4jConnector = None, model_name="minilm", sidecar: Optional[str] = None):
         self.db = neo4j_connector or Neo4jConnector()
         self.encoder = EmbeddingEncoder(model_name=model_name)
+        self.sidecar = sidecar or os.getenv("VECTOR_SIDECAR") or None
         if model_name == "bge":
             self.property_name = "embedding_bge"
             self.index_name = "hotel_embedding_bge_idx"
-            self.dimensions = 768
+            self.review_index_name = "review_embedding_bge_idx"
+            self.dimensions = 384  # bge-small-en-v1.5 is 384-d, like MiniLM
         else:
             self.property_name = "embedding_minilm"
             self.index_name = "hotel_embedding_minilm_idx"
+            self.review_index_name = "review_embedding_minilm_idx"
             self.dimensions = 384
 
 
@@ -44,10 +57,9 @@ class EmbeddingIndexer:
         """
         Fetches all hotel nodes from the database.
         """
-        cypher = """MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country) 
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WITH h, c.name AS city_name, co.name AS country_name, collect(r.text)[0..3] AS review_texts
-        RETURN h, city_name, country_name, review_texts"""
+        cypher = f"""MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country) 
+        RETURN elementId(h) AS node_id, h {{ {HOTEL_PROJECTION} }} AS h, c.name AS city_name, co.name AS country_name,
+            {featured_review_texts("h")} AS review_texts"""
         return self.db.run_query(cypher)
     
     def store_embedding(self, node_id: int, embedding: List[float]):
@@ -66,20 +78,100 @@ class EmbeddingIndexer:
         Fetches all hotels, generates embeddings, and stores them in the database.
         """
         records = self.fetch_hotels()
-        for record in records:
-            hotel_node = record["h"]
-            node_id = hotel_node.element_id
-            feature_text = build_feature_text(record)
-            embedding = self.encoder.encode(feature_text)
+        if self.sidecar:
+            self.write_sidecar(records)
+            return
+        # encode_batch bypasses the query cache: hotel documents are not queries
+        embeddings = self.encoder.encode_batch([build_feature_text(record) for record in records])
+        for record, embedding in zip(records, embeddings):
+            node_id = record["node_id"]
             if embedding:
                 self.store_embedding(node_id, embedding)
                 print(f"Stored embedding for Hotel node ID {node_id}")
             else:
                 print(f"Failed to generate embedding for Hotel node ID {node_id}")
 
+    def write_sidecar(self, records: List[Dict[str, Any]] = None):
+        """Embeds every hotel in one encode_batch call and saves the vectors as a self.sidecar sidecar."""
+        records = records if records is not None else self.fetch_hotels()
+        vectors = self.encoder.encode_batch([build_feature_text(record) for record in records])
+        kept = [(record["h"]["hotel_id"], vector) for record, vector in zip(records, vectors) if vector]
+        path = sidecar_path(self.property_name)
+        write_sidecar(path, [hid for hid, _ in kept], [vector for _, vector in kept], self.sidecar)
+        print(f"Stored {len(kept)} {self.sidecar} hotel vectors in {path}")
+
+    def ensure_review_vector_index(self):
+        cypher = f"""
+        CREATE VECTOR INDEX {self.review_index_name} IF NOT EXISTS
+        FOR (r:Review) ON (r.{self.property_name})
+        OPTIONS {{
+        indexConfig: {{
+            `vector.dimensions`: {self.dimensions},
+            `vector.similarity_function`: 'cosine'
+        }}
+        }};
+        """
+        self.db.run_query(cypher)
+
+    def index_all_reviews(self, batch_size: int = REVIEW_BATCH_SIZE):
+        """
+        Embeds every review text that has no vector yet, batch_size reviews per
+        encode_batch call and per write. Safe to re-run: finished reviews are skipped.
+        """
+        fetch = f"""
+        MATCH (r:Review)
+        WHERE r.text IS NOT NULL AND trim(r.text) <> '' AND r.{self.property_name} IS NULL
+        RETURN elementId(r) AS node_id, r.text AS text
+        LIMIT $batch_size
+        """
+        store = f"""
+        UNWIND $rows AS row
+        MATCH (r:Review) WHERE elementId(r) = row.node_id
+        SET r.{self.property_name} = row.embedding
+        """
+        total, seen = 0, set()
+        while True:
+            records = self.db.run_query(fetch, {"batch_size": batch_size})
+            if not records:
+                break
+            if any(record["node_id"] in seen for record in records):
+                print("Warning: review embeddings were not stored (write failed?), stopping")
+                break
+            seen.update(record["node_id"] for record in records)
+            vectors = self.encoder.encode_batch([record["text"] for record in records])
+            self.db.run_query(store, {"rows": [{"node_id": record["node_id"], "embedding": vector}
+                                               for record, vector in zip(records, vectors)]})
+            total += len(records)
+            print(f"Stored embeddings for {total} reviews")
+        return total
+
+    def build_lexical_index(self, path: str = LEXICAL_INDEX_DIR) -> LexicalIndex:
+        """
+        Builds the BM25 index over every hotel's feature text and every review text
+        and saves it under `path` (model independent: one index serves both models).
+        """
+        records = [{k: record[k] for k in ("h", "city_name", "country_name", "review_texts")}
+                   for record in self.fetch_hotels()]
+        reviews = self.db.run_query("""
+        MATCH (r:Review)-[:REVIEWED]->(h:Hotel)
+        WHERE r.text IS NOT NULL AND trim(r.text) <> ''
+        RETURN h.hotel_id AS hotel_id, r.text AS text
+        """)
+        index = LexicalIndex.build(records, reviews)
+        index.save(path)
+        print(f"Saved BM25 index ({len(records)} hotels, {len(reviews)} reviews, {len(index.terms)} terms) to {path}")
+        return index
+
 
 if __name__ == "__main__":
-    EmbeddingIndexer().ensure_vector_index()
-    EmbeddingIndexer(model_name="bge").ensure_vector_index()
-    EmbeddingIndexer().index_all_hotels()
-    EmbeddingIndexer(model_name="bge").index_all_hotels()
\ No newline at end of file
+    for model_name in ("minilm", "bge"):
+        indexer = EmbeddingIndexer(model_name=model_name)
+        if not indexer.sidecar:
+            # sidecar mode writes no vectors to the Hotel nodes, so there is nothing to index
+            indexer.ensure_vector_index()
+        indexer.index_all_hotels()
+    for model_name in ("minilm", "bge"):
+        indexer = EmbeddingIndexer(model_name=model_name)
+        indexer.ensure_review_vector_index()
+        indexer.index_all_reviews()
+    EmbeddingIndexer().build_lexical_index()
\ No newline at end of file
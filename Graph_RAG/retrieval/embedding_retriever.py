@@ -1,9 +1,261 @@
-from typing import List, Dict, Any
+import math
+import os
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional
 from neo4j_connector import Neo4jConnector
+from in_memory_graph import InMemoryGraph
 from preprocessing.embedding_encoder import EmbeddingEncoder
+from preprocessing.encoder_service import EncoderService
+from preprocessing.alias_index import get_alias_index
+from retrieval.query_templates import HOTEL_PROJECTION, featured_review_texts, is_multi_destination, name_key, name_keys
+from retrieval.filter_engine import (
+    VALUE_OPERATORS, bind_values, build_predicates, condition_shape, normalize_conditions,
+)
+from retrieval.lexical_index import LexicalIndex, load_lexical_index, reciprocal_rank_fusion
+from retrieval.vector_sidecar import sidecar_path
+from retrieval.vector_store import VectorStore
 # from preprocessing.entity_extractor import extract_entities
 
 
+def build_rating_filter(rating_filter: dict, params: dict) -> str:
+    """
+    Builds the WHERE clause for the rating filter with the filter engine.
+    Every score (stars, global, per category) is materialized on the hotel
+    node, so the whole filter applies before the vector search.
+    Ranking-only conditions ("best cleanliness") are left to the vector score.
+    """
+    conditions = [c for c in normalize_conditions(rating_filter) if c["op"] in VALUE_OPERATORS]
+    params.update(bind_values(conditions))
+    return "".join(f"AND {p} " for p in build_predicates(condition_shape(conditions), var="h"))
+
+
+def destination_groups(cities: List[str] = None, countries: List[str] = None, grouped: bool = True):
+    """
+    ("city" | "country", names) when several destinations get top_k each, else (None, []).
+    grouped=False treats them as one scope (e.g. countries derived from visa rules, not named by the user).
+    """
+    if not grouped:
+        return None, []
+    if cities and is_multi_destination(cities):
+        return "city", cities
+    if not cities and countries and is_multi_destination(None, countries):
+        return "country", countries
+    return None, []
+
+
+# Adaptive candidate pool for the Neo4j vector index (the index is queried
+# before the location / rating scope is applied, see _search_hotels_generic):
+# scopes up to EXACT_SCOPE_MAX hotels are scored exactly instead, larger ones
+# start at top_k / selectivity * FETCH_OVERSAMPLE candidates and grow by
+# FETCH_GROWTH until top_k is filled or MAX_FETCH_K is reached.
+EXACT_SCOPE_MAX = 2000
+FETCH_OVERSAMPLE = 2.0
+FETCH_GROWTH = 4
+MAX_FETCH_K = 4000
+
+
+def initial_fetch_k(top_k: int, scope_size: int, total: int) -> int:
+    """Candidates to request so that about top_k of them fall in a scope of scope_size out of total hotels."""
+    selectivity = scope_size / total if total else 1.0
+    wanted = top_k / max(selectivity, 1e-6) * FETCH_OVERSAMPLE
+    return int(min(MAX_FETCH_K, max(top_k, math.ceil(wanted))))
+
+
+def _scope_clause(property_name: str, cities: List[str], countries: List[str], rating_filter: dict, params: dict,
+                  grouped: bool = True):
+    """MATCH ... WHERE ... binding h to the embedded hotels in scope (grp = current group in grouped mode)."""
+    group_type, groups = destination_groups(cities, countries, grouped)
+
+    # 1. Location Clause
+    location_match = "MATCH (c:City)"
+    if group_type == "city":
+        location_match = "MATCH (c:City {name_key: grp})"
+        params["groups"] = name_keys(groups)
+    elif group_type == "country":
+        location_match = """
+        MATCH (co:Country {name_key: grp})
+        MATCH (c:City)-[:LOCATED_IN]->(co)
+        """
+        params["groups"] = name_keys(groups)
+    elif cities:
+        location_match = "MATCH (c:City) WHERE c.name_key IN $cities"
+        params["cities"] = name_keys(cities)
+    elif countries:
+        location_match = """
+        MATCH (co:Country) WHERE co.name_key IN $countries
+        MATCH (c:City)-[:LOCATED_IN]->(co)
+        """
+        params["countries"] = name_keys(countries)
+
+    # 2. Rating filter on the materialized hotel scores
+    pre_filter = build_rating_filter(rating_filter, params)
+
+    return f"""
+    {location_match}
+    MATCH (h:Hotel)-[:LOCATED_IN]->(c)
+    WHERE h.{property_name} IS NOT NULL
+    {pre_filter}
+    """
+
+
+def build_scope_count_query(property_name: str, cities: List[str] = None, countries: List[str] = None,
+                            rating_filter: dict = None, grouped: bool = True):
+    """
+    (cypher, params) counting the hotels a filtered vector search can return, one row per group
+    ({grp, scope_size}; grp is null outside grouped mode, groups without hotels are omitted).
+    """
+    params = {}
+    scope = _scope_clause(property_name, cities, countries, rating_filter, params, grouped)
+    if "groups" in params:
+        cypher = f"""
+    UNWIND $groups AS grp
+    {scope}
+    RETURN grp, count(h) AS scope_size
+    """
+    else:
+        cypher = f"""
+    {scope}
+    RETURN null AS grp, count(h) AS scope_size
+    """
+    return cypher, params
+
+
+def build_hotel_search_query(property_name: str, index_name: str, embedding: List[float], cities: List[str] = None,
+                             countries: List[str] = None, top_k: int = 25, rating_filter: dict = None,
+                             fetch_k: int = None, exact: bool = False, grouped: bool = True):
+    """
+    (cypher, params) of the filtered vector search run by EmbeddingRetriever._search_hotels_generic.
+    exact=True scores every hotel in scope with vector.similarity.cosine instead of querying the
+    index for fetch_k candidates (default top_k * 5). Same score scale either way.
+    Kept free of any connection / encoder so every variant can be inspected (see tests/test_query_plans.py).
+    """
+    group_type, groups = destination_groups(cities, countries, grouped)
+    params = {
+        "index_name": index_name,
+        "embedding": embedding,
+        "top_k": top_k,
+        # Fetch more candidates than needed: the index is queried before the location/rating scope is applied
+        "fetch_k": fetch_k or top_k * 5
+    }
+    scope = _scope_clause(property_name, cities, countries, rating_filter, params, grouped)
+
+    # 3. Cypher Query
+    if exact:
+        candidates = f"""
+    {scope}
+    WITH h AS node, vector.similarity.cosine(h.{property_name}, $embedding) AS score
+    """
+    else:
+        candidates = f"""
+    {scope}
+
+    WITH collect(h) AS hotels
+
+    CALL db.index.vector.queryNodes('{index_name}', $fetch_k, $embedding)
+    YIELD node, score
+    WHERE node IN hotels
+    """
+    projection = f"""
+        node {{ {HOTEL_PROJECTION} }} AS h, 
+        c_res.name AS city_name, 
+        co_res.name AS country_name, 
+        {featured_review_texts("node")} AS review_texts, 
+        score"""
+
+    if group_type:
+        # one vector-search subquery per destination, all in the same round trip
+        group_name = "c_res.name" if group_type == "city" else "co_res.name"
+        cypher = f"""
+    UNWIND $groups AS grp
+    CALL {{
+        WITH grp
+        {candidates}
+        RETURN node, score
+        ORDER BY score DESC
+        LIMIT toInteger(coalesce($top_k, 10))
+    }}
+
+    MATCH (node)-[:LOCATED_IN]->(c_res:City)-[:LOCATED_IN]->(co_res:Country)
+
+    RETURN {projection},
+        {group_name} AS group
+    ORDER BY group, score DESC
+    """
+    else:
+        cypher = f"""
+    {candidates}
+
+    MATCH (node)-[:LOCATED_IN]->(c_res:City)-[:LOCATED_IN]->(co_res:Country)
+
+    RETURN {projection}
+    ORDER BY score DESC
+    LIMIT toInteger(coalesce($top_k, 10))
+
+    """
+    return cypher, params
+
+
+# Review-level search on Neo4j: reviews fetched from the review vector index
+# before the hotel scope is applied (the embedded backend scores every review)
+REVIEW_FETCH_K = 1000
+
+
+def build_review_search_query(property_name: str, index_name: str, embedding: List[float], cities: List[str] = None,
+                              countries: List[str] = None, top_k: int = 10, rating_filter: dict = None,
+                              pooling: str = "top_n", top_n: int = 3, snippets: int = 3, fetch_k: int = None):
+    """
+    (cypher, params) of the review-level search: matching reviews are grouped by hotel
+    and pooled to one hotel score in the same query ("max": best review, "mean": all
+    matches, "top_n": mean of the top_n best), with the best `snippets` reviews as evidence.
+    """
+    params = {
+        "embedding": embedding,
+        "top_k": top_k,
+        "fetch_k": fetch_k or REVIEW_FETCH_K,
+        "top_n": {"max": 1, "mean": None}.get(pooling, top_n),
+        "snippets": snippets,
+    }
+    scope = ""
+    if cities:
+        scope = "AND c.name_key IN $cities"
+        params["cities"] = name_keys(cities)
+    elif countries:
+        scope = "AND co.name_key IN $countries"
+        params["countries"] = name_keys(countries)
+    pre_filter = build_rating_filter(rating_filter, params)
+
+    cypher = f"""
+    CALL db.index.vector.queryNodes('{index_name}', $fetch_k, $embedding)
+    YIELD node AS r, score
+    MATCH (r)-[:REVIEWED]->(h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+    WHERE r.{property_name} IS NOT NULL
+    {scope}
+    {pre_filter}
+
+    WITH h, c, co, r, score
+    ORDER BY score DESC
+    WITH h, c, co, collect({{review_id: r.review_id, hotel_id: h.hotel_id, text: r.text, score: score}}) AS matches
+    WITH h, c, co, matches, matches[0..coalesce($top_n, size(matches))] AS pooled
+    WITH h, c, co, matches, reduce(total = 0.0, m IN pooled | total + m.score) / size(pooled) AS score
+
+    RETURN h {{ {HOTEL_PROJECTION} }} AS h,
+        c.name AS city_name,
+        co.name AS country_name,
+        [m IN matches[0..$snippets] | m.text] AS review_texts,
+        matches[0..$snippets] AS evidence,
+        size(matches) AS matched_reviews,
+        score
+    ORDER BY score DESC
+    LIMIT toInteger(coalesce($top_k, 10))
+    """
+    return cypher, params
+
+
+# Hybrid search: hotels taken from each ranking (vector, BM25 hotel text, BM25
+# reviews) before reciprocal-rank fusion
+HYBRID_DEPTH = 50
+
+
 class EmbeddingRetriever:
     """
     Embedding-based retrieval for Hotels using Neo4j vector index.
@@ -13,17 +265,39 @@ class EmbeddingRetriever:
       - Country-filtered semantic search (single or multiple)
     """
 
-    def __init__(self, neo4j_connector: Neo4jConnector = None, model_name: str = "minilm"):
+    def __init__(self, neo4j_connector: Neo4jConnector = None, model_name: str = "minilm", vector_store: str = None,
+                 search_level: str = None, hybrid: bool = None):
         self.db = neo4j_connector or Neo4jConnector()
-        self.encoder = EmbeddingEncoder(model_name=model_name)
+        # Concurrent queries share one encode_batch call when ENCODER_MAX_BATCH > 1
+        self.encoder = EncoderService.from_env(EmbeddingEncoder(model_name=model_name))
         if model_name == "bge":
             self.property_name = "embedding_bge"
             self.index_name = "hotel_embedding_bge_idx"
-            self.dimensions = 768
+            self.review_index_name = "review_embedding_bge_idx"
+            self.dimensions = 384  # bge-small-en-v1.5 is 384-d, like MiniLM
         else:
             self.property_name = "embedding_minilm"
             self.index_name = "hotel_embedding_minilm_idx"
+            self.review_index_name = "review_embedding_minilm_idx"
             self.dimensions = 384
+        # Embedded backend: vectors live in process, no Neo4j vector index involved
+        self.embedded = isinstance(self.db, InMemoryGraph)
+        # VECTOR_STORE=memory: on Neo4j too, load the vectors once into a VectorStore
+        # and run exact filtered search in process instead of querying the vector index
+        self.use_vector_store = (vector_store or os.getenv("VECTOR_STORE", "neo4j")).lower() == "memory"
+        # VECTOR_SIDECAR=float16 | int8: hotel vectors are memory-mapped from the sidecar written
+        # by EmbeddingIndexer (not stored on the nodes), so they are always searched in process
+        self.sidecar = os.getenv("VECTOR_SIDECAR") or None
+        self.use_vector_store = self.use_vector_store or bool(self.sidecar)
+        self._vector_store: Optional[VectorStore] = None
+        self._embedded_hotel_count: Optional[int] = None
+        # SEMANTIC_SEARCH_LEVEL=review: match individual reviews and pool them per hotel
+        self.search_level = (search_level or os.getenv("SEMANTIC_SEARCH_LEVEL", "hotel")).lower()
+        self.review_pooling = os.getenv("REVIEW_POOLING", "top_n")
+        self.review_top_n = int(os.getenv("REVIEW_POOL_TOP_N", "3"))
+        # HYBRID_SEARCH=1: fuse the vector ranking with BM25 rankings (see retrieval/lexical_index.py)
+        self.hybrid = hybrid if hybrid is not None else os.getenv("HYBRID_SEARCH", "0").lower() in ("1", "true", "on")
+        self._lexical_index: Optional[LexicalIndex] = None
 
 
     # GLOBAL SEARCH (no filters)
@@ -113,7 +387,7 @@ class EmbeddingRetriever:
     # SINGLE CITY
     def sem_search_hotels_in_city(self, city: str, embedding: List[float], top_k: int = 10, rating_filter: dict = None):
         rating_clause = ""
-        params = {"city": city, "index_name": self.index_name, "embedding": embedding, "top_k": top_k}
+        params = {"city": name_key(city), "index_name": self.index_name, "embedding": embedding, "top_k": top_k}
         if rating_filter and rating_filter.get("type") != "none" and rating_filter.get("type") == "stars":
             op = rating_filter.get("operator")
             if op == "gte" and rating_filter.get("value") is not None:
@@ -167,7 +441,7 @@ class EmbeddingRetriever:
 
         cypher = f"""
         MATCH (c:City)
-        WHERE toLower(c.name) = toLower($city)
+        WHERE c.name_key = $city
 
         MATCH (h:Hotel)-[:LOCATED_IN]->(c)
         WHERE h.%s IS NOT NULL
@@ -192,7 +466,7 @@ class EmbeddingRetriever:
     # MULTIPLE CITIES
     def sem_search_hotels_in_cities(self, cities: List[str], embedding: List[float], top_k: int = 10, rating_filter: dict = None):
         rating_clause = ""
-        params = {"cities": [c.lower() for c in cities], "index_name": self.index_name, "embedding": embedding, "top_k": top_k}
+        params = {"cities": name_keys(cities), "index_name": self.index_name, "embedding": embedding, "top_k": top_k}
         if rating_filter and rating_filter.get("type") != "none" and rating_filter.get("type") == "stars":
             op = rating_filter.get("operator")
             if op == "gte" and rating_filter.get("value") is not None:
@@ -246,7 +520,7 @@ class EmbeddingRetriever:
 
         cypher = f"""
         MATCH (c:City)
-        WHERE toLower(c.name) IN $cities
+        WHERE c.name_key IN $cities
 
         MATCH (h:Hotel)-[:LOCATED_IN]->(c)
         WHERE h.%s IS NOT NULL
@@ -270,7 +544,7 @@ class EmbeddingRetriever:
     # SINGLE COUNTRY
     def sem_search_hotels_in_country(self, country: str, embedding: List[float], top_k: int = 10, rating_filter: dict = None):
         rating_clause = ""
-        params = {"country": country, "index_name": self.index_name, "embedding": embedding, "top_k": top_k}
+        params = {"country": name_key(country), "index_name": self.index_name, "embedding": embedding, "top_k": top_k}
         if rating_filter and rating_filter.get("type") != "none" and rating_filter.get("type") == "stars":
             op = rating_filter.get("operator")
             if op == "gte" and rating_filter.get("value") is not None:
@@ -324,7 +598,7 @@ class EmbeddingRetriever:
 
         cypher = f"""
         MATCH (co:Country)
-        WHERE toLower(co.name) = toLower($country)
+        WHERE co.name_key = $country
 
         MATCH (c:City)-[:LOCATED_IN]->(co)
         MATCH (h:Hotel)-[:LOCATED_IN]->(c)
@@ -349,7 +623,7 @@ class EmbeddingRetriever:
     # MULTIPLE COUNTRIES
     def sem_search_hotels_in_countries(self, countries: List[str], embedding: List[float], top_k: int = 10, rating_filter: dict = None):
         rating_clause = ""
-        params = {"countries": [co.lower() for co in countries], "index_name": self.index_name, "embedding": embedding, "top_k": top_k}
+        params = {"countries": name_keys(countries), "index_name": self.index_name, "embedding": embedding, "top_k": top_k}
         if rating_filter and rating_filter.get("type") != "none" and rating_filter.get("type") == "stars":
             op = rating_filter.get("operator")
             if op == "gte" and rating_filter.get("value") is not None:
@@ -403,7 +677,7 @@ class EmbeddingRetriever:
 
         cypher = f"""
         MATCH (co:Country)
-        WHERE toLower(co.name) IN $countries
+        WHERE co.name_key IN $countries
 
         MATCH (c:City)-[:LOCATED_IN]->(co)
         MATCH (h:Hotel)-[:LOCATED_IN]->(c)
@@ -425,30 +699,12 @@ class EmbeddingRetriever:
 
         return self.db.run_query(cypher, params)
     
-    def search_visa(self, origin_country:str , destination_country:str, embedding: List[float], top_k:int=10):
-        if not origin_country or not destination_country:
+    def search_visa(self, origin_countries: List[str], destination_countries: List[str], embedding: List[float], top_k:int=10):
+        """Visa requirement for every origin x destination pair, in one batched query."""
+        if not origin_countries or not destination_countries:
             return []
-
-        # We use toLower() for case-insensitive matching to be robust against user input variations
-        cypher = """
-        MATCH (from:Country {name: 'Japan'})
-        MATCH (to:Country)
-        WHERE from <> to
-        OPTIONAL MATCH (from)-[v:NEEDS_VISA]->(to)
-        RETURN
-            from.name AS origin_country,
-            to.name AS destination_country,
-            COALESCE(v.visa_type, 'Visa Free') AS visa_type
-        ORDER BY destination_country
-
-        """
-
-        params = {
-            "origin": origin_country,
-            "destination": destination_country
-        }
-
-        return self.db.run_query(cypher, params)
+        params = {"origins": name_keys(origin_countries), "destinations": name_keys(destination_countries)}
+        return self.db.run_template("visa_requirements", params)
     
     def _build_rating_clause(self, rating_filter: dict, params: dict) -> str:
         if not rating_filter or rating_filter.get("type") == "none":
@@ -484,229 +740,239 @@ class EmbeddingRetriever:
         return clause
     
 
-    def _build_pre_filter(self, rating_filter: dict, params: dict) -> str:
+    def _build_rating_filter(self, rating_filter: dict, params: dict) -> str:
+        return build_rating_filter(rating_filter, params)
+    
+    def vector_store(self) -> Optional[VectorStore]:
         """
-        Builds WHERE clause for properties that exist ON THE HOTEL NODE.
-        (Stars, Global Score).
+        In-process store for this model's vectors, loaded from the sidecar or the graph on first use
+        (None if the graph has none). Raises RuntimeError when VECTOR_SIDECAR is set but the sidecar is missing or empty.
         """
-        if not rating_filter or rating_filter.get("type") not in ["stars", "reviews"]:
-            return ""
-
-        r_type = rating_filter.get("type")
-        op = rating_filter.get("operator")
-        val = rating_filter.get("value")
-        min_val = rating_filter.get("min")
-        max_val = rating_filter.get("max")
-        
-        # Map to static node properties
-        field = "h.star_rating" if r_type == "stars" else "h.average_reviews_score"
+        if self._vector_store is None:
+            if self.sidecar:
+                # the Hotel nodes carry no vectors in sidecar mode: there is nothing to fall back to
+                path = sidecar_path(self.property_name)
+                store = VectorStore.from_sidecar(self.db, path)
+                if store is None or not len(store):
+                    raise RuntimeError(f"VECTOR_SIDECAR={self.sidecar}: no {self.property_name} sidecar for the "
+                                       f"hotels in the graph at {path}; run EmbeddingIndexer first")
+            else:
+                store = VectorStore.from_graph(self.db, self.property_name)
+            if len(store):
+                self._vector_store = store
+        return self._vector_store
+
+    def refresh_vector_store(self):
+        """Drop the loaded vectors and BM25 index, e.g. after create_kg.py or EmbeddingIndexer rewrote them."""
+        self._vector_store = None
+        self._embedded_hotel_count = None
+        self._lexical_index = None
+        load_lexical_index.cache_clear()
+
+    def lexical_index(self) -> Optional[LexicalIndex]:
+        """BM25 index: built in process on the embedded backend, else the one saved by EmbeddingIndexer (or None)."""
+        if self._lexical_index is None:
+            if self.embedded:
+                self._lexical_index = self.db.ensure_lexical_index()
+            else:
+                self._lexical_index = load_lexical_index()
+                if self._lexical_index is None:
+                    print("No BM25 index on disk (EmbeddingIndexer.build_lexical_index): vector results only")
+        return self._lexical_index
+
+    def _exact_search(self, embedding: List[float], cities: List[str] = None, countries: List[str] = None,
+                      top_k: int = 25, rating_filter: dict = None):
+        """Filtered top-k over in-process vectors, or None when the Neo4j vector index must be used."""
+        if self.embedded:
+            self.db.ensure_embeddings(self.property_name, self.encoder)
+            return self.db.search_hotels(self.property_name, embedding, cities=cities, countries=countries,
+                                         top_k=top_k, rating_filter=rating_filter)
+        store = self.vector_store() if self.use_vector_store else None
+        if store is None:
+            return None
+        return store.search(embedding, cities=cities, countries=countries, top_k=top_k, rating_filter=rating_filter)
+
+    def _search_hotels_generic(self, embedding: List[float], cities: List[str] = None, countries: List[str] = None,
+                               top_k: int = 25, rating_filter: dict = None, grouped: bool = True):
+        group_type, groups = destination_groups(cities, countries, grouped)
+
+        if self.embedded or self.use_vector_store:
+            if group_type:
+                rows = []
+                for grp in groups:
+                    scope = {"cities": [grp]} if group_type == "city" else {"countries": [grp]}
+                    found = self._exact_search(embedding, top_k=top_k, rating_filter=rating_filter, **scope)
+                    if found is None:
+                        break
+                    for row in found:
+                        row["group"] = row["city_name"] if group_type == "city" else row["country_name"]
+                        rows.append(row)
+                else:
+                    return rows
+            else:
+                rows = self._exact_search(embedding, cities=cities, countries=countries,
+                                          top_k=top_k, rating_filter=rating_filter)
+                if rows is not None:
+                    return rows
 
-        clause = ""
-        if op == "gte" and val is not None:
-            clause = f"AND {field} >= $pre_min"
-            params["pre_min"] = float(val)
-        elif op == "lte" and val is not None:
-            clause = f"AND {field} <= $pre_max"
-            params["pre_max"] = float(val)
-        elif op == "between":
-            clause = f"AND {field} >= $pre_min AND {field} <= $pre_max"
-            params["pre_min"] = float(min_val)
-            params["pre_max"] = float(max_val)
-        elif op == "eq" and val is not None:
-            clause = f"AND {field} = $pre_eq"
-            params["pre_eq"] = float(val)
-            
-        return clause
+        return self._search_neo4j(embedding, cities=cities, countries=countries, top_k=top_k,
+                                  rating_filter=rating_filter, grouped=grouped)
 
-    def _build_post_filter(self, rating_filter: dict, params: dict) -> str:
+    def _search_reviews_generic(self, embedding: List[float], cities: List[str] = None, countries: List[str] = None,
+                                top_k: int = 10, rating_filter: dict = None, grouped: bool = True):
         """
-        Builds WHERE clause for calculated aggregates FROM REVIEWS.
-        (Cleanliness, Comfort, Facilities, Staff, Value).
+        Review-level semantic search: hotels ranked by their pooled review scores, each row
+        carrying its best matching reviews (review_texts / evidence). One search per group
+        for multi-destination queries, like _search_hotels_generic.
         """
-        dynamic_types = ["cleanliness", "comfort", "facilities", "staff", "money"]
-        
-        if not rating_filter or rating_filter.get("type") not in dynamic_types:
-            return ""
-
-        r_type = rating_filter.get("type")
-        op = rating_filter.get("operator")
-        val = rating_filter.get("value")
-        min_val = rating_filter.get("min")
-        max_val = rating_filter.get("max")
-        
-        # Map to the calculated variable names in Cypher
-        field_map = {
-            "cleanliness": "avg_cleanliness",
-            "comfort": "avg_comfort",
-            "facilities": "avg_facilities",
-            "staff": "avg_staff",
-            "money": "avg_money"
-        }
-        variable = field_map.get(r_type)
-
-        clause = ""
-        if op == "gte" and val is not None:
-            clause = f"AND {variable} >= $post_min"
-            params["post_min"] = float(val)
-        elif op == "lte" and val is not None:
-            clause = f"AND {variable} <= $post_max"
-            params["post_max"] = float(val)
-        elif op == "between":
-            clause = f"AND {variable} >= $post_min AND {variable} <= $post_max"
-            params["post_min"] = float(min_val)
-            params["post_max"] = float(max_val)
-            
-        return clause
-    
-    def _search_hotels_generic(self, embedding: List[float], cities: List[str] = None, countries: List[str] = None, top_k: int = 25, rating_filter: dict = None):
-        params = {
-            "index_name": self.index_name,
-            "embedding": embedding,
-            "top_k": top_k,
-            # Fetch more candidates initially to allow for post-filtering
-            "fetch_k": top_k * 5 
-        }
-
-        # 1. Location Clause
-        location_match = "MATCH (c:City)"
-        if cities:
-            location_match = "MATCH (c:City) WHERE toLower(c.name) IN $cities"
-            params["cities"] = [c.lower() for c in cities]
-        elif countries:
-            location_match = """
-            MATCH (co:Country) WHERE toLower(co.name) IN $countries
-            MATCH (c:City)-[:LOCATED_IN]->(co)
-            """
-            params["countries"] = [c.lower() for c in countries]
-
-        # 2. Build Filters
-        # Pre-filter: Node properties (Stars)
-        pre_filter = self._build_pre_filter(rating_filter, params)
-        # Post-filter: Calculated averages (Cleanliness, etc.)
-        post_filter = self._build_post_filter(rating_filter, params)
-
-        # 3. Cypher Query
-        cypher = f"""
-        {location_match}
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c)
-        WHERE h.{self.property_name} IS NOT NULL
-        {pre_filter}
-
-        WITH collect(h) AS hotels
-
-        CALL db.index.vector.queryNodes('{self.index_name}', $fetch_k, $embedding)
-        YIELD node, score
-        WHERE node IN hotels
-
-        MATCH (node)-[:LOCATED_IN]->(c_res:City)-[:LOCATED_IN]->(co_res:Country)
-        OPTIONAL MATCH (node)<-[:REVIEWED]-(r:Review)
-
-        WITH node, score, c_res, co_res, 
-             collect(r.text)[0..3] AS review_texts,
-             avg(r.score_cleanliness) AS avg_cleanliness,
-             avg(r.score_comfort) AS avg_comfort,
-             avg(r.score_facilities) AS avg_facilities,
-             avg(r.score_staff) AS avg_staff,
-             avg(r.score_value_for_money) AS avg_money
-        
-        WHERE true {post_filter}
-
-        RETURN 
-            node {{
-                .*, 
-                avg_score_cleanliness: avg_cleanliness,
-                avg_score_comfort: avg_comfort,
-                avg_score_facilities: avg_facilities,
-                avg_score_staff: avg_staff,
-                avg_score_value_for_money: avg_money
-            }} AS h, 
-            c_res.name AS city_name, 
-            co_res.name AS country_name, 
-            review_texts, 
-            score
-        ORDER BY score DESC
-        LIMIT toInteger(coalesce($top_k, 10))
-
+        group_type, groups = destination_groups(cities, countries, grouped)
+        if group_type:
+            scopes = [{"cities": [grp]} if group_type == "city" else {"countries": [grp]} for grp in groups]
+        else:
+            scopes = [{"cities": cities, "countries": countries}]
+        options = {"pooling": self.review_pooling, "top_n": self.review_top_n}
+
+        rows = []
+        for scope in scopes:
+            if self.embedded:
+                self.db.ensure_review_embeddings(self.property_name, self.encoder)
+                found = self.db.search_reviews(self.property_name, embedding, top_k=top_k,
+                                               rating_filter=rating_filter, **options, **scope)
+            else:
+                cypher, params = build_review_search_query(self.property_name, self.review_index_name, embedding,
+                                                           top_k=top_k, rating_filter=rating_filter,
+                                                           **options, **scope)
+                found = self.db.run_query(cypher, params)
+            for row in found:
+                if group_type:
+                    row["group"] = row["city_name"] if group_type == "city" else row["country_name"]
+                rows.append(row)
+        return rows
+
+    def _hybrid_search(self, query: str, search, embedding: List[float], cities: List[str] = None,
+                       countries: List[str] = None, top_k: int = 10, rating_filter: dict = None, grouped: bool = True):
         """
+        `search` (hotel or review level) fused with the BM25 rankings of the hotel feature
+        text and the reviews by reciprocal-rank fusion, per group for multi-destination
+        queries. Hotels found only lexically come from the index's own hotel rows.
+        Rows keep their vector score as vector_score (None for lexical-only hits) and
+        their BM25 scores as bm25_hotel / bm25_review; score is the fused score.
+        """
+        k = int(top_k) if top_k is not None else 10
+        depth = max(k, HYBRID_DEPTH)
+        dense = search(embedding=embedding, cities=cities, countries=countries, top_k=depth,
+                       rating_filter=rating_filter, grouped=grouped)
+        index = self.lexical_index()
+
+        group_type, groups = destination_groups(cities, countries, grouped)
+        if group_type:
+            scopes = [(grp, {"cities": [grp]} if group_type == "city" else {"countries": [grp]}) for grp in groups]
+        else:
+            scopes = [(None, {"cities": cities, "countries": countries})]
+
+        rows = []
+        for grp, scope in scopes:
+            dense_rows = [row for row in dense if grp is None or name_key(row.get("group")) == name_key(grp)]
+            if index is None:
+                rows.extend(dense_rows[:k])
+                continue
+            by_id = {row["h"]["hotel_id"]: row for row in dense_rows}
+            lexical = index.rankings(query, index.mask(rating_filter=rating_filter, **scope), depth)
+            bm25 = defaultdict(dict)
+            rankings = [list(by_id)]
+            for field, (hotel_rows, scores) in lexical.items():
+                ids = [index.records[i]["h"]["hotel_id"] for i in hotel_rows]
+                rankings.append(ids)
+                for hid, score in zip(ids, scores):
+                    bm25[hid][f"bm25_{field}"] = float(score)
+
+            for hid, fused in reciprocal_rank_fusion(rankings)[:k]:
+                row = by_id.get(hid)
+                if row is None:
+                    row = index.result_row(index.row_of[hid], 0.0)
+                    if group_type:
+                        row["group"] = row["city_name"] if group_type == "city" else row["country_name"]
+                row["vector_score"] = row["score"] if hid in by_id else None
+                row.update({"bm25_hotel": None, "bm25_review": None, **bm25[hid], "score": fused})
+                rows.append(row)
+        return rows
+
+    def embedded_hotel_count(self) -> int:
+        """Hotels carrying this model's vector (cached; the denominator of the filter selectivity)."""
+        if self._embedded_hotel_count is None:
+            rows = self.db.run_query(f"MATCH (h:Hotel) WHERE h.{self.property_name} IS NOT NULL "
+                                     "RETURN count(h) AS total")
+            self._embedded_hotel_count = rows[0]["total"] if rows else 0
+        return self._embedded_hotel_count
+
+    def _search_neo4j(self, embedding: List[float], cities: List[str] = None, countries: List[str] = None,
+                      top_k: int = 25, rating_filter: dict = None, grouped: bool = True):
+        """
+        Filtered search on Neo4j, sized by the scope of the filter:
+        small scopes are scored exactly, larger ones query the vector index with a
+        candidate pool that grows until every group has min(top_k, scope) hotels.
+        """
+        k = int(top_k) if top_k is not None else 10
+        cypher, params = build_scope_count_query(self.property_name, cities=cities, countries=countries,
+                                                 rating_filter=rating_filter, grouped=grouped)
+        scope_sizes = {row["grp"]: row["scope_size"] for row in self.db.run_query(cypher, params)}
+        if not any(scope_sizes.values()):
+            return []
 
-        results = self.db.run_query(cypher, params)
-
-        # 4. Clean Results
-        cleaned_results = []
-        for row in results:
-            if 'h' in row:
-                hotel_props = dict(row['h'])
-                hotel_props.pop('embedding_minilm', None)
-                hotel_props.pop('embedding_bge', None)
-                row['h'] = hotel_props
-            cleaned_results.append(row)
-
-        return cleaned_results
+        def search(**mode):
+            cypher, params = build_hotel_search_query(self.property_name, self.index_name, embedding, cities=cities,
+                                                      countries=countries, top_k=k, rating_filter=rating_filter,
+                                                      grouped=grouped, **mode)
+            # The projection whitelist keeps the vector properties on the server
+            return self.db.run_query(cypher, params)
+
+        if max(scope_sizes.values()) <= EXACT_SCOPE_MAX:
+            return search(exact=True)
+
+        # the most selective group decides how many candidates are needed
+        fetch_k = initial_fetch_k(k, min(scope_sizes.values()), self.embedded_hotel_count())
+        while True:
+            rows = search(fetch_k=fetch_k)
+            found = Counter(name_key(row["group"]) if "group" in row else None for row in rows)
+            if fetch_k >= MAX_FETCH_K or all(found[grp] >= min(k, size) for grp, size in scope_sizes.items()):
+                return rows
+            fetch_k = min(MAX_FETCH_K, fetch_k * FETCH_GROWTH)
  
-    def get_visa_free_countries(self, origin_country: str) -> List[str]:
+    def get_visa_free_countries(self, origin_countries: List[str]) -> List[Dict[str, Any]]:
         """
-        Finds 'Visa Free' countries by looking for the ABSENCE of a 
-        restrictive [:NEEDS_VISA] relationship.
-        """
-        cypher = """
-        MATCH (origin:Country)
-        WHERE toLower(origin.name) = toLower($origin)
-        
-        MATCH (dest:Country)
-        WHERE dest <> origin 
-        
-        AND NOT (origin)-[:NEEDS_VISA]->(dest)
-        
-        RETURN dest.name AS country
+        Finds 'Visa Free' countries for every origin at once, by looking for the
+        ABSENCE of a restrictive [:NEEDS_VISA] relationship.
+        Returns rows tagged with origin_country / destination_country.
         """
+        rows = self.db.run_template("visa_free_countries_by_origin", {"origins": name_keys(origin_countries)})
         
-        params = {"origin": origin_country}
-        results = self.db.run_query(cypher, params)
+        if not rows:
+            print(f"No visa-free countries found for {origin_countries}. (Check if Country nodes exist?)")
         
-        found_countries = [r["country"].lower() for r in results]
-        
-        if not found_countries:
-            print(f"No visa-free countries found for {origin_country}. (Check if Country nodes exist?)")
-        
-        return found_countries
+        return rows
     
-    def search_countries_visa(self, origin_country, embedding):
-        cypher = """
-        MATCH (from:Country {name: $from})
-        MATCH (to:Country)
-        WHERE from <> to
-        OPTIONAL MATCH (from)-[v:NEEDS_VISA]->(to)
-        RETURN
-            from.name AS origin_country,
-            to.name AS destination_country,
-            COALESCE(v.visa_type, 'Visa Free') AS visa_type
-        ORDER BY destination_country
-        """
-        
-        params = {"from": origin_country}
-        return self.db.run_query(cypher, params)
+    def search_countries_visa(self, origin_countries: List[str], embedding):
+        """Visa requirements from each origin to every other country (one query for all origins)."""
+        return self.db.run_template("visa_requirements_by_origin", {"origins": name_keys(origin_countries)})
         
 
     # MAIN ENTRY POINT
     def sem_search_hotels(self, query: str, entities, top_k: int = 10, rating_filter: dict = None, intent: str = "hotel_search"):
     
         embedding = self.encoder.encode(query)
+        entities = get_alias_index().canonicalize(entities)
         top_k = entities.get("limit")
 
         if intent == "visa_query":
-            # Safely get the lists
-            origins = entities.get("origin_country", [])
-            dests = entities.get("destination_country", [])
-
-            # Check if lists are not empty before accessing [0]
-            origin_country = origins[0] if origins else None
-            destination_country = dests[0] if dests else None
-            
-            # The search_visa method likely needs both. If one is missing, return empty.
-            if origin_country and destination_country:
-                return self.search_visa(origin_country, destination_country, embedding, top_k)
-            if origin_country:
-                return self.search_countries_visa(origin_country, embedding)
+            # Every extracted origin / destination is resolved in the same query
+            origins = entities.get("origin_country") or []
+            dests = entities.get("destination_country") or []
+
+            # The search_visa method needs both. If only origins are known, list every destination.
+            if origins and dests:
+                return self.search_visa(origins, dests, embedding, top_k)
+            if origins:
+                return self.search_countries_visa(origins, embedding)
             else:
                 return []
         
@@ -714,23 +980,28 @@ class EmbeddingRetriever:
         cities = entities.get("cities", [])
         countries = entities.get("countries", [])
 
+        # only destinations the user named get top_k each
+        grouped = True
         visa_info_to_add = []
         if intent == "hotel_visa":
-            origin_country = entities.get("origin_country", [None])[0]
+            origins = entities.get("origin_country") or []
             
-            if origin_country:
-                print(f"DEBUG: Processing 'hotel_visa' for origin: {origin_country}")
+            if origins:
+                print(f"DEBUG: Processing 'hotel_visa' for origins: {origins}")
                 
-                allowed_countries = self.get_visa_free_countries(origin_country)
+                visa_free_rows = self.get_visa_free_countries(origins)
                 
-                if allowed_countries:
+                if visa_free_rows:
+                    allowed_countries = sorted({row["destination_country"] for row in visa_free_rows})
                     print(f"DEBUG: Found {len(allowed_countries)} visa-free destinations.")
                     countries = allowed_countries
+                    # the visa-free countries are one scope: top_k hotels across all of them
+                    grouped = bool(cities)
 
-                    for dest in allowed_countries:
+                    for row in visa_free_rows:
                         visa_info_to_add.append({
-                            "origin_country": origin_country,
-                            "destination_country": dest.title(), # Formatting
+                            "origin_country": row["origin_country"],
+                            "destination_country": row["destination_country"],
                             "visa_type": "Visa Free" # Explicit status
                         })
                 else:
@@ -740,12 +1011,19 @@ class EmbeddingRetriever:
                 print("DEBUG: Intent is 'hotel_visa' but no 'origin_country' extracted.")
 
 
-        hotel_results = self._search_hotels_generic(
-            embedding=embedding, 
-            cities=cities, 
-            countries=countries, 
-            top_k=top_k, 
-            rating_filter=rating_filter
-        )
+        search = self._search_reviews_generic if self.search_level == "review" else self._search_hotels_generic
+        if self.hybrid:
+            hotel_results = self._hybrid_search(query, search, embedding=embedding, cities=cities,
+                                                countries=countries, top_k=top_k, rating_filter=rating_filter,
+                                                grouped=grouped)
+        else:
+            hotel_results = search(
+                embedding=embedding, 
+                cities=cities, 
+                countries=countries, 
+                top_k=top_k, 
+                rating_filter=rating_filter,
+                grouped=grouped
+            )
         # The single generic method handles empty lists (Global), single items, or multiple items automatically.
         return hotel_results + visa_info_to_add
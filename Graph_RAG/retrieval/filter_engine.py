@@ -0,0 +1,237 @@
+# Graph_RAG/retrieval/filter_engine.py
+"""
+Compiled rating-filter engine.
+
+Turns normalized rating filters (any category, any operator, one or several
+conditions at once) into ONE parameterized Cypher query over the hotel scores
+materialized at ingestion time (h.star_rating, h.average_reviews_score and
+h.avg_score_<category>, see create_kg.compute_average_category_scores).
+
+Queries are compiled per filter *shape* (which fields, which operators) and
+cached, so the same shape with different values reuses the same Cypher text
+(and therefore the same server-side plan). Values are always bound as params.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from retrieval.query_templates import HOTEL_PROJECTION, LEADERBOARD_FIELDS, leaderboard_key, name_keys
+
+# rating_filter["type"] -> materialized Hotel property
+RATING_FIELDS = {
+    "stars": "star_rating",
+    "score": "average_reviews_score",
+    "reviews": "average_reviews_score",
+    "rating": "average_reviews_score",
+    "cleanliness": "avg_score_cleanliness",
+    "comfort": "avg_score_comfort",
+    "facilities": "avg_score_facilities",
+    "staff": "avg_score_staff",
+    "money": "avg_score_value_for_money",
+    "value_for_money": "avg_score_value_for_money",
+}
+# Unknown (but not "none") filter types fall back to the global review score
+DEFAULT_FIELD = "average_reviews_score"
+
+# Operators that carry values, and the two ranking-only pseudo operators
+# used when the user asks for "best/worst <category>" without a number.
+VALUE_OPERATORS = {"gte", "lte", "between", "eq"}
+RANK_OPERATORS = {"top", "bottom"}
+
+# Transaction timeout for compiled filters (they are index-backed property scans)
+FILTER_TIMEOUT_S = 3.0
+
+
+def normalize_conditions(rating_filter: Any) -> List[Dict[str, Any]]:
+    """
+    Normalize a rating_filter dict (or a list of them) into engine conditions:
+        {"field": <hotel property>, "op": gte|lte|between|eq|top|bottom,
+         "value": float|None, "min": float|None, "max": float|None}
+    Conditions that cannot be evaluated (missing values) are dropped.
+    """
+    filters = rating_filter if isinstance(rating_filter, list) else [rating_filter]
+    conditions = []
+    for rf in filters:
+        if not rf or rf.get("type") in (None, "none"):
+            continue
+        field = RATING_FIELDS.get(rf.get("type"), DEFAULT_FIELD)
+        op = rf.get("operator")
+        value = rf.get("value")
+        # A value of 0 means "not specified" for scores, but is a valid star count
+        has_value = value is not None and (value != 0 or field == "star_rating")
+
+        cond = {"field": field, "op": op, "value": None, "min": None, "max": None}
+        if op == "between" and rf.get("min") is not None and rf.get("max") is not None:
+            cond["min"], cond["max"] = float(rf["min"]), float(rf["max"])
+        elif op in ("gte", "lte", "eq") and has_value:
+            cond["value"] = float(value)
+        elif field != "star_rating" and op in ("gte", None):
+            cond["op"] = "top"
+        elif field != "star_rating" and op == "lte":
+            cond["op"] = "bottom"
+        else:
+            continue
+        conditions.append(cond)
+    return conditions
+
+
+class CompiledFilter:
+    """
+    A compiled filter shape: Cypher text plus the predicate list used to bind
+    parameters (and to evaluate the same filter in-process for InMemoryGraph).
+    """
+    def __init__(self, shape: Tuple[Tuple[str, str], ...]):
+        self.shape = shape
+        self.timeout = FILTER_TIMEOUT_S
+
+        # Ranking: an explicit best/worst condition wins, otherwise sort by the first field (desc)
+        rank = next(((f, op) for f, op in shape if op in RANK_OPERATORS), None)
+        if rank:
+            self.order_field, self.descending = rank[0], rank[1] == "top"
+        else:
+            self.order_field, self.descending = shape[0][0], True
+
+        self.predicates = build_predicates(shape, var="h")
+        where = " AND ".join(self.predicates)
+        # Keyset pagination on (order_field, hotel_id): rows strictly after the previous page's last row
+        seek = "<" if self.descending else ">"
+        keyset = (f"($after_id IS NULL OR h.{self.order_field} {seek} $after_score"
+                  f" OR (h.{self.order_field} = $after_score AND h.hotel_id > $after_id))")
+        self.cypher = f"""
+        MATCH (h:Hotel)
+        WHERE {where}
+          AND {keyset}
+        MATCH (h)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name_key IN $cities)
+          AND ($countries IS NULL OR size($countries) = 0 OR co.name_key IN $countries)
+        RETURN h {{ {HOTEL_PROJECTION}, city: c.name, country: co.name }} AS hotel
+        ORDER BY h.{self.order_field} {"DESC" if self.descending else "ASC"}, h.hotel_id ASC
+        LIMIT toInteger(coalesce($limit, 10))
+    """
+
+    def bind(self, conditions: List[Dict[str, Any]], cities: Optional[List[str]] = None,
+             countries: Optional[List[str]] = None, limit: Optional[int] = None,
+             after: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Parameters for one page; `after` is the decoded cursor ({"score", "id"}) of the previous page."""
+        after = after or {}
+        params = bind_values(conditions)
+        params.update({"cities": name_keys(cities), "countries": name_keys(countries), "limit": limit,
+                       "after_score": after.get("score"), "after_id": after.get("id")})
+        return params
+
+    def matches(self, hotel: Dict[str, Any], params: Dict[str, Any]) -> bool:
+        """Evaluate the compiled predicates against a plain hotel dict (mirrors build_predicates)."""
+        for i, (field, op) in enumerate(self.shape):
+            value = hotel.get(field)
+            if value is None:
+                return False
+            if op == "gte":
+                ok = value >= params[f"f{i}"]
+            elif op == "lte":
+                ok = value <= params[f"f{i}"]
+            elif op == "between":
+                ok = params[f"f{i}_min"] <= value <= params[f"f{i}_max"]
+            elif op == "eq" and _is_averaged(field):
+                ok = params[f"f{i}_min"] <= value < params[f"f{i}_max"]
+            elif op == "eq":
+                ok = value == params[f"f{i}"]
+            else:
+                ok = True
+            if not ok:
+                return False
+        return self._after_cursor(hotel, params)
+
+    def _after_cursor(self, hotel: Dict[str, Any], params: Dict[str, Any]) -> bool:
+        if params.get("after_id") is None:
+            return True
+        value, after = hotel.get(self.order_field), params["after_score"]
+        if value == after:
+            return hotel["hotel_id"] > params["after_id"]
+        return value < after if self.descending else value > after
+
+
+def _is_averaged(field: str) -> bool:
+    return field != "star_rating"
+
+
+def build_predicates(shape: Tuple[Tuple[str, str], ...], var: str = "h") -> List[str]:
+    """
+    One Cypher predicate per condition, written so a range index on the
+    property can serve it. Parameters are named f<i>, f<i>_min, f<i>_max.
+    """
+    predicates = []
+    for i, (field, op) in enumerate(shape):
+        prop = f"{var}.{field}"
+        if op == "gte":
+            predicates.append(f"{prop} >= $f{i}")
+        elif op == "lte":
+            predicates.append(f"{prop} <= $f{i}")
+        elif op == "between":
+            predicates.append(f"{prop} >= $f{i}_min AND {prop} <= $f{i}_max")
+        elif op == "eq" and _is_averaged(field):
+            # floor(x * 10) / 10 = v, rewritten as a range so it stays index-backed
+            predicates.append(f"{prop} >= $f{i}_min AND {prop} < $f{i}_max")
+        elif op == "eq":
+            predicates.append(f"{prop} = $f{i}")
+        else:
+            predicates.append(f"{prop} IS NOT NULL")
+    return predicates
+
+
+def bind_values(conditions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Parameter values matching build_predicates() for the same conditions."""
+    params = {}
+    for i, cond in enumerate(conditions):
+        op = cond["op"]
+        if op in ("gte", "lte"):
+            params[f"f{i}"] = cond["value"]
+        elif op == "between":
+            params[f"f{i}_min"], params[f"f{i}_max"] = cond["min"], cond["max"]
+        elif op == "eq" and _is_averaged(cond["field"]):
+            params[f"f{i}_min"], params[f"f{i}_max"] = cond["value"], cond["value"] + 0.1
+        elif op == "eq":
+            params[f"f{i}"] = cond["value"]
+    return params
+
+
+def leaderboard_for(conditions: List[Dict[str, Any]], cities: Optional[List[str]] = None,
+                    countries: Optional[List[str]] = None) -> Optional[Tuple[str, bool]]:
+    """
+    (leaderboard key, descending) when the filter is a pure best/worst ranking
+    over one precomputed scope (everything, one city or one country), else None.
+    Such filters are answered from the Leaderboard node in O(k).
+    """
+    if len(conditions) != 1 or conditions[0]["op"] not in RANK_OPERATORS:
+        return None
+    category = next((cat for cat, field in LEADERBOARD_FIELDS.items() if field == conditions[0]["field"]), None)
+    if category is None:
+        return None
+    cities, countries = cities or [], countries or []
+    if not cities and not countries:
+        scope = ("global", "all")
+    elif len(cities) == 1 and not countries:
+        scope = ("city", cities[0])
+    elif len(countries) == 1 and not cities:
+        scope = ("country", countries[0])
+    else:
+        return None
+    return leaderboard_key(scope[0], scope[1], category), conditions[0]["op"] == "top"
+
+
+def condition_shape(conditions: List[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((cond["field"], cond["op"]) for cond in conditions)
+
+
+@lru_cache(maxsize=256)
+def _compile(shape: Tuple[Tuple[str, str], ...]) -> CompiledFilter:
+    return CompiledFilter(shape)
+
+
+def compile_filter(conditions: List[Dict[str, Any]]) -> CompiledFilter:
+    """Compile (or fetch from cache) the query for these conditions' shape."""
+    return _compile(condition_shape(conditions))
+
+
+def compile_cache_info():
+    """lru_cache statistics for the compiled query cache."""
+    return _compile.cache_info()
@@ -0,0 +1,228 @@
+# Graph_RAG/retrieval/lexical_index.py
+"""
+BM25 inverted index over hotel feature text and review text.
+
+Dense search misses exact terms: hotel names, "rooftop", "Bosphorus view".
+LexicalIndex keeps two BM25 fields over one shared vocabulary: one document
+per hotel (the build_feature_text of the hotel, the text its embedding is
+made from) and one per review. Postings are stored CSR-style: term t's
+documents are docs[offsets[t]:offsets[t + 1]] with their term frequencies in
+tfs, so a query only touches the postings of its own terms.
+
+A review match scores its hotel with the best matching review. Each field
+gives one ranking of the hotels in scope; EmbeddingRetriever fuses them with
+the vector ranking by reciprocal-rank fusion (HYBRID_SEARCH=1). The index is
+also a HotelScope, so lexical hits are filtered by the same location / rating
+masks as the vector stores and return the same result rows, without another
+Cypher query.
+
+EmbeddingIndexer.build_lexical_index() writes it to LEXICAL_INDEX_DIR
+(default ~/.cache/graph_rag/bm25): meta.json (vocabulary, hotel rows) and
+one .npy file per postings array, loaded memory-mapped. InMemoryGraph builds
+it in process.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from retrieval.feature_builder import build_feature_text
+from retrieval.query_templates import name_key
+from retrieval.vector_store import HotelScope
+
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR",
+                              os.path.join(os.path.expanduser("~"), ".cache", "graph_rag", "bm25"))
+INDEX_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Reciprocal-rank fusion: score = sum over rankings of 1 / (RRF_K + rank)
+RRF_K = 60
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have hotel hotels i in is it me my near of on or our so that the their
+there this to very was we were what which with you your
+""".split())
+
+FIELD_ARRAYS = ("offsets", "docs", "tfs", "lengths")
+
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded, accent-stripped word tokens (same folding as name_key), stopwords dropped."""
+    return [token for token in TOKEN_RE.findall(name_key(text))
+            if token not in STOPWORDS and (len(token) > 1 or token.isdigit())]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], k: int = RRF_K) -> List[Tuple[Any, float]]:
+    """(key, fused score) best first; ties keep the order in which keys first appear."""
+    scores: Dict[Any, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class BM25Field:
+    """Postings of one text field; document i has lengths[i] tokens."""
+
+    def __init__(self, offsets: np.ndarray, docs: np.ndarray, tfs: np.ndarray, lengths: np.ndarray):
+        self.offsets, self.docs, self.tfs, self.lengths = offsets, docs, tfs, lengths
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def build(cls, token_lists: List[List[str]], vocab: Dict[str, int]) -> "BM25Field":
+        postings: List[List[Tuple[int, int]]] = [[] for _ in vocab]
+        for doc, tokens in enumerate(token_lists):
+            for term, tf in Counter(tokens).items():
+                postings[vocab[term]].append((doc, tf))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in postings], out=offsets[1:])
+        total = int(offsets[-1])
+        docs = np.fromiter((doc for p in postings for doc, _ in p), dtype=np.int32, count=total)
+        tfs = np.fromiter((min(tf, 65535) for p in postings for _, tf in p), dtype=np.uint16, count=total)
+        lengths = np.asarray([len(tokens) for tokens in token_lists], dtype=np.int32)
+        return cls(offsets, docs, tfs, lengths)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def scores(self, term_ids: List[int]) -> np.ndarray:
+        """BM25 score of every document (0 = no query term)."""
+        out = np.zeros(len(self), dtype=np.float32)
+        n = len(self)
+        for term in term_ids:
+            lo, hi = int(self.offsets[term]), int(self.offsets[term + 1])
+            if lo == hi:
+                continue
+            docs = self.docs[lo:hi]
+            tf = self.tfs[lo:hi].astype(np.float32)
+            idf = math.log(1.0 + (n - (hi - lo) + 0.5) / ((hi - lo) + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.lengths[docs] / self.avg_length)
+            # a term lists each document once, so plain fancy-index += is safe
+            out[docs] += idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+        return out
+
+
+class LexicalIndex(HotelScope):
+    """BM25 over hotel documents and review documents, filtered like the vector stores."""
+
+    def __init__(self, records: List[Dict[str, Any]], terms: List[str], hotels: BM25Field, reviews: BM25Field,
+                 review_hotel: np.ndarray):
+        """records: one row per hotel (see HotelScope); review_hotel: hotel row of each review document."""
+        super().__init__(records)
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.hotels = hotels
+        self.reviews = reviews
+        self.review_hotel = review_hotel
+
+    @classmethod
+    def build(cls, records: List[Dict[str, Any]], reviews: List[Dict[str, Any]]) -> "LexicalIndex":
+        """records: feature records (as fetch_hotels / feature_records); reviews: {"hotel_id", "text"}."""
+        row_of = {rec["h"]["hotel_id"]: i for i, rec in enumerate(records)}
+        reviews = [review for review in reviews if review["hotel_id"] in row_of]
+        hotel_tokens = [tokenize(build_feature_text(rec)) for rec in records]
+        review_tokens = [tokenize(review["text"]) for review in reviews]
+
+        terms = sorted({token for tokens in hotel_tokens + review_tokens for token in tokens})
+        vocab = {term: i for i, term in enumerate(terms)}
+        review_hotel = np.asarray([row_of[review["hotel_id"]] for review in reviews], dtype=np.int32)
+        return cls(records, terms, BM25Field.build(hotel_tokens, vocab), BM25Field.build(review_tokens, vocab),
+                   review_hotel)
+
+    # ------------------------------------------------------------------
+    # Disk format
+    # ------------------------------------------------------------------
+    def save(self, path: str = LEXICAL_INDEX_DIR):
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name, field in (("hotels", self.hotels), ("reviews", self.reviews)):
+            for array in FIELD_ARRAYS:
+                np.save(os.path.join(path, f"{name}.{array}.npy"), getattr(field, array))
+        np.save(os.path.join(path, "reviews.hotels.npy"), self.review_hotel)
+        # meta.json last: a half-written index is never picked up by load()
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "terms": self.terms,
+                       "records": [{k: rec[k] for k in ("h", "city_name", "country_name", "review_texts")}
+                                   for rec in self.records]}, f, default=str)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_DIR) -> Optional["LexicalIndex"]:
+        """The index saved under `path` (postings memory-mapped), or None if there is none."""
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            print(f"LexicalIndex: {path} has format {meta.get('version')}, expected {INDEX_VERSION}; rebuild it")
+            return None
+
+        def array(name):
+            file_name = os.path.join(path, f"{name}.npy")
+            try:
+                return np.load(file_name, mmap_mode="r")
+            except ValueError:  # empty arrays cannot be memory-mapped
+                return np.load(file_name)
+
+        def field(name):
+            return BM25Field(*(array(f"{name}.{part}") for part in FIELD_ARRAYS))
+
+        return cls(meta["records"], meta["terms"], field("hotels"), field("reviews"), array("reviews.hotels"))
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def term_ids(self, query: str) -> List[int]:
+        return sorted({self.vocab[token] for token in tokenize(query) if token in self.vocab})
+
+    @staticmethod
+    def _top(scores: np.ndarray, allowed: np.ndarray, depth: int):
+        rows = np.flatnonzero(allowed & (scores > 0))
+        if len(rows) > depth:
+            rows = rows[np.argpartition(-scores[rows], depth - 1)[:depth]]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return rows, scores[rows]
+
+    def rankings(self, query: str, allowed: Optional[np.ndarray] = None,
+                 depth: int = 50) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        {"hotel" | "review": (hotel rows, BM25 scores)}: per field, the `depth` best
+        allowed hotels matching at least one query term, best first. A hotel's review
+        score is that of its best matching review.
+        """
+        term_ids = self.term_ids(query)
+        if not term_ids or not len(self):
+            return {}
+        allowed = allowed if allowed is not None else np.ones(len(self), dtype=bool)
+
+        out = {"hotel": self._top(self.hotels.scores(term_ids), allowed, depth)}
+        review_scores = self.reviews.scores(term_ids)
+        matched = np.flatnonzero(review_scores)
+        by_hotel = np.zeros(len(self), dtype=np.float32)
+        np.maximum.at(by_hotel, self.review_hotel[matched], review_scores[matched])
+        out["review"] = self._top(by_hotel, allowed, depth)
+        return out
+
+    def search(self, query: str, cities: List[str] = None, countries: List[str] = None, top_k: int = 10,
+               rating_filter: dict = None) -> List[Dict[str, Any]]:
+        """Lexical-only search: both fields fused by RRF, rows shaped like VectorStore.search."""
+        k = int(top_k) if top_k is not None else 10
+        ranked = self.rankings(query, self.mask(cities, countries, rating_filter), depth=k)
+        fused = reciprocal_rank_fusion([rows.tolist() for rows, _ in ranked.values()])
+        return [self.result_row(row, score) for row, score in fused[:k]]
+
+
+@lru_cache(maxsize=None)
+def load_lexical_index(path: str = LEXICAL_INDEX_DIR) -> Optional[LexicalIndex]:
+    """Process-wide copy of the index saved under `path` (see EmbeddingIndexer.build_lexical_index)."""
+    return LexicalIndex.load(path)
@@ -0,0 +1,49 @@
+# Graph_RAG/retrieval/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe string wrapping the sort key of the last row
+of the previous page, e.g. {"score": 8.7, "id": 12} for hotel lists ordered by
+(score DESC, hotel_id ASC), or {"date": "2024-05-01", "id": 991} for reviews
+ordered by (date DESC, review_id DESC). The next page is then a range seek
+("rows after this key") instead of OFFSET, so every page costs O(page size).
+Precomputed leaderboards are plain lists and page by {"offset": n}.
+"""
+
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Dict[str, Any]:
+    """Cursor values, or {} for no cursor / an unreadable one (i.e. start from the first page)."""
+    if not cursor:
+        return {}
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        print("Ignoring invalid pagination cursor:", cursor)
+        return {}
+    return values if isinstance(values, dict) else {}
+
+
+def keyset_params(after: Dict[str, Any], key: str = "score") -> Dict[str, Any]:
+    """Template parameters for a keyset page ($after_<key>, $after_id); None on the first page."""
+    return {f"after_{key}": after.get(key), "after_id": after.get("id")}
+
+
+def split_page(rows: List[Dict[str, Any]], page_size: int,
+               next_key: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Queries fetch page_size + 1 rows: the extra row only tells whether another
+    page exists. Returns (page rows, cursor for the next page or None).
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    page = rows[:page_size]
+    return page, encode_cursor(next_key(page[-1]))
@@ -4,14 +4,106 @@
 A small library of Cypher templates for the hotel theme.
 Add/extend these templates as your KG evolves.
 Parameters are provided as dicts when executing queries.
+City / country / hotel names are matched on their `name_key` property: pass
+name_key() values ($cities, $countries, $origins, $destinations, $hotels).
 """
 
+import unicodedata
+
+# Scalar Hotel properties returned by every hotel projection. They are listed
+# explicitly instead of `h { .* }` so the embedding_minilm / embedding_bge
+# vectors never leave the server. Add new scalar hotel properties here.
+HOTEL_PROPERTIES = [
+    "hotel_id",
+    "name",
+    "star_rating",
+    "average_reviews_score",
+    "cleanliness_base",
+    "comfort_base",
+    "facilities_base",
+    # per traveller type averages (compute_average_score_by_traveller_type)
+    "avg_score_solo",
+    "avg_score_couple",
+    "avg_score_family",
+    "avg_score_business",
+    # per category averages (compute_average_category_scores), used by filter_engine
+    "avg_score_cleanliness",
+    "avg_score_comfort",
+    "avg_score_facilities",
+    "avg_score_staff",
+    "avg_score_value_for_money",
+]
+HOTEL_PROJECTION = ", ".join("." + prop for prop in HOTEL_PROPERTIES)
+
+# Precomputed leaderboards (create_kg.build_leaderboards): one (:Leaderboard)
+# node per scope and category holding hotel_ids / scores ordered best-first
+# (score DESC, hotel_id ASC). Scopes are "global" (scope "all"), "city" and "country".
+LEADERBOARD_FIELDS = {
+    "overall": "average_reviews_score",
+    "cleanliness": "avg_score_cleanliness",
+    "comfort": "avg_score_comfort",
+    "facilities": "avg_score_facilities",
+    "staff": "avg_score_staff",
+    "value_for_money": "avg_score_value_for_money",
+}
+
+
+def leaderboard_key(scope_type: str, scope: str, category: str) -> str:
+    """Key of a Leaderboard node, e.g. "city:Paris:cleanliness" or "global:all:overall"."""
+    return f"{scope_type}:{scope}:{category}"
+
+
+# Traveller-segment cube (create_kg.build_segment_cube): (:SegmentScore) cells per
+# hotel x traveller_type x age_group x gender, lower-case values, SEGMENT_ANY = roll-up.
+SEGMENT_ANY = "any"
+
+
+def name_key(name) -> str:
+    """Canonical match key of a city / country / hotel name: case-folded, accents stripped, single-spaced."""
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+def name_keys(names) -> list:
+    return [name_key(name) for name in names or []]
+
+
+def is_multi_destination(cities=None, countries=None) -> bool:
+    """Several destinations requested: retrieve the top k per destination instead of k overall."""
+    return len(cities or []) + len(countries or []) > 1
+
+
+def segment_params(traveller_type=None, age_group=None, gender=None) -> dict:
+    """Cube coordinates for a (possibly partial) segment; missing dimensions roll up to SEGMENT_ANY."""
+    if isinstance(gender, list):
+        # several genders mentioned (group travel) -> no single gender cell
+        gender = gender[0] if len(gender) == 1 else None
+    return {
+        "traveller_type": traveller_type.lower() if traveller_type else SEGMENT_ANY,
+        "age_group": age_group.lower() if age_group else SEGMENT_ANY,
+        "gender": gender.lower() if gender else SEGMENT_ANY,
+    }
+
+
+# Featured reviews (create_kg.build_featured_reviews): every hotel keeps
+# (h)-[:FEATURED_REVIEW {rank, kind}]->(r) edges to its latest review (rank 0)
+# and to the reviews whose overall score is closest to the hotel average.
+# Readers go through these few edges instead of the hotel's full review history.
+FEATURED_REVIEWS = 3
+
+
+def featured_review_texts(var: str = "h") -> str:
+    """Cypher expression: featured review texts of hotel `var`, latest first."""
+    return f"COLLECT {{ MATCH ({var})-[f:FEATURED_REVIEW]->(fr:Review) RETURN fr.text ORDER BY f.rank }}"
+
+
 QUERY_TEMPLATES = {
     # Basic hotel search by city
     "hotel_search_by_city": """
         MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)
-        WHERE c.name IN $cities
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name } AS hotel
+        WHERE c.name_key IN $cities
+        RETURN h { {hotel_props}, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name } AS hotel
         ORDER BY c.name, h.average_reviews_score DESC
         LIMIT toInteger(coalesce($limit, 10))
     """,
@@ -19,105 +111,109 @@ QUERY_TEMPLATES = {
     # Search hotels by country
     "hotel_search_by_country": """
         MATCH (h:Hotel)-[:LOCATED_IN]->(:City)-[:LOCATED_IN]->(co:Country)
-        WHERE co.name IN $countries
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, country: co.name } AS hotel        
-        ORDER BY h.average_reviews_score DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # Search hotels with minimum average rating
-    "hotel_search_min_rating": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE h.average_reviews_score >= $rating
-        AND ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name , country: co.name } AS hotel
+        WHERE co.name_key IN $countries
+        RETURN h { {hotel_props}, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, country: co.name } AS hotel        
         ORDER BY h.average_reviews_score DESC
         LIMIT toInteger(coalesce($limit, 10))
     """,
-    # Search hotels with minimum star rating
-    "hotel_search_min_stars": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE h.star_rating >= $stars
-        AND ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name, country: co.name } AS hotel
-        ORDER BY h.star_rating DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
 
     # Search hotels with minimum average score
     "hotel_search_min_avg_score": """
         MATCH (h:Hotel)
         WHERE h.average_reviews_score >= $min_score
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score } AS hotel
+        RETURN h { {hotel_props}, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score } AS hotel
         ORDER BY h.average_reviews_score DESC
         LIMIT toInteger(coalesce($limit, 10))
     """,
 
-    # Get reviews for a specific hotel (by exact name or id)
+    # Get reviews for specific hotels (by exact name), one row per hotel in $hotels
+    # Latest review = featured review of rank 0; review_texts = the whole featured set
     "hotel_reviews_by_name": """
-    MATCH (r:Review)-[:REVIEWED]->(h:Hotel {name: $hotel})
-    -[:LOCATED_IN]->(c:City)
-    -[:LOCATED_IN]->(co:Country)
-
-    WITH h, c, co, 
-         avg(r.score_overall) AS avg_score, 
-         avg(r.score_cleanliness) AS avg_cleanliness,
-         avg(r.score_comfort) AS avg_comfort,
-         avg(r.score_facilities) AS avg_facilities,
-         avg(r.score_staff) AS avg_staff,
-         avg(r.score_value_for_money) AS avg_money,
-         collect(r) AS reviews
-
-    UNWIND reviews AS r
-    WITH h, c, co, avg_score, avg_cleanliness, avg_comfort, avg_facilities, avg_staff, avg_money, r
-    ORDER BY r.date DESC
-    LIMIT 1
+    UNWIND $hotels AS hotel
+    MATCH (h:Hotel {name_key: hotel})-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+    MATCH (h)-[:FEATURED_REVIEW {rank: 0}]->(r:Review)
 
     RETURN
         h.name AS hotel_name,
         r.review_id AS latest_review_id,
         r.text AS latest_review_text,
-        avg_score AS total_avg_score,
-        avg_cleanliness AS avg_score_cleanliness,
-        avg_comfort AS avg_score_comfort,
-        avg_facilities AS avg_score_facilities,
-        avg_staff AS avg_score_staff,
-        avg_money AS avg_score_value_for_money,
+        h.average_reviews_score AS total_avg_score,
+        h.avg_score_cleanliness AS avg_score_cleanliness,
+        h.avg_score_comfort AS avg_score_comfort,
+        h.avg_score_facilities AS avg_score_facilities,
+        h.avg_score_staff AS avg_score_staff,
+        h.avg_score_value_for_money AS avg_score_value_for_money,
         r.date AS date,
         c.name AS city,
-        co.name AS country
+        co.name AS country,
+        {featured_reviews} AS review_texts
     """,
 
+    # Review browsing, newest first. Keyset-paginated on (date, review_id):
+    # pass the last row's values as $after_date / $after_id (None for the first page).
+    # Served by the (hotel_id, date) composite index on Review.
     "hotel_reviews_by_id": """
-        MATCH (r:Review)-[:REVIEWED]->(h:Hotel {hotel_id: $hotel_id})
+        MATCH (r:Review)
+        WHERE r.hotel_id = $hotel_id
+          AND ($after_id IS NULL OR r.date < $after_date OR (r.date = $after_date AND r.review_id < $after_id))
         RETURN r.review_id AS review_id, r.text AS text, r.score_overall AS score, r.date AS date
-        ORDER BY r.date DESC
+        ORDER BY r.date DESC, r.review_id DESC
         LIMIT toInteger(coalesce($limit, 10))
     """,
 
     # Recommend hotels based on traveller type (simple co-occurrence)
+    # Reads the roll-up cell of the segment cube instead of every STAYED_AT edge
     "recommend_hotels_by_traveller_type": """
-        MATCH (t:Traveller {type: $traveller_type})-[:STAYED_AT]->(h:Hotel)
-        WITH h, count(*) AS freq, h.average_reviews_score AS avgScore
-        ORDER BY freq DESC, avgScore DESC
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, average_reviews_score: avgScore } AS hotel,
-            freq
+        MATCH (s:SegmentScore {traveller_type: toLower($traveller_type), age_group: 'any', gender: 'any'})
+        MATCH (s)-[:SEGMENT_OF]->(h:Hotel)
+        RETURN h { {hotel_props}, segment_score: s.avg_overall, segment_reviews: s.reviews } AS hotel,
+            s.travellers AS freq
+        ORDER BY s.travellers DESC, s.avg_overall DESC
+        LIMIT toInteger(coalesce($limit, 10))
+    """,
+
+    # Recommend hotels for a traveller segment (type x age group x gender, see segment_params)
+    "recommend_hotels_by_segment": """
+        MATCH (s:SegmentScore {traveller_type: $traveller_type, age_group: $age_group, gender: $gender})
+        MATCH (s)-[:SEGMENT_OF]->(h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name_key IN $cities)
+        AND ($countries IS NULL OR size($countries) = 0 OR co.name_key IN $countries)
+        RETURN h { {hotel_props}, city: c.name, country: co.name,
+                   segment_score: s.avg_overall, segment_reviews: s.reviews,
+                   segment_cleanliness: s.avg_cleanliness, segment_comfort: s.avg_comfort,
+                   segment_facilities: s.avg_facilities, segment_location: s.avg_location,
+                   segment_staff: s.avg_staff, segment_value_for_money: s.avg_value_for_money } AS hotel,
+            s.travellers AS freq
+        ORDER BY s.travellers DESC, s.avg_overall DESC
         LIMIT toInteger(coalesce($limit, 10))
     """,
 
 
     # Visa requirement between two countries
+    # Every origin x destination pair in one round trip ($origins, $destinations are lists)
     "visa_requirements": """
-        MATCH (from:Country {name:$from})-[v:NEEDS_VISA]->(to:Country {name:$to})
+        UNWIND $origins AS origin
+        UNWIND $destinations AS destination
+        MATCH (from:Country {name_key: origin})
+        MATCH (to:Country {name_key: destination})
+        WHERE from <> to
+        OPTIONAL MATCH (from)-[v:NEEDS_VISA]->(to)
         RETURN from.name AS origin_country, 
                to.name AS destination_country, 
-               v.visa_type AS visa_type
+               COALESCE(v.visa_type, 'Visa Free') AS visa_type
     """,
-    # Visa requirements by origin country
+    # Alias table (create_kg.load_aliases): ISO codes, official names, demonyms and
+    # variants of KG countries / cities. $aliases are name_key() values; one row per match.
+    # Retrieval resolves the same table locally (preprocessing.alias_index).
+    "resolve_location_aliases": """
+        UNWIND $aliases AS alias
+        MATCH (a:Alias {key: alias})-[:ALIAS_OF]->(n)
+        RETURN alias, a.kind AS kind, n.name AS canonical
+    """,
+    # Visa requirements by origin country (one block of rows per entry of $origins)
         "visa_requirements_by_origin": """
-            MATCH (from:Country {name: $from})
+            UNWIND $origins AS origin
+            MATCH (from:Country {name_key: origin})
             MATCH (to:Country)
             WHERE from <> to
             OPTIONAL MATCH (from)-[v:NEEDS_VISA]->(to)
@@ -125,12 +221,13 @@ QUERY_TEMPLATES = {
                 from.name AS origin_country,
                 to.name AS destination_country,
                 COALESCE(v.visa_type, 'Visa Free') AS visa_type
-            ORDER BY destination_country
+            ORDER BY origin_country, destination_country
 
         """,
-    # Countries that do NOT require a visa from the origin
+    # Countries that do NOT require a visa from the origin(s)
         "visa_free_countries_by_origin": """
-        MATCH (origin:Country {name: $from})
+        UNWIND $origins AS origin_name
+        MATCH (origin:Country {name_key: origin_name})
         MATCH (dest:Country)
         WHERE dest <> origin
         AND NOT (origin)-[:NEEDS_VISA]->(dest)
@@ -138,730 +235,191 @@ QUERY_TEMPLATES = {
             origin.name AS origin_country,
             dest.name AS destination_country,
             "Visa Free" AS visa_type
-        ORDER BY destination_country
+        ORDER BY origin_country, destination_country
     """,
 
 
     # Hotels that match a textual search (exact name substring)
+    # Up to $limit matches per name in $names ({name, key} maps, key = name_key(name));
+    # each hotel is tagged with the name it matched.
+    # CONTAINS on name_key is served by the hotel_name_key_text index.
     "hotel_by_name_substring": """
-        MATCH (h:Hotel)
-        WHERE toLower(h.name) CONTAINS toLower($q)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, average_reviews_score: h.average_reviews_score } AS hotel
-        ORDER BY h.average_reviews_score DESC
-        LIMIT toInteger(coalesce($limit, 10))
+        UNWIND $names AS entity
+        CALL {
+            WITH entity
+            MATCH (h:Hotel)
+            WHERE h.name_key CONTAINS entity.key
+            RETURN h
+            ORDER BY h.average_reviews_score DESC
+            LIMIT toInteger(coalesce($limit, 10))
+        }
+        RETURN h { {hotel_props}, hotel_id: h.hotel_id, name: h.name, average_reviews_score: h.average_reviews_score, entity: entity.name } AS hotel
     """,
 
     # Top N hotels overall
     "top_hotels": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, city: c.name, country: co.name, average_reviews_score: h.average_reviews_score } AS hotel
-        ORDER BY h.average_reviews_score DESC
-        LIMIT toInteger(coalesce($limit, 10))
+        MATCH (l:Leaderboard {key: 'global:all:overall'})
+        WITH l, toInteger(coalesce($offset, 0)) AS o
+        WITH l.hotel_ids[o..o + toInteger(coalesce($limit, 10))] AS ids
+        UNWIND range(0, size(ids) - 1) AS i
+        MATCH (h:Hotel {hotel_id: ids[i]})-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+        RETURN h { {hotel_props}, city: c.name, country: co.name } AS hotel
+        ORDER BY i
+    """,
+
+    # Top/bottom k of a precomputed leaderboard (see LEADERBOARD_FIELDS / leaderboard_key).
+    # Reads k entries of one node instead of sorting every hotel in scope.
+    # $offset pages through the list (0 = best/worst first).
+    "hotel_leaderboard": """
+        MATCH (l:Leaderboard {key: $key})
+        WITH l, toInteger(coalesce($limit, 10)) AS k, toInteger(coalesce($offset, 0)) AS o, size(l.hotel_ids) AS n
+        WHERE k > 0 AND o < n
+        WITH CASE WHEN coalesce($descending, true)
+            THEN l.hotel_ids[o..o + k]
+            ELSE reverse(l.hotel_ids[CASE WHEN n - o - k < 0 THEN 0 ELSE n - o - k END..n - o])
+        END AS ids
+        UNWIND range(0, size(ids) - 1) AS i
+        MATCH (h:Hotel {hotel_id: ids[i]})-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+        RETURN h { {hotel_props}, city: c.name, country: co.name } AS hotel
+        ORDER BY i
     """,
 
     # Hotel details by id
     "hotel_details_by_id": """
         MATCH (h:Hotel {hotel_id: $hotel_id})-[:LOCATED_IN]->(city:City)-[:LOCATED_IN]->(co:Country)
-        RETURN h, city.name AS city, co.name AS country
+        RETURN h { {hotel_props} } AS h, city.name AS city, co.name AS country
         LIMIT 1
     """,
 
-    # Best hotel overall based on average rating
-    "best_hotel_overall": """
-        MATCH (h:Hotel)
-        WHERE h.average_reviews_score IS NOT NULL
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score } AS hotel
-        ORDER BY h.average_reviews_score DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # Search hotels by city or country
-    "hotel_search_by_city_or_country": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE c.name IN $cities
-        OR co.name IN $countries
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, city: c.name, country: co.name, average_reviews_score: h.average_reviews_score } AS hotel
-        ORDER BY h.average_reviews_score DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # rating range (min AND max)
-    "hotel_search_rating_range": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE h.average_reviews_score >= $min AND h.average_reviews_score <= $max
-        AND ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name } AS hotel
-        ORDER BY h.average_reviews_score DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-        
-    "hotel_search_stars_range": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE h.star_rating >= $min AND h.star_rating <= $max
-        AND ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name } AS hotel
-        ORDER BY h.star_rating DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-
-    # rating less-or-equal (upper bound)
-    "hotel_search_max_rating": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE h.average_reviews_score <= $max
-        AND ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name } AS hotel
-        ORDER BY h.average_reviews_score DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # star rating less-or-equal (upper bound)
-    "hotel_search_max_stars": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE h.star_rating <= $max
-        AND ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name } AS hotel
-        ORDER BY h.star_rating DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-
-    # exact rating
-    "hotel_search_exact_rating": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE floor(h.average_reviews_score * 10) / 10 = $value AND ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities) AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score } AS hotel
-        ORDER BY h.average_reviews_score DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # exact star rating
-    "hotel_search_exact_stars": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        WHERE h.star_rating = $value
-        AND ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating, average_reviews_score: h.average_reviews_score, city: c.name ,country: co.name} AS hotel
-        ORDER BY h.star_rating DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-        # Search hotels with minimum average cleanliness score (ratings are on Rating nodes)
-    "hotel_search_min_cleanliness": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-          AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_cleanliness) AS avg_cleanliness
-        WHERE avg_cleanliness >= $rating
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating,
-                   average_reviews_score: h.average_reviews_score, avg_score_cleanliness: avg_cleanliness, city: c.name , country: co.name} AS hotel
-        ORDER BY avg_cleanliness DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # Search hotels with maximum average cleanliness score (upper bound)
-    "hotel_search_max_cleanliness": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-          AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_cleanliness) AS avg_cleanliness
-        WHERE avg_cleanliness <= $max
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating,
-                   average_reviews_score: h.average_reviews_score, avg_score_cleanliness: avg_cleanliness, city: c.name ,country: co.name} AS hotel
-        ORDER BY avg_cleanliness DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # Search hotels with cleanliness avg in a range
-    "hotel_search_cleanliness_range": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-          AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_cleanliness) AS avg_cleanliness
-        WHERE avg_cleanliness >= $min AND avg_cleanliness <= $max
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating,
-                   average_reviews_score: h.average_reviews_score, avg_score_cleanliness: avg_cleanliness, city: c.name ,country: co.name} AS hotel
-        ORDER BY avg_cleanliness DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # Search hotels with exact average cleanliness value
-    "hotel_search_exact_cleanliness": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-          AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_cleanliness) AS avg_cleanliness
-        WHERE floor(avg_cleanliness * 10) / 10 = $value
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating,
-                   average_reviews_score: h.average_reviews_score, avg_score_cleanliness: avg_cleanliness, city: c.name,country: co.name } AS hotel
-        ORDER BY avg_cleanliness DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # hotels with highest cleanliness ratings
-
-    "top_hotel_cleanliness": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, avg(r.score_cleanliness) AS avg_cleanliness, co
-        WHERE avg_cleanliness IS NOT NULL
-        RETURN h {
-            .*, 
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_cleanliness: avg_cleanliness,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_cleanliness DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # hotels with lowest cleanliness ratings
-    "worst_hotel_cleanliness": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, avg(r.score_cleanliness) AS avg_cleanliness, co
-        WHERE avg_cleanliness IS NOT NULL
-        RETURN h {
-            .*, 
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_cleanliness: avg_cleanliness,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_cleanliness ASC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # hotels with lowest ratings
-    "worst_hotels": """
-        MATCH (h:Hotel)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, average_reviews_score: h.average_reviews_score } AS hotel
-        ORDER BY h.average_reviews_score ASC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-        # Search hotels with minimum average comfort score
-    "hotel_search_min_comfort": """
+    # Every hotel embedded under one model property, with the same row shape as the
+    # vector search (VectorStore.from_graph). Bulk load: one row per hotel.
+    "hotel_vectors": """
         MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-          AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_comfort) AS avg_comfort
-        WHERE avg_comfort >= $rating
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating,
-                   average_reviews_score: h.average_reviews_score, avg_score_comfort: avg_comfort, city: c.name, country: co.name } AS hotel
-        ORDER BY avg_comfort DESC
-        LIMIT toInteger(coalesce($limit, 10))
+        WHERE h[$property] IS NOT NULL
+        RETURN h { {hotel_props} } AS h, h[$property] AS embedding, c.name AS city_name, co.name AS country_name,
+               {featured_reviews} AS review_texts
+        ORDER BY h.hotel_id
     """,
 
-    # upper bound comfort
-    "hotel_search_max_comfort": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-          AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_comfort) AS avg_comfort
-        WHERE avg_comfort <= $max
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating,
-                   average_reviews_score: h.average_reviews_score, avg_score_comfort: avg_comfort, city: c.name,country: co.name } AS hotel
-        ORDER BY avg_comfort DESC
-        LIMIT toInteger(coalesce($limit, 10))
+    # Hotel rows for a list of ids, in the same shape (VectorStore.from_sidecar:
+    # vectors kept outside the graph). Unique-constraint seek per id.
+    "hotel_records": """
+        UNWIND $hotel_ids AS id
+        MATCH (h:Hotel {hotel_id: id})-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+        RETURN h { {hotel_props} } AS h, c.name AS city_name, co.name AS country_name,
+               {featured_reviews} AS review_texts
     """,
 
-    # comfort range
-    "hotel_search_comfort_range": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-          AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_comfort) AS avg_comfort
-        WHERE avg_comfort >= $min AND avg_comfort <= $max
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating,
-                   average_reviews_score: h.average_reviews_score, avg_score_comfort: avg_comfort, city: c.name,country: co.name } AS hotel
-        ORDER BY avg_comfort DESC
-        LIMIT toInteger(coalesce($limit, 10))
+    # Best hotel overall based on average rating
+    "best_hotel_overall": """
+        MATCH (l:Leaderboard {key: 'global:all:overall'})
+        WITH l.hotel_ids[0..toInteger(coalesce($limit, 10))] AS ids
+        UNWIND range(0, size(ids) - 1) AS i
+        MATCH (h:Hotel {hotel_id: ids[i]})
+        RETURN h { {hotel_props} } AS hotel
+        ORDER BY i
     """,
 
-    # exact comfort match
-    "hotel_search_exact_comfort": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-          AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_comfort) AS avg_comfort
-        WHERE floor(avg_comfort * 10) / 10 = $value
-        RETURN h { .*, hotel_id: h.hotel_id, name: h.name, star_rating: h.star_rating,
-                   average_reviews_score: h.average_reviews_score, avg_score_comfort: avg_comfort, city: c.name,country: co.name } AS hotel
-        ORDER BY avg_comfort DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # hotels with highest comfort ratings
-    "top_hotel_comfort": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, avg(r.score_comfort) AS avg_comfort , co
-        WHERE avg_comfort IS NOT NULL
-        RETURN h {
-            .*, 
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_comfort: avg_comfort,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_comfort DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # hotels with lowest comfort ratings
-    "worst_hotel_comfort": """
+    # Search hotels by city or country
+    # Keyset-paginated on (score DESC, hotel_id ASC): pass the last row's
+    # $after_score / $after_id to get the next page (None for the first page).
+    "hotel_search_by_city_or_country": """
         MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, avg(r.score_comfort) AS avg_comfort , co
-        WHERE avg_comfort IS NOT NULL
-        RETURN h {
-            .*, 
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_comfort: avg_comfort,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_comfort ASC
-        LIMIT toInteger(coalesce($limit, 10))
+        WHERE (c.name_key IN $cities OR co.name_key IN $countries)
+          AND ($after_id IS NULL
+               OR coalesce(h.average_reviews_score, 0.0) < $after_score
+               OR (coalesce(h.average_reviews_score, 0.0) = $after_score AND h.hotel_id > $after_id))
+        RETURN h { {hotel_props}, hotel_id: h.hotel_id, name: h.name, city: c.name, country: co.name, average_reviews_score: h.average_reviews_score } AS hotel
+        ORDER BY coalesce(h.average_reviews_score, 0.0) DESC, h.hotel_id ASC
+        LIMIT toInteger(coalesce($limit, 10))
+    """,
+
+
+    # Grouped mode for multi-destination searches: top $limit hotels PER city and
+    # PER country (one subquery per group), so one popular destination cannot
+    # crowd out the others. Rows are tagged with their group.
+    "hotel_search_top_k_per_group": """
+        UNWIND coalesce($cities, []) AS grp
+        CALL {
+            WITH grp
+            MATCH (h:Hotel)-[:LOCATED_IN]->(c:City {name_key: grp})-[:LOCATED_IN]->(co:Country)
+            RETURN h, c, co
+            ORDER BY coalesce(h.average_reviews_score, 0.0) DESC, h.hotel_id ASC
+            LIMIT toInteger(coalesce($limit, 10))
+        }
+        RETURN h { {hotel_props}, city: c.name, country: co.name, group: c.name, group_type: 'city' } AS hotel
+        UNION ALL
+        UNWIND coalesce($countries, []) AS grp
+        CALL {
+            WITH grp
+            MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country {name_key: grp})
+            RETURN h, c, co
+            ORDER BY coalesce(h.average_reviews_score, 0.0) DESC, h.hotel_id ASC
+            LIMIT toInteger(coalesce($limit, 10))
+        }
+        RETURN h { {hotel_props}, city: c.name, country: co.name, group: co.name, group_type: 'country' } AS hotel
     """,
 
-
     # Find hotels in countries that do NOT require a visa from the origin
+    # Hotels reachable visa-free from any of $origins; visa_free_for lists which origins
     "hotel_search_visa_free": """
-        MATCH (origin:Country)
-        WHERE toLower(origin.name) = toLower($origin)
+        UNWIND $origins AS origin_name
+        MATCH (origin:Country {name_key: origin_name})
         
         MATCH (dest:Country)
         WHERE dest <> origin
         AND NOT (origin)-[:NEEDS_VISA]->(dest)
         
         MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(dest)
+        WITH h, c, dest, collect(origin.name) AS visa_free_for
         
         RETURN h { 
-            .*, 
+            {hotel_props}, 
             hotel_id: h.hotel_id, 
             name: h.name, 
             average_reviews_score: h.average_reviews_score,
             city: c.name,
             country: dest.name,
-            visa_status: "Visa Free" 
+            visa_status: "Visa Free",
+            visa_free_for: visa_free_for
         } AS hotel
         ORDER BY h.average_reviews_score DESC
         LIMIT toInteger(coalesce($limit, 10))
     """,
-    # Search hotels with minimum average facilities score
-    "hotel_search_min_facilities": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_facilities) AS avg_facilities
-        WHERE avg_facilities >= $rating
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_facilities: avg_facilities,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_facilities DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # Search hotels with maximum average facilities score
-    "hotel_search_max_facilities": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_facilities) AS avg_facilities
-        WHERE avg_facilities <= $max
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_facilities: avg_facilities,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_facilities DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
 
-    # Search hotels with facilities avg in a range
-    "hotel_search_facilities_range": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_facilities) AS avg_facilities
-        WHERE avg_facilities >= $min AND avg_facilities <= $max
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_facilities: avg_facilities,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_facilities DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-
-    # Search hotels with exact average facilities value
-    "hotel_search_exact_facilities": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_facilities) AS avg_facilities
-        WHERE floor(avg_facilities * 10) / 10 = $value
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_facilities: avg_facilities,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_facilities DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
+}
 
-    # Hotels with highest facilities ratings
-    "top_hotel_facilities": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, avg(r.score_facilities) AS avg_facilities , co
-        WHERE avg_facilities IS NOT NULL
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_facilities: avg_facilities,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_facilities DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
+# Expand the hotel property whitelist into every `h { {hotel_props}, ... }` projection
+QUERY_TEMPLATES = {
+    key: cypher.replace("{hotel_props}", HOTEL_PROJECTION).replace("{featured_reviews}", featured_review_texts("h"))
+    for key, cypher in QUERY_TEMPLATES.items()
+}
 
-    # Hotels with lowest facilities ratings
-    "worst_hotel_facilities": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, avg(r.score_facilities) AS avg_facilities , co
-        WHERE avg_facilities IS NOT NULL
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_facilities: avg_facilities,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_facilities ASC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Search hotels with minimum average staff score
-    "hotel_search_min_staff": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_staff) AS avg_staff
-        WHERE avg_staff >= $rating
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_staff: avg_staff,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_staff DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Search hotels with maximum average staff score
-    "hotel_search_max_staff": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_staff) AS avg_staff
-        WHERE avg_staff <= $max
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_staff: avg_staff,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_staff DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Search hotels with staff avg in a range
-    "hotel_search_staff_range": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_staff) AS avg_staff
-        WHERE avg_staff >= $min AND avg_staff <= $max
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_staff: avg_staff,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_staff DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Search hotels with exact average staff value
-    "hotel_search_exact_staff": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, co, avg(r.score_staff) AS avg_staff
-        WHERE floor(avg_staff * 10) / 10 = $value
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_staff: avg_staff,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_staff DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Hotels with highest staff ratings
-    "top_hotel_staff": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, avg(r.score_staff) AS avg_staff , co
-        WHERE avg_staff IS NOT NULL
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_staff: avg_staff,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_staff DESC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Hotels with lowest staff ratings
-    "worst_hotel_staff": """
-        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-        OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-        WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-        AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-        WITH h, c, avg(r.score_staff) AS avg_staff , co
-        WHERE avg_staff IS NOT NULL
-        RETURN h {
-            .*,
-            hotel_id: h.hotel_id,
-            name: h.name,
-            star_rating: h.star_rating,
-            average_reviews_score: h.average_reviews_score,
-            avg_score_staff: avg_staff,
-            city: c.name,
-            country: co.name
-        } AS hotel
-        ORDER BY avg_staff ASC
-        LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Search hotels with minimum average value for money score
-    "hotel_search_min_value_for_money": """
-    MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-    OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-    WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-      AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-    WITH h, c, co, avg(r.score_value_for_money) AS avg_value
-    WHERE avg_value >= $rating
-    RETURN h {
-        .*,
-        hotel_id: h.hotel_id,
-        name: h.name,
-        star_rating: h.star_rating,
-        average_reviews_score: h.average_reviews_score,
-        avg_score_value_for_money: avg_value,
-        city: c.name,
-        country: co.name
-    } AS hotel
-    ORDER BY avg_value DESC
-    LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Search hotels with maximum average value for money score
-    "hotel_search_max_value_for_money": """
-    MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-    OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-    WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-      AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-    WITH h, c, co, avg(r.score_value_for_money) AS avg_value
-    WHERE avg_value <= $max
-    RETURN h {
-        .*,
-        hotel_id: h.hotel_id,
-        name: h.name,
-        star_rating: h.star_rating,
-        average_reviews_score: h.average_reviews_score,
-        avg_score_value_for_money: avg_value,
-        city: c.name,
-        country: co.name
-    } AS hotel
-    ORDER BY avg_value DESC
-    LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Search hotels with value for money avg in a range
-    "hotel_search_value_for_money_range": """
-    MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-    OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-    WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-      AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-    WITH h, c, co, avg(r.score_value_for_money) AS avg_value
-    WHERE avg_value >= $min AND avg_value <= $max
-    RETURN h {
-        .*,
-        hotel_id: h.hotel_id,
-        name: h.name,
-        star_rating: h.star_rating,
-        average_reviews_score: h.average_reviews_score,
-        avg_score_value_for_money: avg_value,
-        city: c.name,
-        country: co.name
-    } AS hotel
-    ORDER BY avg_value DESC
-    LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Search hotels with exact average value for money value
-    "hotel_search_exact_value_for_money": """
-    MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-    OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-    WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-      AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-    WITH h, c, co, avg(r.score_value_for_money) AS avg_value
-    WHERE floor(avg_value * 10) / 10 = $value
-    RETURN h {
-        .*,
-        hotel_id: h.hotel_id,
-        name: h.name,
-        star_rating: h.star_rating,
-        average_reviews_score: h.average_reviews_score,
-        avg_score_value_for_money: avg_value,
-        city: c.name,
-        country: co.name
-    } AS hotel
-    ORDER BY avg_value DESC
-    LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Hotels with highest value for money ratings
-    "top_hotel_value_for_money": """
-    MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-    OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-    WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-      AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-    WITH h, c, avg(r.score_value_for_money) AS avg_value , co
-    WHERE avg_value IS NOT NULL
-    RETURN h {
-        .*,
-        hotel_id: h.hotel_id,
-        name: h.name,
-        star_rating: h.star_rating,
-        average_reviews_score: h.average_reviews_score,
-        avg_score_value_for_money: avg_value,
-        city: c.name,
-        country: co.name
-    } AS hotel
-    ORDER BY avg_value DESC
-    LIMIT toInteger(coalesce($limit, 10))
-    """,
-    # Hotels with lowest value for money ratings
-    "worst_hotel_value_for_money": """
-    MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
-    OPTIONAL MATCH (h)<-[:REVIEWED]-(r:Review)
-    WHERE ($cities IS NULL OR size($cities) = 0 OR c.name IN $cities)
-      AND ($countries IS NULL OR size($countries) = 0 OR co.name IN $countries)
-    WITH h, c, avg(r.score_value_for_money) AS avg_value , co
-    WHERE avg_value IS NOT NULL
-    RETURN h {
-        .*,
-        hotel_id: h.hotel_id,
-        name: h.name,
-        star_rating: h.star_rating,
-        average_reviews_score: h.average_reviews_score,
-        avg_score_value_for_money: avg_value,
-        city: c.name,
-        country: co.name
-    } AS hotel
-    ORDER BY avg_value ASC
-    LIMIT toInteger(coalesce($limit, 10))
-    """,
 
+# Per-template transaction timeouts (seconds), passed to the driver by
+# Neo4jConnector.run_template. Templates not listed here use NEO4J_QUERY_TIMEOUT.
+# Point lookups get short budgets; templates that aggregate reviews get more room.
+# Rating filters are compiled by filter_engine and use its FILTER_TIMEOUT_S.
+TEMPLATE_TIMEOUTS = {
+    "visa_requirements": 2.0,
+    "visa_requirements_by_origin": 2.0,
+    "resolve_location_aliases": 2.0,
+    "visa_free_countries_by_origin": 2.0,
+    "hotel_details_by_id": 2.0,
+    "hotel_by_name_substring": 3.0,
+    "hotel_search_by_city": 3.0,
+    "hotel_search_by_country": 3.0,
+    "hotel_search_by_city_or_country": 3.0,
+    "hotel_search_top_k_per_group": 3.0,
+    "top_hotels": 3.0,
+    "hotel_search_min_avg_score": 3.0,
+    "best_hotel_overall": 3.0,
+    "hotel_leaderboard": 2.0,
+    "hotel_search_visa_free": 5.0,
+    "hotel_vectors": 30.0,
+    "hotel_records": 30.0,
+    "hotel_reviews_by_id": 5.0,
+    "hotel_reviews_by_name": 5.0,
+    "recommend_hotels_by_traveller_type": 3.0,
+    "recommend_hotels_by_segment": 3.0,
 }
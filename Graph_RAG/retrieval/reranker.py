@@ -0,0 +1,146 @@
+# Graph_RAG/retrieval/reranker.py
+"""
+CrossEncoderReranker: optional re-ranking of the merged hotels (RERANK=1).
+
+RetrievalPipeline._merge_results lists baseline hits first, then embedding
+hits, in arrival order. The reranker scores each (query, hotel text) pair
+with a small cross-encoder on CPU (RERANK_MODEL, default
+cross-encoder/ms-marco-MiniLM-L-6-v2) and sorts the hotels by that score. The
+hotel text is the same build_feature_text used for the embeddings.
+
+- Pairs are scored RERANK_BATCH_SIZE (default 16) at a time.
+- Scores are cached per (query, hotel text) in an LRU of RERANK_CACHE_SIZE
+  entries (default 4096), so a repeated question costs no model call.
+- RERANK_BUDGET_MS (default 200, 0 = no limit) bounds the model time per
+  request. A batch is only started if it is expected to finish in budget,
+  judged by the last batch. When the budget runs out, the original order is
+  kept. Scores computed so far are still cached for the next request.
+
+The model comes from the process-wide model registry, like the embedding models.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from preprocessing.embedding_cache import cache_key
+from preprocessing.model_registry import get_model_registry
+from retrieval.feature_builder import build_feature_text
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name: str = RERANK_MODEL, batch_size: int = 16, budget_ms: float = 200.0,
+                 cache_size: int = 4096, model=None):
+        """model: anything with CrossEncoder.predict(pairs, batch_size=...); loaded through the registry if None."""
+        self.model_name = model_name
+        self.batch_size = max(1, int(batch_size))
+        self.budget_s = budget_ms / 1000.0 if budget_ms else 0.0
+        self.cache_size = cache_size
+        self._model = model
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "reranked": 0, "fallbacks": 0, "cache_hits": 0, "scored_pairs": 0, "batches": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["CrossEncoderReranker"]:
+        """A reranker when RERANK=1, else None."""
+        if os.getenv("RERANK", "0").lower() not in ("1", "true", "on"):
+            return None
+        return cls(model_name=os.getenv("RERANK_MODEL", RERANK_MODEL),
+                   batch_size=int(os.getenv("RERANK_BATCH_SIZE", "16")),
+                   budget_ms=float(os.getenv("RERANK_BUDGET_MS", "200")),
+                   cache_size=int(os.getenv("RERANK_CACHE_SIZE", "4096")))
+
+    @property
+    def model(self):
+        if self._model is not None:
+            return self._model
+        return get_model_registry().get(f"cross-encoder:{self.model_name}", self._load_model)
+
+    def _load_model(self):
+        from sentence_transformers import CrossEncoder
+
+        return CrossEncoder(self.model_name, device="cpu")
+
+    # ------------------------------------------------------------------
+    # Score cache
+    # ------------------------------------------------------------------
+    def _cached(self, key: str) -> Optional[float]:
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _remember(self, scores: Dict[str, float]):
+        with self._lock:
+            self._cache.update(scores)
+            for key in scores:
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Re-ranking
+    # ------------------------------------------------------------------
+    def score(self, query: str, texts: List[str]) -> Tuple[List[Optional[float]], bool]:
+        """
+        (scores, complete): cross-encoder score per text (None where the budget ran out
+        before it was scored) and whether every text got one.
+        """
+        keys = [cache_key(self.model_name, f"{query}\x00{text}") for text in texts]
+        scores = [self._cached(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        with self._lock:
+            self.stats["cache_hits"] += len(texts) - len(missing)
+
+        deadline = time.perf_counter() + self.budget_s
+        last_batch_s = 0.0
+        for start in range(0, len(missing), self.batch_size):
+            now = time.perf_counter()
+            if self.budget_s and now + last_batch_s > deadline:
+                break
+            batch = missing[start:start + self.batch_size]
+            predicted = self.model.predict([(query, texts[i]) for i in batch], batch_size=len(batch))
+            last_batch_s = time.perf_counter() - now
+            new = {}
+            for i, value in zip(batch, predicted):
+                scores[i] = float(value)
+                new[keys[i]] = scores[i]
+            self._remember(new)
+            with self._lock:
+                self.stats["scored_pairs"] += len(batch)
+                self.stats["batches"] += 1
+        return scores, all(score is not None for score in scores)
+
+    def rerank(self, query: str, items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        (items, reranked): merged hotel items (h / city_name / country_name / review_texts)
+        sorted by cross-encoder score, each with its rerank_score, or the items in their
+        original order when the budget ran out.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+        if not query or not query.strip() or len(items) < 2:
+            return items, False
+        scores, complete = self.score(query, [build_feature_text(item) for item in items])
+        if not complete:
+            with self._lock:
+                self.stats["fallbacks"] += 1
+            return items, False
+
+        with self._lock:
+            self.stats["reranked"] += 1
+        order = sorted(range(len(items)), key=lambda i: -scores[i])
+        return [dict(items[i], rerank_score=scores[i]) for i in order], True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Requests re-ranked vs. kept in order (budget), cache hits and model batches."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["cache_entries"] = len(self._cache)
+        return stats
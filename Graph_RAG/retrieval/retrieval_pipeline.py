@@ -1,35 +1,64 @@
+import os
 from typing import Dict, Any, List, Optional
 from retrieval.baseline_retriever import BaselineRetriever
 from retrieval.embedding_retriever import EmbeddingRetriever
+from retrieval.reranker import CrossEncoderReranker
 from preprocessing.entity_extractor import EntityExtractor
 from preprocessing.preprocess_intent import classify_user_intent
 from neo4j_connector import Neo4jConnector
+from in_memory_graph import InMemoryGraph
+
+
+def default_connector():
+    """
+    Pick the graph backend from GRAPH_BACKEND ("neo4j" by default, or "memory"
+    for the embedded in-process graph built from the Knowledge_Graph_DB CSVs).
+    """
+    if os.getenv("GRAPH_BACKEND", "neo4j").lower() == "memory":
+        return InMemoryGraph()
+    return Neo4jConnector()
+
 
 class RetrievalPipeline:
     """
     Orchestrates baseline + embedding retrieval and merges results into a single context
     structure suitable for feeding to the LLM prompt builder.
     """
-    def __init__(self, neo4j_connector: Neo4jConnector = None, model_name: str = "minilm"):
-        connector = neo4j_connector or Neo4jConnector()
+    def __init__(self, neo4j_connector: Neo4jConnector = None, model_name: str = "minilm",
+                 reranker: CrossEncoderReranker = None):
+        connector = neo4j_connector or default_connector()
         self.baseline = BaselineRetriever(connector)
         self.model_name = model_name
         self.embed = EmbeddingRetriever(connector, model_name=model_name)
+        # RERANK=1: cross-encoder re-ranking of the merged hotels (see retrieval/reranker.py)
+        self.reranker = reranker or CrossEncoderReranker.from_env()
         
-    def retrieve(self, intent: str, entities: Dict[str, Any], user_query: str, user_embeddings: bool = True, limit: int = 10, user_baseline: bool = True) -> Dict[str, Any]:
+    def retrieve(self, intent: str, entities: Dict[str, Any], user_query: str, user_embeddings: bool = True, limit: int = 10, user_baseline: bool = True,
+                 cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        `limit` is the page size (an extracted entity limit can only lower it).
+        Pass a previous result's `next_cursor` to fetch the following baseline page;
+        semantic matches are only computed for the first page.
+        """
+        entities = dict(entities or {})
+        if limit:
+            entities["limit"] = min(entities.get("limit") or limit, limit)
+        next_cursor = None
         if user_baseline:
-            baseline_results, executed_cypher = self.baseline.retrieve(intent, entities, limit=limit)
+            baseline_results, executed_cypher, next_cursor = self.baseline.retrieve_page(intent, entities, limit=limit, cursor=cursor)
         else:
             baseline_results = []
             executed_cypher = ""
 
         embedding_results = []
-        if user_embeddings:
+        if user_embeddings and cursor is None:
             # For hotel-oriented intents we search hotels + reviews
             rating_filter = entities.get("rating_filter") if entities else None
             embedding_results = self.embed.sem_search_hotels(user_query, entities, top_k=limit, rating_filter=rating_filter, intent=intent)
 
         combined = self._merge_results(baseline_results, embedding_results)
+        if self.reranker is not None and user_query:
+            combined = self._rerank(user_query, combined)
         print("combinedddddddddd", combined)
 
         # Build a textual context summary (simple)
@@ -40,18 +69,23 @@ class RetrievalPipeline:
             "embeddings": embedding_results,
             "combined": combined,
             "context_text": context_text,
-            "cypher_query": executed_cypher
+            "cypher_query": executed_cypher,
+            "next_cursor": next_cursor
         }
 
 
     def _merge_results(self, baseline: List[Dict], embedding: List[Dict]) -> Dict[str, List[Dict]]:
         """
-        Merges results, handles 'hotel_name' alias, deduplicates, and strips vectors.
+        Merges results, handles 'hotel_name' alias and deduplicates.
+        Vectors are already excluded server-side by the HOTEL_PROPERTIES projection.
+        Grouped (multi-destination) results are deduplicated per group and also
+        listed under "groups" (group name -> hotels), in first-seen order. A hotel
+        that only one side grouped is kept once, as first seen.
         """
         hotels = []
         visa_info = []
         others = []
-        seen_ids = set()
+        seen_groups = {}  # hotel key -> groups it is listed under (None = ungrouped)
 
         def process_list(result_list, source_name):
             for r in result_list or []:
@@ -79,7 +113,8 @@ class RetrievalPipeline:
                         "source": source_name,
                         "city_name": r.get("city_name") or r.get("city"),
                         "country_name": r.get("country_name") or r.get("country"),
-                        "review_texts": r.get("review_texts", [])
+                        "review_texts": r.get("review_texts", []),
+                        "group": r.get("group")
                     }
 
                 # --- 3. Identify & Deduplicate ---
@@ -89,14 +124,13 @@ class RetrievalPipeline:
                 key = hid or name
                 
                 if key:
-                    if key in seen_ids:
+                    # the same hotel may legitimately appear under two groups (its city and its country),
+                    # but not both ungrouped and grouped
+                    group = item_container.get("group")
+                    groups_seen = seen_groups.setdefault(key, set())
+                    if group in groups_seen or (groups_seen and (group is None or None in groups_seen)):
                         continue
-                    seen_ids.add(key)
-                    
-                    # Remove vectors
-                    hotel_node.pop("embedding_minilm", None)
-                    hotel_node.pop("embedding_bge", None)
-                    
+                    groups_seen.add(group)
                     hotels.append(item_container)
                 else:
                     # Only generic info goes here
@@ -105,8 +139,24 @@ class RetrievalPipeline:
         process_list(baseline, "baseline")
         process_list(embedding, "embedding")
 
-        return {"hotels": hotels, "visa_info": visa_info, "others": others}
+        groups = {}
+        for item in hotels:
+            if item.get("group"):
+                groups.setdefault(item["group"], []).append(item)
+
+        return {"hotels": hotels, "visa_info": visa_info, "others": others, "groups": groups}
    
+    def _rerank(self, query: str, combined: Dict[str, Any]) -> Dict[str, Any]:
+        """Hotels (and each group's hotels) in cross-encoder order; unchanged if the budget ran out."""
+        hotels, reranked = self.reranker.rerank(query, combined["hotels"])
+        if not reranked:
+            return combined
+        groups = {}
+        for item in hotels:
+            if item.get("group"):
+                groups.setdefault(item["group"], []).append(item)
+        return {**combined, "hotels": hotels, "groups": groups}
+
     def _build_context_text(self, combined: Dict[str, Any]) -> str:
         parts = []
         
@@ -124,92 +174,107 @@ class RetrievalPipeline:
         # --- 2. Handle Hotel Context ---
         hotels = combined.get("hotels", [])
         if hotels:
-            parts.append("--- Retrieved Hotels ---")
-            for item in hotels:
-                # Unpack the nested 'h' dictionary
-                hotel_node = item.get("h", {})
+            # Multi-destination searches: one section per city / country
+            groups = combined.get("groups") or {}
+            ungrouped = [item for item in hotels if not item.get("group")]
+            sections = [(f"--- Hotels in {group} ---", items) for group, items in groups.items()]
+            if ungrouped or not sections:
+                sections.append(("--- Retrieved Hotels ---", ungrouped or hotels))
+            for header, items in sections:
+                parts.append(header)
+                for item in items:
+                    # Unpack the nested 'h' dictionary
+                    hotel_node = item.get("h", {})
                 
-                # --- A. Extract Location ---
-                # Fallback to internal keys if the wrapper keys are empty
-                city = item.get("city_name") or hotel_node.get("city") or "Unknown City"
-                country = item.get("country_name") or hotel_node.get("country") or "Unknown Country"
+                    # --- A. Extract Location ---
+                    # Fallback to internal keys if the wrapper keys are empty
+                    city = item.get("city_name") or hotel_node.get("city") or "Unknown City"
+                    country = item.get("country_name") or hotel_node.get("country") or "Unknown Country"
                 
-                # --- B. Extract Basic Info ---
-                name = hotel_node.get("name", "Unnamed Hotel")
+                    # --- B. Extract Basic Info ---
+                    name = hotel_node.get("name", "Unnamed Hotel")
 
-                star_rating = hotel_node.get("star_rating")
+                    star_rating = hotel_node.get("star_rating")
                 
-                avg_score = (hotel_node.get("average_reviews_score") or 
-                             hotel_node.get("total_avg_score"))
+                    avg_score = (hotel_node.get("average_reviews_score") or 
+                                 hotel_node.get("total_avg_score"))
                 
-                visa_status = (hotel_node.get("visa_status"))
+                    visa_status = (hotel_node.get("visa_status"))
                 
-                line = f"• {name} (Located in {city}, {country})"
-
-                if star_rating:
-                    line += f" | {star_rating} Stars"
-
-
-                if avg_score:
-                    line += f" | Global Rating: {float(avg_score):.1f}/10"
-
-                if visa_status:
-                    line += f" | Visa Status: {visa_status}"
-
-                cat_scores = []
-                categories = [
-                    ("avg_score_cleanliness", "Cleanliness"),
-                    ("avg_score_comfort", "Comfort"),
-                    ("avg_score_facilities", "Facilities"),
-                    ("avg_score_staff", "Staff")
-                ]
-
-                for key, label in categories:
-                    val = hotel_node.get(key)
-                    # Fallback to base score if dynamic average is missing/None
-                    if val is None:
-                        val = hotel_node.get(f"{key.replace('avg_score_', '')}_base")
+                    line = f"• {name} (Located in {city}, {country})"
+
+                    if star_rating:
+                        line += f" | {star_rating} Stars"
+
+
+                    if avg_score:
+                        line += f" | Global Rating: {float(avg_score):.1f}/10"
+
+                    if visa_status:
+                        line += f" | Visa Status: {visa_status}"
+                        # multi-origin questions: which passports the hotel is visa-free for
+                        if hotel_node.get("visa_free_for"):
+                            line += f" (for {', '.join(hotel_node['visa_free_for'])})"
+
+                    cat_scores = []
+                    categories = [
+                        ("avg_score_cleanliness", "Cleanliness"),
+                        ("avg_score_comfort", "Comfort"),
+                        ("avg_score_facilities", "Facilities"),
+                        ("avg_score_staff", "Staff"),
+                        ("avg_score_value_for_money", "Value for money"),
+                    ]
+
+                    for key, label in categories:
+                        val = hotel_node.get(key)
+                        # Fallback to base score if dynamic average is missing/None
+                        if val is None:
+                            val = hotel_node.get(f"{key.replace('avg_score_', '')}_base")
                         
-                    if val is not None:
-                        cat_scores.append(f"{label}: {float(val):.1f}")
+                        if val is not None:
+                            cat_scores.append(f"{label}: {float(val):.1f}")
                 
-                if cat_scores:
-                    line += " | [" + ", ".join(cat_scores) + "]"
-
-                # --- C. Extract Traveler Type Scores ---
-                traveller_scores = []
-                for key, value in hotel_node.items():
-                    if key.startswith("avg_score_") and isinstance(value, (int, float)):
-                        readable_type = key.replace("avg_score_", "").replace("_", " ").title()
-                        traveller_scores.append(f"{readable_type}: {value:.1f}")
+                    if cat_scores:
+                        line += " | [" + ", ".join(cat_scores) + "]"
+
+                    # --- C. Extract Traveler Type Scores ---
+                    traveller_scores = []
+                    category_keys = {key for key, _ in categories}
+                    for key, value in hotel_node.items():
+                        # category averages are listed above, only the traveller types are left
+                        if key in category_keys:
+                            continue
+                        if key.startswith("avg_score_") and isinstance(value, (int, float)):
+                            readable_type = key.replace("avg_score_", "").replace("_", " ").title()
+                            traveller_scores.append(f"{readable_type}: {value:.1f}")
                 
-                if traveller_scores:
-                    line += " | Ratings: [" + ", ".join(traveller_scores) + "]"
+                    if traveller_scores:
+                        line += " | Ratings: [" + ", ".join(traveller_scores) + "]"
 
-                parts.append(line)
+                    parts.append(line)
 
-                # --- D. Extract Reviews ---
-                # FIX 2: Check BOTH review sources
-                # Source 1: List of reviews (Embedding Retriever)
-                reviews_list = item.get("review_texts", [])
+                    # --- D. Extract Reviews ---
+                    # FIX 2: Check BOTH review sources
+                    # Source 1: List of reviews (Embedding Retriever)
+                    reviews_list = item.get("review_texts", [])
                 
-                # Source 2: Single latest review (Baseline Retriever)
-                latest_review = hotel_node.get("latest_review_text")
+                    # Source 2: Single latest review (Baseline Retriever)
+                    latest_review = hotel_node.get("latest_review_text")
                 
-                # Combine them safely
-                final_reviews = []
-                if reviews_list:
-                    final_reviews.extend(reviews_list)
-                if latest_review and latest_review not in final_reviews:
-                    final_reviews.append(latest_review)
-
-                if final_reviews:
-                    clean_reviews = [str(r).replace("\n", " ").strip() for r in final_reviews if r]
-                    # Show up to 2 reviews
-                    for review in clean_reviews[:2]:
-                        parts.append(f"    - Review: \"{review[:150]}...\"")
+                    # Combine them safely
+                    final_reviews = []
+                    if reviews_list:
+                        final_reviews.extend(reviews_list)
+                    if latest_review and latest_review not in final_reviews:
+                        final_reviews.append(latest_review)
+
+                    if final_reviews:
+                        clean_reviews = [str(r).replace("\n", " ").strip() for r in final_reviews if r]
+                        # Show up to 2 reviews
+                        for review in clean_reviews[:2]:
+                            parts.append(f"    - Review: \"{review[:150]}...\"")
             
-            parts.append("")
+                parts.append("")
 
         # --- 3. Handle 'Others' ---
         others = combined.get("others", [])
@@ -239,7 +304,8 @@ class RetrievalPipeline:
         limit: int = 10,
         user_embeddings: bool = True,
         use_llm: bool = True,
-        user_baseline: bool = True
+        user_baseline: bool = True,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Production-safe retrieval wrapper for the final chatbot.
@@ -273,21 +339,37 @@ class RetrievalPipeline:
                 user_query=query,
                 user_embeddings=user_embeddings,
                 limit=limit,
-                user_baseline=user_baseline
+                user_baseline=user_baseline,
+                cursor=cursor
             )
         except Exception as e:
-            # Critical failure → return safe empty structure
-            return {
-                "intent": intent,
-                "entities": entities,
-                "baseline": [],
-                "embeddings": [],
-                "combined": {"hotels": [], "reviews": []},
-                "context_text": f"[Retrieval Error: {str(e)}]",
-                "cypher_query": f"// Error generating query: {str(e)}"
-            }
+            return self._error_result(intent, entities, e)
         
         # 4) Normalize structure and return clean results
+        return self._normalize_result(intent, entities, results)
+
+    def safe_next_page(self, previous: Dict[str, Any], limit: int = 10) -> Dict[str, Any]:
+        """
+        Fetch the page after a safe_retrieve() / safe_next_page() result, reusing its
+        intent and entities (no re-extraction, no embedding search).
+        Returns the same structure; only the new page's rows are included.
+        """
+        intent, entities = previous.get("intent"), previous.get("entities") or {}
+        try:
+            results = self.retrieve(
+                intent=intent,
+                entities=entities,
+                user_query="",
+                user_embeddings=False,
+                limit=limit,
+                cursor=previous.get("next_cursor")
+            )
+        except Exception as e:
+            return self._error_result(intent, entities, e)
+        return self._normalize_result(intent, entities, results)
+
+    @staticmethod
+    def _normalize_result(intent: str, entities: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
         return {
             "intent": intent,
             "entities": entities,
@@ -295,5 +377,20 @@ class RetrievalPipeline:
             "embeddings": results.get("embeddings", []),
             "combined": results.get("combined", {}),
             "context_text": results.get("context_text", ""),
-            "cypher_query": results.get("cypher_query", "// No Cypher executed")
+            "cypher_query": results.get("cypher_query", "// No Cypher executed"),
+            "next_cursor": results.get("next_cursor")
+        }
+
+    @staticmethod
+    def _error_result(intent: str, entities: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        # Critical failure → return safe empty structure
+        return {
+            "intent": intent,
+            "entities": entities,
+            "baseline": [],
+            "embeddings": [],
+            "combined": {"hotels": [], "reviews": []},
+            "context_text": f"[Retrieval Error: {str(error)}]",
+            "cypher_query": f"// Error generating query: {str(error)}",
+            "next_cursor": None
         }
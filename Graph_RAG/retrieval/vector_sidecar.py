@@ -0,0 +1,77 @@
+# Graph_RAG/retrieval/vector_sidecar.py
+"""
+Compact hotel vectors in a memory-mapped sidecar (VECTOR_SIDECAR=float16 | int8).
+
+Instead of a 384-float list on every Hotel node, EmbeddingIndexer writes
+the unit-normalised vectors of one model property to
+VECTOR_SIDECAR_DIR/<property>/ (default ~/.cache/graph_rag/vectors):
+
+    ids.npy      int64 hotel_id of each row
+    vectors.npy  float16 rows, or int8 rows scalar-quantized per vector
+    scales.npy   float32 per-row scale (int8 only): vector ~= row * scale
+
+VectorStore.from_sidecar maps the files read-only (np.load mmap_mode="r"), so
+every worker process serves searches from the same page-cache pages instead of
+its own copy. float16 halves float32 memory, int8 quarters it (8x against the
+float64 lists Neo4j stores). tests/benchmark_vector_storage.py measures recall
+against float32.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from retrieval.vector_store import normalized_rows
+
+SIDECAR_DTYPES = ("float16", "int8")
+SIDECAR_DIR = os.getenv("VECTOR_SIDECAR_DIR",
+                        os.path.join(os.path.expanduser("~"), ".cache", "graph_rag", "vectors"))
+
+
+def sidecar_path(property_name: str, root: str = SIDECAR_DIR) -> str:
+    return os.path.join(root, property_name)
+
+
+def quantize(vectors, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(rows, scales) of the normalised vectors in `dtype`; scales is None for float16."""
+    if dtype not in SIDECAR_DTYPES:
+        raise ValueError(f"Unknown sidecar dtype {dtype!r}, expected one of {SIDECAR_DTYPES}")
+    matrix = normalized_rows(vectors)
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    rows = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return rows, scales.astype(np.float32)
+
+
+def write_sidecar(path: str, hotel_ids: List[int], vectors, dtype: str):
+    """Quantize and save one model property's vectors; replaces any previous sidecar in `path`."""
+    rows, scales = quantize(vectors, dtype)
+    os.makedirs(path, exist_ok=True)
+    ids_path = os.path.join(path, "ids.npy")
+    # ids.npy last: a half-written sidecar is never picked up by read_sidecar()
+    if os.path.exists(ids_path):
+        os.remove(ids_path)
+    np.save(os.path.join(path, "vectors.npy"), rows)
+    scales_path = os.path.join(path, "scales.npy")
+    if scales is not None:
+        np.save(scales_path, scales)
+    elif os.path.exists(scales_path):
+        os.remove(scales_path)
+    np.save(ids_path, np.asarray(hotel_ids, dtype=np.int64))
+
+
+def read_sidecar(path: str) -> Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+    """(hotel ids, rows, scales or None), memory-mapped; None when `path` holds no sidecar."""
+    ids_path = os.path.join(path, "ids.npy")
+    if not os.path.exists(ids_path):
+        return None
+    ids = np.load(ids_path)
+    if not len(ids):
+        return None
+    rows = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+    scales_path = os.path.join(path, "scales.npy")
+    scales = np.load(scales_path, mmap_mode="r") if os.path.exists(scales_path) else None
+    return ids, rows, scales
@@ -0,0 +1,405 @@
+# Graph_RAG/retrieval/vector_store.py
+"""
+In-process vector index for hotel embeddings.
+
+One contiguous, unit-normalised float32 matrix per model property plus
+precomputed boolean masks per city / country (by name_key) and star rating,
+and one float column per hotel score used by rating filters. A filtered
+search is then: AND the masks, score the allowed rows with one matmul
+(blocked for large stores) and take the top k with argpartition. The search
+is exact, so a selective filter never loses results the way a
+"fetch top_k * 5 candidates, then filter" vector-index query does.
+
+Used by InMemoryGraph (vectors computed in process) and, with
+VECTOR_STORE=memory, by EmbeddingRetriever on Neo4j (vectors loaded once from
+the graph with the hotel_vectors template).
+
+With VECTOR_SIDECAR=float16 | int8 the hotel vectors are memory-mapped from
+a compact sidecar file instead (see retrieval/vector_sidecar.py).
+VECTOR_PREFILTER_DIMS=n shortlists hotels on the first n dimensions of each
+vector (Matryoshka-style) and rescores only the shortlist at full width;
+tests/benchmark_truncated_search.py measures the recall / latency trade-off.
+VECTOR_BINARY_PREFILTER=1 shortlists them instead by the Hamming distance of
+one sign bit per dimension (packed in uint64 words, 32x smaller than float32),
+see tests/benchmark_binary_search.py.
+
+ReviewVectorStore applies the same hotel filter to one vector per review and
+pools the matching reviews into hotel scores (see pool_hotel_scores).
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from retrieval.filter_engine import RATING_FIELDS, VALUE_OPERATORS, bind_values, normalize_conditions
+from retrieval.query_templates import name_key
+
+# Rows scored per matmul; bounds the temporary score buffer for large stores
+BLOCK_ROWS = 65536
+# float16 / int8 rows converted to float32 per step when scoring compact stores
+WIDEN_ROWS = 256
+# Truncated-dimension prefilter (VECTOR_PREFILTER_DIMS, 0 = off): rank on the
+# leading dimensions, keep k * VECTOR_PREFILTER_OVERSAMPLE rows, rescore at full width
+PREFILTER_DIMS = int(os.getenv("VECTOR_PREFILTER_DIMS", "0"))
+PREFILTER_OVERSAMPLE = int(os.getenv("VECTOR_PREFILTER_OVERSAMPLE", "8"))
+# Binary prefilter (VECTOR_BINARY_PREFILTER=1): shortlist k * VECTOR_BINARY_OVERSAMPLE
+# rows by Hamming distance between sign-bit codes, rescore them at full precision
+BINARY_PREFILTER = os.getenv("VECTOR_BINARY_PREFILTER", "0").lower() in ("1", "true", "on")
+BINARY_OVERSAMPLE = int(os.getenv("VECTOR_BINARY_OVERSAMPLE", "10"))
+
+# set bits per byte value (np.bitwise_count needs numpy >= 2.0)
+POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Review-level pooling: hotel score = mean of its n best review scores
+# ("max" = best review only, "mean" = every matching review)
+POOLING_TOP_N = {"max": 1, "mean": None}
+# Review texts per encode_batch call when embedding reviews
+REVIEW_BATCH_SIZE = 256
+# Benchmark results of the lossy options (tests/benchmark_*.py); they stay opt-in until recorded
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "results")
+
+
+def warn_unmeasured(option: str, results_file: str, benchmark: str):
+    """Print a warning when a lossy option is enabled before its benchmark results are recorded."""
+    if not os.path.exists(os.path.join(RESULTS_DIR, results_file)):
+        print(f"{option}: recall is not recorded yet (tests/results/{results_file}); "
+              f"run python -m tests.{benchmark} first")
+
+
+def normalized_rows(vectors) -> np.ndarray:
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def normalized_query(embedding) -> np.ndarray:
+    query = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    return query / norm if norm > 0 else query
+
+
+def binary_codes(vectors) -> np.ndarray:
+    """Sign bit of every dimension, packed into uint64 words (zero-padded to a multiple of 64 bits)."""
+    bits = np.packbits(np.asarray(vectors) > 0, axis=1)
+    pad = -bits.shape[1] % 8
+    if pad:
+        bits = np.pad(bits, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Hamming distance of every packed code to the query code."""
+    diff = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(diff).sum(axis=1, dtype=np.int32)
+    return POPCOUNT8[diff.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+class HotelScope:
+    """Per-hotel filter masks and score columns shared by the hotel and review stores."""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        """
+        records: rows shaped like EmbeddingRetriever._search_hotels_generic results
+        ({"h", "city_name", "country_name", "review_texts"}), one per hotel.
+        """
+        self.records = records
+        self.row_of = {rec["h"]["hotel_id"]: i for i, rec in enumerate(records)}
+
+        self.city_masks = self._masks(name_key(rec["city_name"]) for rec in records)
+        self.country_masks = self._masks(name_key(rec["country_name"]) for rec in records)
+        self.star_masks = self._masks(rec["h"].get("star_rating") for rec in records)
+        # Filterable hotel scores as float columns (NaN = missing, never matches a condition)
+        self.fields = {prop: np.full(len(records), np.nan) for prop in sorted(set(RATING_FIELDS.values()))}
+        for i, rec in enumerate(records):
+            self._fill_fields(i, rec["h"])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _masks(self, values) -> Dict[Any, np.ndarray]:
+        masks = {}
+        for i, value in enumerate(values):
+            masks.setdefault(value, np.zeros(len(self.records), dtype=bool))[i] = True
+        return masks
+
+    def _fill_fields(self, i: int, hotel: Dict[str, Any]):
+        for prop, column in self.fields.items():
+            value = hotel.get(prop)
+            column[i] = np.nan if value is None else value
+
+    def update_hotel(self, hotel: Dict[str, Any]):
+        """Refresh one hotel's score columns after its aggregates changed (incremental, no rebuild)."""
+        i = self.row_of.get(hotel["hotel_id"])
+        if i is None:
+            return
+        old_stars = self.records[i]["h"].get("star_rating")
+        self._fill_fields(i, hotel)
+        self.records[i]["h"] = hotel
+        if hotel.get("star_rating") != old_stars:
+            self.star_masks.setdefault(old_stars, np.zeros(len(self), dtype=bool))[i] = False
+            self.star_masks.setdefault(hotel.get("star_rating"), np.zeros(len(self), dtype=bool))[i] = True
+
+    # ------------------------------------------------------------------
+    # Filtering
+    # ------------------------------------------------------------------
+    def _any_of(self, masks: Dict[Any, np.ndarray], keys) -> np.ndarray:
+        out = np.zeros(len(self), dtype=bool)
+        for key in keys:
+            if key in masks:
+                out |= masks[key]
+        return out
+
+    def mask(self, cities: List[str] = None, countries: List[str] = None, rating_filter: dict = None) -> np.ndarray:
+        """
+        Allowed rows: in any of `cities` (else any of `countries`) and matching
+        every value condition of the rating filter (same semantics as
+        EmbeddingRetriever._build_rating_filter / CompiledFilter.matches).
+        """
+        allowed = np.ones(len(self), dtype=bool)
+        if cities:
+            allowed &= self._any_of(self.city_masks, (name_key(c) for c in cities))
+        elif countries:
+            allowed &= self._any_of(self.country_masks, (name_key(c) for c in countries))
+
+        conditions = [c for c in normalize_conditions(rating_filter) if c["op"] in VALUE_OPERATORS]
+        params = bind_values(conditions)
+        for i, cond in enumerate(conditions):
+            field, op = cond["field"], cond["op"]
+            if field == "star_rating" and op == "eq":
+                allowed &= self._any_of(self.star_masks, [int(params[f"f{i}"])])
+                continue
+            column = self.fields[field]
+            with np.errstate(invalid="ignore"):
+                if op == "gte":
+                    allowed &= column >= params[f"f{i}"]
+                elif op == "lte":
+                    allowed &= column <= params[f"f{i}"]
+                elif op == "between":
+                    allowed &= (column >= params[f"f{i}_min"]) & (column <= params[f"f{i}_max"])
+                elif op == "eq":
+                    allowed &= (column >= params[f"f{i}_min"]) & (column < params[f"f{i}_max"])
+        return allowed
+
+    def result_row(self, i: int, score: float) -> Dict[str, Any]:
+        rec = self.records[i]
+        return {
+            "h": dict(rec["h"]),
+            "city_name": rec["city_name"],
+            "country_name": rec["country_name"],
+            "review_texts": list(rec["review_texts"] or []),
+            "score": float(score),
+        }
+
+
+class VectorStore(HotelScope):
+    """One vector per hotel."""
+
+    def __init__(self, records: List[Dict[str, Any]], vectors: List[List[float]], scales: Optional[np.ndarray] = None):
+        """
+        vectors are normalised to float32, except float16 / int8 matrices (see
+        retrieval/vector_sidecar.py), which are used as given, memory-mapped or not;
+        int8 rows come with their per-row scales.
+        """
+        super().__init__(records)
+        if isinstance(vectors, np.ndarray) and vectors.dtype in (np.float16, np.int8):
+            self.matrix = vectors
+        else:
+            self.matrix = normalized_rows(vectors)
+        self.scales = scales
+        self.set_prefilter(PREFILTER_DIMS, PREFILTER_OVERSAMPLE)
+        self.set_binary_prefilter(BINARY_PREFILTER, BINARY_OVERSAMPLE)
+        if PREFILTER_DIMS:
+            warn_unmeasured("VECTOR_PREFILTER_DIMS", "truncated_search_benchmark.json", "benchmark_truncated_search")
+        if BINARY_PREFILTER:
+            warn_unmeasured("VECTOR_BINARY_PREFILTER", "binary_search_benchmark.json", "benchmark_binary_search")
+
+    @classmethod
+    def from_graph(cls, db, property_name: str) -> "VectorStore":
+        """Load every embedded hotel of a model property from the graph in one query."""
+        rows = db.run_template("hotel_vectors", {"property": property_name})
+        return cls([{k: row[k] for k in ("h", "city_name", "country_name", "review_texts")} for row in rows],
+                   [row["embedding"] for row in rows])
+
+    @classmethod
+    def from_sidecar(cls, db, path: str) -> Optional["VectorStore"]:
+        """
+        Vectors memory-mapped from a sidecar written by EmbeddingIndexer (None if there is
+        none), hotel rows from the graph. Hotels no longer in the graph are dropped, which
+        copies the remaining rows into memory.
+        """
+        from retrieval.vector_sidecar import read_sidecar
+
+        sidecar = read_sidecar(path)
+        if sidecar is None:
+            return None
+        ids, matrix, scales = sidecar
+        warn_unmeasured("VECTOR_SIDECAR", "vector_storage_benchmark.json", "benchmark_vector_storage")
+        records = {row["h"]["hotel_id"]: row for row in db.run_template("hotel_records", {"hotel_ids": ids.tolist()})}
+        keep = [i for i, hid in enumerate(ids.tolist()) if hid in records]
+        if len(keep) < len(ids):
+            print(f"VectorStore: {len(ids) - len(keep)} sidecar hotels are not in the graph; re-run EmbeddingIndexer")
+            matrix = np.asarray(matrix[keep])
+            scales = np.asarray(scales[keep]) if scales is not None else None
+        return cls([records[hid] for hid in ids[keep].tolist()], matrix, scales)
+
+    def _scores(self, rows, query: np.ndarray) -> np.ndarray:
+        """Cosine of `rows` (index array or slice) with the normalised query."""
+        part = self.matrix[rows]
+        if part.dtype == np.float32:
+            scores = part @ query
+        else:
+            # float16 / int8 rows are widened WIDEN_ROWS at a time, so the copy stays in cache
+            scores = np.empty(len(part), dtype=np.float32)
+            for start in range(0, len(part), WIDEN_ROWS):
+                scores[start:start + WIDEN_ROWS] = part[start:start + WIDEN_ROWS].astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[rows]
+        return scores
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def set_prefilter(self, dims: int = 0, oversample: int = PREFILTER_OVERSAMPLE):
+        """Truncated-dimension prefilter: score the leading `dims` dimensions first (0 = off)."""
+        self.prefilter_dims = int(dims or 0)
+        self.prefilter_oversample = max(1, int(oversample))
+        self._prefix = None
+
+    def prefix_matrix(self) -> np.ndarray:
+        """Leading prefilter_dims dimensions of every row, renormalised (float32, built on first use)."""
+        if self._prefix is None:
+            self._prefix = normalized_rows(self.matrix[:, :self.prefilter_dims])
+        return self._prefix
+
+    def set_binary_prefilter(self, enabled: bool = True, oversample: int = BINARY_OVERSAMPLE):
+        """Binary prefilter: shortlist by sign-bit Hamming distance first (takes precedence over set_prefilter)."""
+        self.binary_prefilter = bool(enabled)
+        self.binary_oversample = max(1, int(oversample))
+        self._codes = None
+
+    def codes(self) -> np.ndarray:
+        """Packed sign-bit code of every row (uint64 words, built on first use)."""
+        if self._codes is None:
+            self._codes = binary_codes(self.matrix)
+        return self._codes
+
+    @staticmethod
+    def _best(rows: np.ndarray, k: int, score):
+        """(rows, scores) of the k best `rows` by score(index), best first; index is a slice when rows are contiguous."""
+        contiguous = rows[-1] - rows[0] + 1 == len(rows)
+        best_rows, best_scores = [], []
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            scores = score(slice(block[0], block[-1] + 1) if contiguous else block)
+            if len(block) > k:
+                keep = np.argpartition(-scores, k - 1)[:k]
+                block, scores = block[keep], scores[keep]
+            best_rows.append(block)
+            best_scores.append(scores)
+        rows, scores = np.concatenate(best_rows), np.concatenate(best_scores)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return rows[order], scores[order]
+
+    def top_k(self, embedding: List[float], allowed: Optional[np.ndarray] = None, top_k: int = 10):
+        """(row indices, scores) of the k best allowed rows, best first. Scores are Neo4j-style (1 + cos) / 2."""
+        rows = np.flatnonzero(allowed) if allowed is not None else np.arange(len(self))
+        k = min(int(top_k) if top_k is not None else 10, len(rows))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = normalized_query(embedding)
+        dims = self.prefilter_dims
+        if self.binary_prefilter and len(rows) > k * self.binary_oversample:
+            # shortlist by Hamming distance of the sign bits, then rescore the survivors in full precision
+            codes, query_code = self.codes(), binary_codes(query[None, :])[0]
+            rows, _ = self._best(rows, k * self.binary_oversample,
+                                 lambda index: -hamming_distances(codes[index], query_code))
+            rows = np.sort(rows)
+        elif 0 < dims < self.matrix.shape[1] and len(rows) > k * self.prefilter_oversample:
+            # shortlist on the leading dimensions, then rescore the survivors at full width
+            prefix, prefix_query = self.prefix_matrix(), normalized_query(query[:dims])
+            rows, _ = self._best(rows, k * self.prefilter_oversample, lambda index: prefix[index] @ prefix_query)
+            rows = np.sort(rows)
+        rows, scores = self._best(rows, k, lambda index: self._scores(index, query))
+        return rows, (1.0 + scores) / 2.0
+
+    def search(self, embedding: List[float], cities: List[str] = None, countries: List[str] = None,
+               top_k: int = 10, rating_filter: dict = None) -> List[Dict[str, Any]]:
+        """Exact filtered top-k; rows shaped like EmbeddingRetriever._search_hotels_generic."""
+        if not len(self) or not embedding:
+            return []
+        rows, scores = self.top_k(embedding, self.mask(cities, countries, rating_filter), top_k)
+        return [self.result_row(i, score) for i, score in zip(rows, scores)]
+
+
+def pool_hotel_scores(hotel_rows: np.ndarray, scores: np.ndarray, top_n: Optional[int]):
+    """
+    Pool review scores per hotel in one vectorized pass (top_n=None: mean of all).
+    Returns (hotel rows, pooled scores, order, starts, counts): `order` sorts the
+    reviews by hotel, best score first, so hotel j's reviews are
+    order[starts[j]:starts[j] + counts[j]].
+    """
+    order = np.lexsort((-scores, hotel_rows))
+    hotels, starts, counts = np.unique(hotel_rows[order], return_index=True, return_counts=True)
+    rank = np.arange(len(order)) - np.repeat(starts, counts)
+    keep = rank < top_n if top_n else np.ones(len(order), dtype=bool)
+    group = np.repeat(np.arange(len(hotels)), counts)
+    sums = np.bincount(group, weights=np.where(keep, scores[order], 0.0), minlength=len(hotels))
+    kept = np.bincount(group, weights=keep, minlength=len(hotels))
+    return hotels, sums / kept, order, starts, counts
+
+
+class ReviewVectorStore(HotelScope):
+    """
+    One vector per review; hotels are ranked by their pooled review scores and
+    returned with the best matching reviews as evidence.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], reviews: List[Dict[str, Any]], vectors: List[List[float]]):
+        """reviews: {"review_id", "hotel_id", "text"} per vector; reviews of hotels not in records are dropped."""
+        super().__init__(records)
+        keep = [i for i, review in enumerate(reviews) if review["hotel_id"] in self.row_of]
+        self.reviews = [reviews[i] for i in keep]
+        self.matrix = normalized_rows([vectors[i] for i in keep]) if keep else np.zeros((0, 0), dtype=np.float32)
+        self.review_hotel = np.asarray([self.row_of[r["hotel_id"]] for r in self.reviews], dtype=np.int64)
+
+    def search(self, embedding: List[float], cities: List[str] = None, countries: List[str] = None,
+               top_k: int = 10, rating_filter: dict = None, pooling: str = "top_n", top_n: int = 3,
+               snippets: int = 3) -> List[Dict[str, Any]]:
+        """
+        Exact filtered search over every review of the hotels in scope, pooled to hotel
+        scores with `pooling` ("max", "mean" or "top_n": mean of the top_n best reviews).
+        Rows are shaped like VectorStore.search, with review_texts / evidence holding the
+        `snippets` best matching reviews.
+        """
+        if not len(self.reviews) or not embedding:
+            return []
+        allowed = self.mask(cities, countries, rating_filter)
+        rows = np.flatnonzero(allowed[self.review_hotel])
+        if not len(rows):
+            return []
+
+        query = normalized_query(embedding)
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            scores[start:start + BLOCK_ROWS] = self.matrix[rows[start:start + BLOCK_ROWS]] @ query
+        scores = (1.0 + scores) / 2.0
+
+        n = POOLING_TOP_N[pooling] if pooling in POOLING_TOP_N else top_n
+        hotels, pooled, order, starts, counts = pool_hotel_scores(self.review_hotel[rows], scores, n)
+        k = min(int(top_k) if top_k is not None else 10, len(hotels))
+        best = np.argpartition(-pooled, k - 1)[:k] if len(hotels) > k else np.arange(len(hotels))
+        best = best[np.argsort(-pooled[best], kind="stable")]
+
+        results = []
+        for j in best:
+            top = order[starts[j]:starts[j] + min(counts[j], snippets)]
+            evidence = [dict(self.reviews[rows[t]], score=float(scores[t])) for t in top]
+            row = self.result_row(hotels[j], pooled[j])
+            row.update({"review_texts": [e["text"] for e in evidence], "evidence": evidence,
+                        "matched_reviews": int(counts[j])})
+            results.append(row)
+        return results
@@ -0,0 +1,59 @@
+"""
+Recall / latency of the binary Hamming prefilter (VECTOR_BINARY_PREFILTER).
+
+Same catalog as benchmark_vector_storage: the real hotel vectors of each
+model plus perturbed copies up to `size` hotels, searched with the benchmark
+queries. Every hotel is reduced to one sign bit per dimension (packed in
+uint64 words); the k * oversample nearest codes by Hamming distance are
+rescored at full precision. For each oversample factor it reports recall@10
+against the full-precision search and the median search time, next to the
+size of the codes. Results go to tests/results/binary_search_benchmark.json.
+
+    python -m tests.benchmark_binary_search [size]
+"""
+import json
+import statistics
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from in_memory_graph import InMemoryGraph
+from preprocessing.embedding_encoder import EmbeddingEncoder
+from retrieval.feature_builder import build_feature_text
+from retrieval.vector_store import VectorStore
+from tests.benchmark_onnx_backend import QUERIES
+from tests.benchmark_vector_storage import TOP_K, ranked, records, search_ms, synthetic_catalog
+
+RESULTS_PATH = Path(__file__).resolve().parent / "results" / "binary_search_benchmark.json"
+OVERSAMPLES = (2, 5, 10, 20, 50)
+
+
+def run(size: int = 20000):
+    documents = [build_feature_text(rec) for rec in InMemoryGraph().feature_records()]
+    report = {"catalog_size": size, "top_k": TOP_K, "models": {}}
+    for name in ("minilm", "bge"):
+        encoder = EmbeddingEncoder(name)
+        catalog = synthetic_catalog(np.asarray(encoder.encode_batch(documents)), size)
+        queries = encoder.encode_batch(QUERIES)
+        store = VectorStore(records(size), catalog)
+        store.set_prefilter(0)
+        store.set_binary_prefilter(False)
+        expected = [ranked(store, q) for q in queries]
+        results = {"full": {"recall_at_10": 1.0, "search_ms": search_ms(store, queries)}}
+
+        store.codes()  # built once, outside the timings
+        for oversample in OVERSAMPLES:
+            store.set_binary_prefilter(True, oversample)
+            recall = statistics.mean(len(set(ranked(store, q)) & set(e)) / TOP_K for q, e in zip(queries, expected))
+            results[str(oversample)] = {"oversample": oversample, "recall_at_10": recall,
+                                        "search_ms": search_ms(store, queries)}
+        report["models"][name] = {"dimensions": catalog.shape[1], "matrix_mb": store.matrix.nbytes / 2**20,
+                                  "codes_mb": store.codes().nbytes / 2**20, "results": results}
+        print(name, {key: (round(r["recall_at_10"], 3), round(r["search_ms"], 2)) for key, r in results.items()})
+
+    RESULTS_PATH.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
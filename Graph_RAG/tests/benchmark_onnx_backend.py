@@ -0,0 +1,90 @@
+"""
+Parity check + latency benchmark: PyTorch vs int8 ONNX embedding backends.
+
+For MiniLM and BGE: embeds sample queries and every hotel feature text with
+both backends, requires cosine >= PARITY_MIN_COSINE for every text, and times
+single-query encodes (what a chat request pays) and one batch of all hotel
+documents (what indexing pays). Results go to tests/results/onnx_benchmark.json.
+
+    python -m tests.benchmark_onnx_backend [runs]
+"""
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from in_memory_graph import InMemoryGraph
+from preprocessing.embedding_encoder import EmbeddingEncoder
+from preprocessing.onnx_backend import PARITY_MIN_COSINE, QUANTIZATION_CONFIG, load_int8, parity
+from retrieval.feature_builder import build_feature_text
+
+RESULTS_PATH = Path(__file__).resolve().parent / "results" / "onnx_benchmark.json"
+QUERIES = [
+    "Find me hotels in Cairo above 8",
+    "quiet hotel in Paris with very clean rooms",
+    "best hotels for families in Dubai",
+    "Do Egyptians need a visa for France?",
+    "cheap hotel near the beach with great staff",
+    "luxury 5 star hotel in Tokyo for a couple",
+    "Which hotels in Rome have the best location score?",
+    "hotels in New York with good value for money",
+]
+
+
+def latency_ms(model, texts, runs):
+    """Median / p95 of single-text encodes, after one warm-up pass."""
+    for text in texts:
+        model.encode(text)
+    timings = []
+    for _ in range(runs):
+        for text in texts:
+            start = time.perf_counter()
+            model.encode(text)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"median": statistics.median(timings), "p95": timings[int(len(timings) * 0.95) - 1]}
+
+
+def batch_ms(model, texts, runs):
+    model.encode(texts)
+    start = time.perf_counter()
+    for _ in range(runs):
+        model.encode(texts)
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def run(runs: int = 20):
+    documents = [build_feature_text(rec) for rec in InMemoryGraph().feature_records()]
+    report = {"quantization": QUANTIZATION_CONFIG, "runs": runs, "models": {}}
+    failed = []
+    for name, model_id in (("minilm", EmbeddingEncoder.MODEL_NAME), ("bge", EmbeddingEncoder.MODEL_2_NAME)):
+        torch_model = EmbeddingEncoder(name, backend="torch").model
+        onnx_model = load_int8(model_id)
+
+        checks = {"queries": parity(torch_model, onnx_model, QUERIES),
+                  "documents": parity(torch_model, onnx_model, documents)}
+        torch_single, onnx_single = latency_ms(torch_model, QUERIES, runs), latency_ms(onnx_model, QUERIES, runs)
+        torch_batch, onnx_batch = batch_ms(torch_model, documents, runs), batch_ms(onnx_model, documents, runs)
+        report["models"][name] = {
+            "model": model_id,
+            "parity": checks,
+            "single_query_ms": {"torch": torch_single, "onnx_int8": onnx_single,
+                                "speedup": torch_single["median"] / onnx_single["median"]},
+            "batch_ms": {"texts": len(documents), "torch": torch_batch, "onnx_int8": onnx_batch,
+                         "speedup": torch_batch / onnx_batch},
+        }
+        print(f"{name}: parity min cos {checks['queries']['min_cosine']:.4f} (queries) / "
+              f"{checks['documents']['min_cosine']:.4f} (documents); "
+              f"query {torch_single['median']:.1f} -> {onnx_single['median']:.1f} ms; "
+              f"batch of {len(documents)} {torch_batch:.0f} -> {onnx_batch:.0f} ms")
+        failed += [f"{name}/{kind}" for kind, check in checks.items() if not check["passed"]]
+
+    RESULTS_PATH.write_text(json.dumps(report, indent=2))
+    if failed:
+        print(f"Parity below {PARITY_MIN_COSINE}: {failed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
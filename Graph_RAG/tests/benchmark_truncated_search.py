@@ -0,0 +1,57 @@
+"""
+Recall / latency of the truncated-dimension prefilter (VECTOR_PREFILTER_DIMS).
+
+Same catalog as benchmark_vector_storage: the real hotel vectors of each
+model plus perturbed copies up to `size` hotels, searched with the benchmark
+queries. For each truncation it reports recall@10 against the full-width
+search, the median search time and the size of the prefix matrix, so the
+smallest truncation that keeps recall can be picked per model. MiniLM and BGE
+are not trained Matryoshka-style, which is why this has to be measured.
+Results go to tests/results/truncated_search_benchmark.json.
+
+    python -m tests.benchmark_truncated_search [size] [oversample]
+"""
+import json
+import statistics
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from in_memory_graph import InMemoryGraph
+from preprocessing.embedding_encoder import EmbeddingEncoder
+from retrieval.feature_builder import build_feature_text
+from retrieval.vector_store import VectorStore
+from tests.benchmark_onnx_backend import QUERIES
+from tests.benchmark_vector_storage import TOP_K, ranked, records, search_ms, synthetic_catalog
+
+RESULTS_PATH = Path(__file__).resolve().parent / "results" / "truncated_search_benchmark.json"
+TRUNCATIONS = (32, 64, 96, 128, 192, 256, 384)
+
+
+def run(size: int = 20000, oversample: int = 8):
+    documents = [build_feature_text(rec) for rec in InMemoryGraph().feature_records()]
+    report = {"catalog_size": size, "top_k": TOP_K, "oversample": oversample, "models": {}}
+    for name in ("minilm", "bge"):
+        encoder = EmbeddingEncoder(name)
+        catalog = synthetic_catalog(np.asarray(encoder.encode_batch(documents)), size)
+        queries = encoder.encode_batch(QUERIES)
+        store = VectorStore(records(size), catalog)
+        store.set_prefilter(0)
+        expected = [ranked(store, q) for q in queries]
+        results = {"full": {"dims": catalog.shape[1], "recall_at_10": 1.0, "search_ms": search_ms(store, queries)}}
+
+        for dims in (d for d in TRUNCATIONS if d < catalog.shape[1]):
+            store.set_prefilter(dims, oversample)
+            store.prefix_matrix()  # built once, outside the timings
+            recall = statistics.mean(len(set(ranked(store, q)) & set(e)) / TOP_K for q, e in zip(queries, expected))
+            results[str(dims)] = {"dims": dims, "recall_at_10": recall, "search_ms": search_ms(store, queries),
+                                  "prefix_mb": store.prefix_matrix().nbytes / 2**20}
+        report["models"][name] = results
+        print(name, {key: (round(r["recall_at_10"], 3), round(r["search_ms"], 2)) for key, r in results.items()})
+
+    RESULTS_PATH.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 8)
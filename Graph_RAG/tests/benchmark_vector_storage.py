@@ -0,0 +1,89 @@
+"""
+Recall / memory / latency of the compact vector sidecar formats against float32.
+
+Embeds every hotel feature text and the benchmark queries with each model,
+then grows the catalog to `size` hotels by adding small perturbations of the
+real hotel vectors (the KG only has a few dozen hotels). For float32,
+float16 and int8 stores over the same vectors it reports recall@10 against
+the float32 ranking, bytes per vector and the median search time. Results go
+to tests/results/vector_storage_benchmark.json.
+
+    python -m tests.benchmark_vector_storage [size]
+"""
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from in_memory_graph import InMemoryGraph
+from preprocessing.embedding_encoder import EmbeddingEncoder
+from retrieval.feature_builder import build_feature_text
+from retrieval.vector_sidecar import SIDECAR_DTYPES, quantize
+from retrieval.vector_store import VectorStore
+from tests.benchmark_onnx_backend import QUERIES
+
+RESULTS_PATH = Path(__file__).resolve().parent / "results" / "vector_storage_benchmark.json"
+TOP_K = 10
+NOISE = 0.3
+
+
+def synthetic_catalog(vectors: np.ndarray, size: int, seed: int = 0) -> np.ndarray:
+    """`size` rows: the real vectors first, then noisy copies of random real vectors."""
+    rng = np.random.default_rng(seed)
+    extra = max(0, size - len(vectors))
+    base = vectors[rng.integers(0, len(vectors), extra)]
+    noise = rng.normal(scale=NOISE * vectors.std(), size=base.shape)
+    return np.vstack([vectors, base + noise]).astype(np.float32)
+
+
+def records(size: int):
+    return [{"h": {"hotel_id": i}, "city_name": "", "country_name": "", "review_texts": []} for i in range(size)]
+
+
+def ranked(store: VectorStore, query) -> list:
+    ids, _ = store.top_k(query, top_k=TOP_K)
+    return ids.tolist()
+
+
+def search_ms(store: VectorStore, queries, runs: int = 5) -> float:
+    timings = []
+    for _ in range(runs):
+        for query in queries:
+            start = time.perf_counter()
+            store.top_k(query, top_k=TOP_K)
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(size: int = 20000):
+    documents = [build_feature_text(rec) for rec in InMemoryGraph().feature_records()]
+    report = {"catalog_size": size, "top_k": TOP_K, "models": {}}
+    for name in ("minilm", "bge"):
+        encoder = EmbeddingEncoder(name)
+        catalog = synthetic_catalog(np.asarray(encoder.encode_batch(documents)), size)
+        queries = encoder.encode_batch(QUERIES)
+
+        full = VectorStore(records(size), catalog)
+        expected = [ranked(full, q) for q in queries]
+        results = {"float32": {"recall_at_10": 1.0, "bytes_per_vector": full.matrix.itemsize * catalog.shape[1],
+                               "search_ms": search_ms(full, queries)}}
+        for dtype in SIDECAR_DTYPES:
+            rows, scales = quantize(catalog, dtype)
+            store = VectorStore(records(size), rows, scales)
+            recall = statistics.mean(len(set(ranked(store, q)) & set(e)) / TOP_K for q, e in zip(queries, expected))
+            per_vector = rows.itemsize * rows.shape[1] + (scales.itemsize if scales is not None else 0)
+            results[dtype] = {"recall_at_10": recall, "bytes_per_vector": per_vector,
+                              "memory_reduction": results["float32"]["bytes_per_vector"] / per_vector,
+                              "search_ms": search_ms(store, queries)}
+        report["models"][name] = {"dimensions": catalog.shape[1], "results": results}
+        print(name, {dtype: (round(r["recall_at_10"], 3), r["bytes_per_vector"], round(r["search_ms"], 2))
+                     for dtype, r in results.items()})
+
+    RESULTS_PATH.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
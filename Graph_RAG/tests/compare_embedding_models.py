@@ -36,7 +36,7 @@ def run_experiment(query: str, limit: int = 5):
         console.print(f"   ❌ Failed: {e}")
         return
 
-    # --- 2. Run BGE (768d) ---
+    # --- 2. Run BGE (384d) ---
     console.print("\n[bold cyan]2. Loading & Querying BGE...[/]")
     try:
         pipeline_bge = RetrievalPipeline(model_name="bge")
@@ -0,0 +1,43 @@
+from in_memory_graph import InMemoryGraph
+from preprocessing.alias_index import get_alias_index
+from retrieval.baseline_retriever import BaselineRetriever
+
+aliases = get_alias_index()
+graph = InMemoryGraph()
+
+
+def test_alias_lookup():
+    # pycountry names, ISO codes, demonyms and spelling variants all land on the KG name
+    for name in ("United States of America", "USA", "us", "American"):
+        assert aliases.country(name) == "United States"
+    assert aliases.country("Korea, Republic of") == "South Korea"
+    assert aliases.country("türkiye") == "Turkey"
+    assert aliases.city("Bombay") == "Mumbai" and aliases.city("NYC") == "New York"
+    assert aliases.country_of_city("new york city") == "United States"
+    assert aliases.country("Atlantis") is None
+
+    entities = aliases.canonicalize({"countries": ["UK", "Great Britain"], "origin_country": "Egyptian",
+                                     "cities": ["Roma"], "hotels": ["Kiwi"]})
+    print("Canonical entities:", entities)
+    assert entities == {"countries": ["United Kingdom"], "origin_country": ["Egypt"],
+                        "cities": ["Rome"], "hotels": ["Kiwi"]}
+
+
+def test_retrieval_with_aliases():
+    retriever = BaselineRetriever(graph)
+    rows, _ = retriever.retrieve("visa_query", {"origin_country": ["Arab Republic of Egypt"],
+                                                "destination_country": ["FRA"]})
+    assert [(r["origin_country"], r["destination_country"]) for r in rows] == [("Egypt", "France")]
+
+    hotels, _ = retriever.retrieve("hotel_search", {"cities": ["Bombay"], "limit": 3})
+    assert hotels and {h["city"] for h in hotels} == {"Mumbai"}
+
+    rows = graph.run_template("resolve_location_aliases", {"aliases": ["usa", "bombay", "singapore"]})
+    print("Alias rows:", rows)
+    assert {(r["kind"], r["canonical"]) for r in rows} == {
+        ("country", "United States"), ("city", "Mumbai"), ("country", "Singapore"), ("city", "Singapore")}
+
+
+if __name__ == "__main__":
+    test_alias_lookup()
+    test_retrieval_with_aliases()
@@ -0,0 +1,111 @@
+from retrieval.embedding_retriever import (
+    EXACT_SCOPE_MAX, FETCH_GROWTH, MAX_FETCH_K, EmbeddingRetriever, build_hotel_search_query,
+    build_scope_count_query, initial_fetch_k,
+)
+
+CLEAN = {"type": "cleanliness", "operator": "between", "min": 8, "max": 9}
+
+
+class FakeNeo4j:
+    """
+    Answers the scope count, the hotel total and the vector search. Of the fetch_k
+    index candidates, fetch_k * scope / total * hit_rate fall in each group's scope
+    (hit_rate < 1: the nearest neighbours are mostly outside the filter).
+    """
+
+    def __init__(self, scope_sizes, total=100000, hit_rate=1.0):
+        self.scope_sizes, self.total, self.hit_rate = scope_sizes, total, hit_rate
+        self.searches = []
+
+    def run_query(self, cypher, params=None):
+        params = params or {}
+        if "scope_size" in cypher:
+            return [{"grp": grp if "groups" in params else None, "scope_size": size}
+                    for grp, size in self.scope_sizes.items()]
+        if "AS total" in cypher:
+            return [{"total": self.total}]
+        exact = "vector.similarity.cosine" in cypher
+        self.searches.append("exact" if exact else params["fetch_k"])
+        rows = []
+        for grp, size in self.scope_sizes.items():
+            found = size if exact else int(params["fetch_k"] * size / self.total * self.hit_rate)
+            for i in range(min(params["top_k"], size, found)):
+                row = {"h": {"hotel_id": f"{grp}-{i}"}, "score": 1.0}
+                if "groups" in params:
+                    row["group"] = grp.title()
+                rows.append(row)
+        return rows
+
+
+def search(db, top_k=10, **scope):
+    retriever = EmbeddingRetriever(db)
+    return retriever._search_neo4j([0.1], top_k=top_k, **scope)
+
+
+def test_initial_fetch_k():
+    # unfiltered: a little oversampling, never fewer than top_k
+    assert initial_fetch_k(10, 1000, 1000) == 20
+    # 1% selectivity: ~top_k / 0.01 candidates, capped
+    assert initial_fetch_k(10, 100, 10000) == 2000
+    assert initial_fetch_k(10, 1, 10**6) == MAX_FETCH_K
+    assert initial_fetch_k(10, 0, 0) == 20
+
+
+def test_query_modes():
+    cypher, params = build_hotel_search_query("embedding_minilm", "idx", [0.1], cities=["Paris"], top_k=5,
+                                              rating_filter=CLEAN, exact=True)
+    assert "vector.similarity.cosine" in cypher and "queryNodes" not in cypher
+    assert params["cities"] == ["paris"] and params["f0_min"] == 8
+
+    cypher, params = build_hotel_search_query("embedding_minilm", "idx", [0.1], cities=["Paris"], top_k=5,
+                                              fetch_k=400)
+    assert "queryNodes" in cypher and params["fetch_k"] == 400
+
+    cypher, params = build_scope_count_query("embedding_minilm", cities=["Paris", "Rome"], rating_filter=CLEAN)
+    print(cypher)
+    assert "UNWIND $groups" in cypher and params["groups"] == ["paris", "rome"]
+    assert EXACT_SCOPE_MAX >= 25  # the shipped KG is always scored exactly
+
+
+def test_small_scope_is_scored_exactly():
+    db = FakeNeo4j({"paris": EXACT_SCOPE_MAX})
+    assert len(search(db, cities=["Paris"])) == 10
+    assert db.searches == ["exact"]
+
+    db = FakeNeo4j({"paris": 0})
+    assert search(db, cities=["Paris"]) == [] and db.searches == []
+
+
+def test_pool_grows_until_the_groups_are_filled():
+    # the estimate is right: the first pool already fills top_k
+    db = FakeNeo4j({None: 3000})
+    assert len(search(db, rating_filter=CLEAN)) == 10
+    assert db.searches == [initial_fetch_k(10, 3000, db.total)]
+
+    # only 1/8 of the expected candidates are in scope: grow by FETCH_GROWTH until they are
+    db = FakeNeo4j({None: 3000}, hit_rate=1 / 8)
+    assert len(search(db, rating_filter=CLEAN)) == 10
+    first = initial_fetch_k(10, 3000, db.total)
+    assert db.searches == [first, first * FETCH_GROWTH]
+
+    # grouped: the pool keeps growing until every group has min(top_k, scope) rows
+    db = FakeNeo4j({"paris": 3000, "rome": 60000}, hit_rate=1 / 8)
+    rows = search(db, cities=["Paris", "Rome"])
+    assert [r["group"] for r in rows].count("Paris") == 10 and len(rows) == 20
+    assert db.searches == [first, first * FETCH_GROWTH]
+
+
+def test_pool_stops_at_the_cap():
+    db = FakeNeo4j({None: 3000}, hit_rate=1 / 100)
+    rows = search(db, rating_filter=CLEAN)
+    first = initial_fetch_k(10, 3000, db.total)
+    assert db.searches == [first, first * FETCH_GROWTH, MAX_FETCH_K]
+    assert len(rows) == 1  # whatever the capped pool found
+
+
+if __name__ == "__main__":
+    test_initial_fetch_k()
+    test_query_modes()
+    test_small_scope_is_scored_exactly()
+    test_pool_grows_until_the_groups_are_filled()
+    test_pool_stops_at_the_cap()
@@ -0,0 +1,72 @@
+import tempfile
+
+from preprocessing import embedding_cache
+from preprocessing.embedding_cache import EmbeddingCache, normalize_query
+
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def vec(i):
+    return [float(i), 0.5, -1.0, 2.0]
+
+
+def test_memory_lru():
+    assert normalize_query("  Hotels in\tPARIS ") == "hotels in paris"
+
+    cache = EmbeddingCache(MODEL, dim=4, capacity=2)
+    cache.put("hotels in Paris", vec(1))
+    cache.put("hotels in Rome", vec(2))
+    assert cache.get("HOTELS  in paris") == vec(1)  # normalized key, and now most recent
+    cache.put("hotels in Cairo", vec(3))  # evicts Rome
+    assert cache.get("hotels in Rome") is None
+    assert EmbeddingCache("BAAI/bge-small-en-v1.5", dim=4).get("hotels in Paris") is None
+
+    stats = cache.get_stats()
+    print("Memory tier:", stats)
+    assert stats["lookups"] == 2 and stats["memory_hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5 and stats["memory_entries"] == 2
+
+
+def test_disk_tier_survives_restart():
+    cache_dir = tempfile.mkdtemp()
+    embedding_cache.DISK_INITIAL_ROWS = 2  # force the memmap to grow
+    try:
+        cache = EmbeddingCache(MODEL, dim=4, capacity=1, cache_dir=cache_dir)
+        for i in range(5):
+            cache.put(f"query {i}", vec(i))
+        assert cache.get("query 0") == vec(0)  # evicted from memory, served from disk
+        assert cache.get_stats()["disk_hits"] == 1
+        cache.close()
+    finally:
+        embedding_cache.DISK_INITIAL_ROWS = 1024
+
+    restarted = EmbeddingCache(MODEL, dim=4, capacity=8, cache_dir=cache_dir)
+    assert [restarted.get(f"Query {i}") for i in range(5)] == [vec(i) for i in range(5)]
+    stats = restarted.get_stats()
+    print("After restart:", stats)
+    assert stats["disk_hits"] == 5 and stats["disk_entries"] == 5
+
+
+def test_processes_sharing_a_dir():
+    # two workers on one cache_dir: each must allocate fresh rows and see the other's keys
+    cache_dir = tempfile.mkdtemp()
+    embedding_cache.DISK_INITIAL_ROWS = 2
+    try:
+        first = embedding_cache.DiskTier(cache_dir, MODEL, 4)
+        second = embedding_cache.DiskTier(cache_dir, MODEL, 4)
+        for i in range(0, 6, 2):
+            first.put(f"query {i}", vec(i))
+            second.put(f"query {i + 1}", vec(i + 1))
+        second.put("query 0", vec(99))  # already written by the first: kept as is
+    finally:
+        embedding_cache.DISK_INITIAL_ROWS = 1024
+
+    assert sorted(second.rows.values()) == list(range(6))
+    for tier in (first, second, embedding_cache.DiskTier(cache_dir, MODEL, 4)):
+        assert [tier.get(f"query {i}") for i in range(6)] == [vec(i) for i in range(6)]
+
+
+if __name__ == "__main__":
+    test_memory_lru()
+    test_disk_tier_survives_restart()
+    test_processes_sharing_a_dir()
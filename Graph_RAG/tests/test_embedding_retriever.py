@@ -0,0 +1,61 @@
+import zlib
+
+import numpy as np
+
+from in_memory_graph import InMemoryGraph
+from retrieval.embedding_retriever import EmbeddingRetriever
+
+
+class HashEncoder:
+    """Encoder stand-in: a fixed pseudo-random vector per text."""
+
+    def encode(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode())).normal(size=16).tolist()
+
+    def encode_batch(self, texts):
+        return [self.encode(text) for text in texts]
+
+
+retriever = EmbeddingRetriever(InMemoryGraph())
+retriever.encoder = HashEncoder()
+
+
+def hotel_rows(rows):
+    return [row for row in rows if "h" in row]
+
+
+def test_hotel_visa_respects_limit():
+    # the visa-free countries are one scope, not one group each
+    rows = retriever.sem_search_hotels("quiet hotel", {"origin_country": ["Egypt"], "limit": 3}, intent="hotel_visa")
+    hotels = hotel_rows(rows)
+    print("Visa-free hotels:", [(r["h"]["name"], r["country_name"]) for r in hotels])
+    assert len(hotels) == 3 and not any("group" in r for r in hotels)
+    assert any(r.get("visa_type") == "Visa Free" for r in rows)
+
+    same = retriever.sem_search_hotels("quiet hotel", {"origin_country": ["Egypt"], "limit": 3}, intent="hotel_search")
+    assert len(hotel_rows(same)) == 3
+
+
+def test_named_destinations_stay_grouped():
+    rows = retriever.sem_search_hotels("quiet hotel", {"cities": ["Paris", "Rome"], "limit": 1})
+    assert [r["group"] for r in rows] == ["Paris", "Rome"]
+
+
+def test_missing_sidecar_is_an_error():
+    # in sidecar mode the Hotel nodes have no vectors: searching must not quietly return nothing
+    sidecar = EmbeddingRetriever(object())
+    sidecar.encoder = HashEncoder()
+    sidecar.sidecar, sidecar.use_vector_store = "int8", True
+    sidecar.property_name = "embedding_not_indexed"
+    try:
+        sidecar.sem_search_hotels("quiet hotel", {"limit": 3})
+    except RuntimeError as e:
+        assert "EmbeddingIndexer" in str(e)
+    else:
+        raise AssertionError("expected a missing-sidecar error")
+
+
+if __name__ == "__main__":
+    test_hotel_visa_respects_limit()
+    test_named_destinations_stay_grouped()
+    test_missing_sidecar_is_an_error()
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from preprocessing.embedding_cache import EmbeddingCache
+from preprocessing.encoder_service import EncoderService
+
+
+class RecordingEncoder:
+    """Encoder with the EmbeddingEncoder interface that records every batch it is given."""
+
+    dim = 2
+
+    def __init__(self):
+        self.batches = []
+        self.cache = EmbeddingCache("recording", dim=2)
+
+    def encode_batch(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(0.01)  # model call: the next requests queue up meanwhile
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_concurrent_requests_share_batches():
+    encoder = RecordingEncoder()
+    service = EncoderService(encoder, max_batch=8, max_wait_ms=20)
+    texts = [f"hotels in city {'x' * i}" for i in range(16)]
+    results = {}
+
+    def ask(text):
+        results[text] = service.encode(text)
+
+    threads = [threading.Thread(target=ask, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # every caller gets its own vector back
+    assert all(results[text] == [float(len(text)), 1.0] for text in texts)
+    stats = service.get_stats()
+    print("Batches:", [len(b) for b in encoder.batches], stats)
+    assert stats["requests"] == 16 and stats["batches"] < 16 and stats["largest_batch"] <= 8
+
+    # repeated queries are answered by the encoder's cache without a model call
+    assert service.encode(texts[0]) == results[texts[0]]
+    assert stats["batches"] == service.get_stats()["batches"]
+    assert service.dim == 2 and service.encode("  ") == []
+    service.close()
+
+
+def test_failures_reach_every_caller():
+    class Broken(RecordingEncoder):
+        def encode_batch(self, texts):
+            raise RuntimeError("model unavailable")
+
+    service = EncoderService(Broken(), max_batch=4, max_wait_ms=1)
+    try:
+        service.encode("hotels in Paris")
+    except RuntimeError as e:
+        assert "model unavailable" in str(e)
+    else:
+        raise AssertionError("expected the encoder error")
+    assert service.get_stats()["failures"] == 1
+    service.close()
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_batches()
+    test_failures_reach_every_caller()
@@ -0,0 +1,40 @@
+from retrieval.baseline_retriever import BaselineRetriever
+from retrieval.query_templates import QUERY_TEMPLATES
+from tests.test_segment_cube import build_graph
+
+# hotel 1 averages 8.0: review 4 is the latest, 3 matches the average, 1 and 2 are 1.0 away
+REVIEWS = [
+    # review_id, user_id, hotel_id, date, overall
+    (1, 1, 1, "2024-01-01", 9.0),
+    (2, 2, 1, "2024-02-01", 7.0),
+    (3, 3, 1, "2024-02-01", 8.0),
+    (4, 1, 1, "2024-03-01", 8.0),
+    (5, 2, 2, "2024-04-01", 6.0),
+]
+
+graph = build_graph(REVIEWS)
+
+
+def test_featured_set():
+    featured = [r["review_id"] for r in graph.featured_reviews[1]]
+    print("Featured reviews of hotel 1:", featured)
+    # latest first, then closest to the average; the 1.0 tie goes to the newer review
+    assert featured == [4, 3, 2]
+    assert graph.featured_review_texts(2) == ["review 5"]
+    assert graph.featured_reviews[3] == []
+
+    records = graph.feature_records()
+    assert next(r for r in records if r["h"]["hotel_id"] == 1)["review_texts"] == ["review 4", "review 3", "review 2"]
+
+
+def test_reviews_by_name():
+    assert "FEATURED_REVIEW {rank: 0}" in QUERY_TEMPLATES["hotel_reviews_by_name"]
+    results, _ = BaselineRetriever(graph).retrieve("review_query", {"hotels": [graph.hotels[1]["name"]]})
+    print("Latest review:", results[0]["latest_review_id"], results[0]["review_texts"])
+    assert results[0]["latest_review_id"] == 4
+    assert results[0]["review_texts"] == ["review 4", "review 3", "review 2"]
+
+
+if __name__ == "__main__":
+    test_featured_set()
+    test_reviews_by_name()
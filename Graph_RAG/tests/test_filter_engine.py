@@ -0,0 +1,94 @@
+from in_memory_graph import InMemoryGraph
+from retrieval.baseline_retriever import BaselineRetriever
+from retrieval.filter_engine import compile_filter, compile_cache_info, leaderboard_for, normalize_conditions
+
+graph = InMemoryGraph()
+
+
+def test_compiled_query():
+    conditions = normalize_conditions([
+        {"type": "stars", "operator": "eq", "value": 5},
+        {"type": "cleanliness", "operator": "between", "min": 8, "max": 9.5},
+    ])
+    compiled = compile_filter(conditions)
+    params = compiled.bind(conditions, cities=["Paris"], limit=5)
+    print(compiled.cypher, params)
+    assert "h.star_rating = $f0" in compiled.cypher
+    assert "h.avg_score_cleanliness >= $f1_min AND h.avg_score_cleanliness <= $f1_max" in compiled.cypher
+    assert params == {"f0": 5.0, "f1_min": 8.0, "f1_max": 9.5, "cities": ["paris"], "countries": [], "limit": 5,
+                      "after_score": None, "after_id": None}
+
+    # same shape, different values -> same compiled query from the cache
+    other = normalize_conditions([
+        {"type": "stars", "operator": "eq", "value": 4},
+        {"type": "cleanliness", "operator": "between", "min": 6, "max": 7},
+    ])
+    hits = compile_cache_info().hits
+    assert compile_filter(other) is compiled
+    assert compile_cache_info().hits == hits + 1
+
+
+def test_normalize():
+    # "best staff" without a number ranks by the category; stars without a value is dropped
+    assert normalize_conditions({"type": "staff", "operator": None})[0]["op"] == "top"
+    assert normalize_conditions({"type": "money", "operator": "lte", "value": 0})[0]["op"] == "bottom"
+    assert normalize_conditions({"type": "stars", "operator": "gte", "value": None}) == []
+    assert normalize_conditions({"type": "none", "operator": None}) == []
+
+
+def test_leaderboard_routing():
+    # pure best/worst over one scope -> precomputed leaderboard, anything else -> compiled filter
+    best_staff = normalize_conditions({"type": "staff", "operator": None})
+    assert leaderboard_for(best_staff, ["Paris"], None) == ("city:Paris:staff", True)
+    assert leaderboard_for(best_staff, None, None) == ("global:all:staff", True)
+    assert leaderboard_for(best_staff, ["Paris", "Rome"], None) is None
+    worst = normalize_conditions({"type": "rating", "operator": "lte", "value": 0})
+    assert leaderboard_for(worst, None, ["Egypt"]) == ("country:Egypt:overall", False)
+    assert leaderboard_for(normalize_conditions({"type": "stars", "operator": "gte", "value": 4}), None, None) is None
+
+
+def test_filters_on_embedded_backend():
+    retriever = BaselineRetriever(graph)
+    results, _ = retriever.retrieve("hotel_search", {
+        "countries": ["Japan"], "limit": 10,
+        "rating_filter": {"type": "stars", "operator": "gte", "value": 5},
+    })
+    print("5 stars in Japan:", [r["name"] for r in results])
+    assert [r["name"] for r in results] == ["Kyo-to Grand"]
+
+    results, _ = retriever.retrieve("review_query", {
+        "limit": 5, "rating_filter": {"type": "comfort", "operator": None},
+    })
+    scores = [r["avg_score_comfort"] for r in results]
+    print("Best comfort:", scores)
+    assert scores == sorted(scores, reverse=True)
+
+    # multi-condition filter: every returned hotel satisfies both predicates
+    results, _ = retriever.retrieve("hotel_search", {
+        "limit": 25,
+        "rating_filter": [
+            {"type": "stars", "operator": "eq", "value": 5},
+            {"type": "rating", "operator": "gte", "value": 8.5},
+        ],
+    })
+    print("5 stars, rated 8.5+:", [r["name"] for r in results])
+    assert all(r["star_rating"] == 5 and r["average_reviews_score"] >= 8.5 for r in results)
+
+
+def test_filter_per_destination():
+    # several destinations: the filter's top k per city, tagged like hotel_search_top_k_per_group
+    retriever = BaselineRetriever(graph)
+    entities = {"cities": ["Paris", "Rome", "Cairo"], "rating_filter": {"type": "stars", "operator": "gte", "value": 1},
+                "limit": 1}
+    hotels, _, cursor = retriever.retrieve_page("hotel_search", entities)
+    print("Per destination:", [(h["group"], h["name"]) for h in hotels])
+    assert [(h["group_type"], h["group"]) for h in hotels] == [("city", "Paris"), ("city", "Rome"), ("city", "Cairo")]
+    assert all(h["city"] == h["group"] for h in hotels) and cursor is None
+
+
+if __name__ == "__main__":
+    test_compiled_query()
+    test_normalize()
+    test_leaderboard_routing()
+    test_filters_on_embedded_backend()
+    test_filter_per_destination()
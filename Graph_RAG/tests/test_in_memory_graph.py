@@ -0,0 +1,119 @@
+import time
+from in_memory_graph import InMemoryGraph
+from retrieval.baseline_retriever import BaselineRetriever
+
+graph = InMemoryGraph()
+
+
+def test_templates():
+    hotels = graph.run_template("hotel_search_by_city", {"cities": ["Paris", "Cairo"], "limit": 5})
+    print("By city:", [h["hotel"]["name"] for h in hotels])
+    assert {h["hotel"]["city"] for h in hotels} == {"Paris", "Cairo"}
+
+    visa = graph.run_template("visa_requirements_by_origin", {"origins": ["Egypt"]})
+    print("Visa rows from Egypt:", len(visa))
+    assert visa and all(v["origin_country"] == "Egypt" for v in visa)
+
+    # every template BaselineRetriever can dispatch to must exist in the embedded backend
+    from retrieval.query_templates import QUERY_TEMPLATES
+    missing = [key for key in QUERY_TEMPLATES if key not in graph.templates]
+    print("Missing templates:", missing)
+    assert not missing
+
+
+def test_leaderboards():
+    # incremental refresh: give a Paris and a Rome hotel new scores and re-rank only them
+    paris, rome = graph.hotel_ids_by_city["Paris"][0], graph.hotel_ids_by_city["Rome"][0]
+    for hid, score in ((paris, 9.7), (rome, 9.9)):
+        graph.hotels[hid]["average_reviews_score"] = score
+        graph.hotels[hid]["avg_score_staff"] = 10.0 - score
+        graph.update_leaderboards_for_hotel(hid)
+
+    top = graph.run_template("top_hotels", {"limit": 2})
+    print("Top hotels:", [h["hotel"]["name"] for h in top])
+    assert [h["hotel"]["hotel_id"] for h in top][:2] == [rome, paris]
+
+    worst_staff = graph.run_template("hotel_leaderboard", {"key": "global:all:staff", "descending": False, "limit": 1})
+    assert worst_staff[0]["hotel"]["hotel_id"] == rome
+
+    in_paris = graph.run_template("hotel_leaderboard", {"key": "city:Paris:overall", "limit": 5})
+    assert [h["hotel"]["city"] for h in in_paris] == ["Paris"] * len(in_paris)
+
+
+def test_baseline_on_embedded_backend():
+    retriever = BaselineRetriever(graph)
+    results, cypher = retriever.retrieve("visa_query", {"origin_country": ["Egypt"], "destination_country": ["Germany"]})
+    print("Egypt -> Germany:", results)
+
+    start = time.perf_counter()
+    results, _ = retriever.retrieve("hotel_search", {"cities": ["Rome"], "limit": 3})
+    print(f"Rome hotels: {[r['name'] for r in results]} in {(time.perf_counter() - start) * 1e6:.0f}us")
+    assert results[0]["name"] == "Colosseum Gardens"
+
+
+def test_multi_entity_lookups():
+    # two passports x two destinations: one query, one row per pair
+    retriever = BaselineRetriever(graph)
+    rows, _ = retriever.retrieve("visa_query", {"origin_country": ["Egypt", "United States"],
+                                                "destination_country": ["France", "Japan"]})
+    visas = {(r["origin_country"], r["destination_country"]): r["visa_type"] for r in rows}
+    print("Visa pairs:", visas)
+    assert len(visas) == 4
+    assert visas[("Egypt", "France")] == "Tourist Visa" and visas[("United States", "Japan")] == "Visa Free"
+
+    hotels, _ = retriever.retrieve("hotel_search", {"hotels": ["Palace", "Kiwi"], "limit": 5})
+    assert {h["entity"] for h in hotels} == {"Palace", "Kiwi"}
+    assert all(h["entity"].lower() in h["name"].lower() for h in hotels)
+
+    hotels, _ = retriever.retrieve("hotel_visa", {"origin_country": ["Egypt", "United States"], "limit": 25})
+    assert any(len(h["visa_free_for"]) == 2 for h in hotels)
+    assert all(set(h["visa_free_for"]) <= {"Egypt", "United States"} for h in hotels)
+
+
+def test_top_k_per_group():
+    # one global LIMIT 1 would return a single hotel; grouped mode returns one per destination
+    retriever = BaselineRetriever(graph)
+    hotels, cypher = retriever.retrieve("hotel_search", {"cities": ["Paris", "Rome"], "countries": ["Egypt"], "limit": 1})
+    print("Per group:", [(h["group"], h["name"]) for h in hotels])
+    assert "UNION ALL" in cypher
+    assert [(h["group_type"], h["group"]) for h in hotels] == [("city", "Paris"), ("city", "Rome"), ("country", "Egypt")]
+    assert hotels[2]["country"] == "Egypt"
+
+
+def test_vector_search():
+    # one-hot vectors per hotel: the query closest to hotel 21 must come back first
+    dim = len(graph.hotels)
+    vectors = {hid: [1.0 if i == idx else 0.0 for i in range(dim)] for idx, hid in enumerate(graph.hotels)}
+    graph.set_embeddings("embedding_test", vectors)
+
+    query = vectors[21]
+    rows = graph.search_hotels("embedding_test", query, top_k=3)
+    print("Vector search:", [(r["h"]["name"], round(r["score"], 3)) for r in rows])
+    assert rows[0]["h"]["hotel_id"] == 21
+
+    rows = graph.search_hotels("embedding_test", query, countries=["egypt"], top_k=3)
+    assert [r["h"]["name"] for r in rows] == ["Nile Grandeur"]
+
+
+
+def test_name_keys():
+    from retrieval.query_templates import name_key
+    assert name_key("  São  Paulo ") == "sao paulo" and name_key("ÉGYPT") == "egypt"
+
+    # case / accent variants resolve through the name_key indexes
+    retriever = BaselineRetriever(graph)
+    hotels, _ = retriever.retrieve("hotel_search", {"cities": ["PARIS"], "limit": 3})
+    assert hotels and {h["city"] for h in hotels} == {"Paris"}
+    rows, _ = retriever.retrieve("visa_query", {"origin_country": ["égypt"], "destination_country": ["france"]})
+    print("Visa égypt -> france:", rows)
+    assert rows == [{"origin_country": "Egypt", "destination_country": "France", "visa_type": "Tourist Visa"}]
+
+
+if __name__ == "__main__":
+    test_templates()
+    test_leaderboards()
+    test_baseline_on_embedded_backend()
+    test_multi_entity_lookups()
+    test_top_k_per_group()
+    test_vector_search()
+    test_name_keys()
@@ -0,0 +1,54 @@
+import tempfile
+
+from retrieval.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+from tests.test_segment_cube import build_graph
+
+# one review per hotel; review texts are "review <rid>"
+graph = build_graph([(hid, 1, hid, "2024-01-01", 6.0 + 0.15 * hid) for hid in range(1, 26)])
+index = graph.ensure_lexical_index()
+
+
+def test_tokenize():
+    assert tokenize("Rooftop Hôtel near the BOSPHORUS view!") == ["rooftop", "bosphorus", "view"]
+    assert tokenize("room 5 a b") == ["room", "5"]
+
+
+def test_exact_terms():
+    hid = graph.hotel_ids_by_city["Rome"][0]
+    name = graph.hotels[hid]["name"]
+    ranked = index.rankings(name)
+    assert index.records[ranked["hotel"][0][0]]["h"]["hotel_id"] == hid
+
+    # a review term scores the reviewed hotel through the review field
+    rows, scores = index.rankings("17")["review"]
+    assert [index.records[i]["h"]["hotel_id"] for i in rows] == [17] and scores[0] > 0
+
+    # the hotel scope and rating filter apply to lexical hits too
+    rows = index.search(name, cities=["Paris"])
+    assert hid not in [row["h"]["hotel_id"] for row in rows]
+    assert all(row["city_name"] == "Paris" for row in rows)
+    assert index.search("17", rating_filter={"type": "score", "operator": "lte", "value": 8}) == []
+    assert index.search("unknownterm") == []
+
+
+def test_save_and_load():
+    path = tempfile.mkdtemp()
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+    assert loaded.terms == index.terms and len(loaded) == len(index)
+    for query in ("review 3", graph.hotels[5]["name"], "Cairo"):
+        assert [r["h"]["hotel_id"] for r in loaded.search(query)] == [r["h"]["hotel_id"] for r in index.search(query)]
+    assert LexicalIndex.load(tempfile.mkdtemp()) is None
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4], [3]], k=60)
+    assert [key for key, _ in fused] == [3, 1, 2, 4]
+    assert abs(fused[0][1] - (1 / 63 + 2 / 61)) < 1e-12
+
+
+if __name__ == "__main__":
+    test_tokenize()
+    test_exact_terms()
+    test_save_and_load()
+    test_reciprocal_rank_fusion()
@@ -0,0 +1,133 @@
+import tempfile
+import threading
+
+import numpy as np
+
+from preprocessing.model_registry import ModelRegistry, model_bytes
+
+
+def loader(name, mb, calls):
+    def load():
+        calls.append(name)
+        return np.zeros(mb * 2**20, dtype=np.uint8)
+    return load
+
+
+def test_shared_and_evicted():
+    registry = ModelRegistry(budget_mb=3, sizer=lambda model: model.nbytes)
+    calls = []
+
+    minilm = registry.get("minilm", loader("minilm", 1, calls))
+    assert registry.get("minilm", loader("minilm", 1, calls)) is minilm  # shared by reference
+    registry.get("bge", loader("bge", 2, calls))
+    assert list(registry.loaded()) == ["minilm", "bge"]
+
+    # 1 + 2 + 2 MB > 3 MB budget: least recently used first, until the new model fits
+    registry.get("bge-onnx", loader("bge-onnx", 2, calls))
+    print("Registry:", registry.get_stats())
+    assert list(registry.loaded()) == ["bge-onnx"]
+    assert registry.get_stats()["evictions"] == 2
+
+    # an evicted model is loaded again on next use
+    registry.get("minilm", loader("minilm", 1, calls))
+    assert calls.count("minilm") == 2
+
+
+def test_concurrent_first_use_loads_once():
+    registry = ModelRegistry(budget_mb=0, sizer=lambda model: model.nbytes)
+    calls, models = [], []
+    threads = [threading.Thread(target=lambda: models.append(registry.get("minilm", loader("minilm", 1, calls))))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["minilm"] and all(model is models[0] for model in models)
+
+
+class Weights:
+    """Stand-in for a torch tensor: numel() elements of element_size() bytes."""
+
+    def __init__(self, mb):
+        self.mb = mb
+
+    def numel(self):
+        return self.mb * 2**20
+
+    def element_size(self):
+        return 1
+
+
+class TorchModule:
+    def __init__(self, mb):
+        self.weights = [Weights(mb)]
+
+    def parameters(self):
+        return iter(self.weights)
+
+    def buffers(self):
+        return iter([])
+
+
+class CrossEncoderLike:
+    """CrossEncoder before sentence-transformers 4: not a module, its weights are on .model."""
+
+    def __init__(self, mb):
+        self.model = TorchModule(mb)
+
+
+class OnnxSession:
+    def __init__(self, path):
+        self._model_path = path
+
+
+def test_cross_encoder_and_onnx_are_sized():
+    assert model_bytes(CrossEncoderLike(2)) == 2 * 2**20
+    with tempfile.NamedTemporaryFile(suffix=".onnx") as f:
+        f.write(b"\0" * 4096)
+        f.flush()
+        onnx_cross_encoder = CrossEncoderLike(0)
+        onnx_cross_encoder.model = OnnxSession(f.name)
+        assert model_bytes(onnx_cross_encoder) == 4096
+
+    # the re-ranker's cross-encoder shares the budget with the embedding models
+    registry = ModelRegistry(budget_mb=3)
+    registry.get("minilm", lambda: TorchModule(2))
+    registry.get("cross-encoder:ms-marco", lambda: CrossEncoderLike(2))
+    assert list(registry.loaded()) == ["cross-encoder:ms-marco"]
+    assert registry.get_stats()["evictions"] == 1
+
+
+def test_encoder_loads_its_model_on_first_use():
+    from preprocessing.embedding_encoder import EmbeddingEncoder
+
+    calls = []
+
+    class StubModel:
+        def get_sentence_embedding_dimension(self):
+            return 4
+
+        def encode(self, text, **kwargs):
+            return np.ones(4)
+
+    class RecordingEncoder(EmbeddingEncoder):
+        def __init__(self):
+            super().__init__("minilm")
+            self.model_key = "lazy-test"  # own registry slot, whatever else the process loaded
+
+        def _load_model(self):
+            calls.append(self.model_key)
+            return StubModel()
+
+    encoder = RecordingEncoder()
+    assert calls == [] and encoder.cache_stats() == {}
+    assert encoder.encode("quiet hotel") == [1.0] * 4
+    assert encoder.encode("quiet hotel") == [1.0] * 4
+    assert calls == ["lazy-test"]
+
+
+if __name__ == "__main__":
+    test_shared_and_evicted()
+    test_concurrent_first_use_loads_once()
+    test_cross_encoder_and_onnx_are_sized()
+    test_encoder_loads_its_model_on_first_use()
@@ -0,0 +1,120 @@
+import time
+
+from neo4j.exceptions import ClientError
+
+from neo4j_connector import CircuitBreaker, Neo4jConnector
+
+
+class TimedOut(Exception):
+    """Stand-in for the error Neo4j raises when a transaction exceeds its timeout."""
+    code = "Neo.ClientError.Transaction.TransactionTimedOutClientConfiguration"
+
+
+class StubSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params):
+        self.driver.timeouts.append(query.timeout)
+        outcome = self.driver.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class StubDriver:
+    """Replays one outcome per query: a list of records or an exception to raise."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.timeouts = []
+
+    def session(self):
+        return StubSession(self)
+
+    def close(self):
+        pass
+
+
+def connector(outcomes, **breaker):
+    db = Neo4jConnector(uri="neo4j://127.0.0.1:1", default_timeout_s=5,
+                        breaker=CircuitBreaker(**breaker) if breaker else None)
+    db.driver = StubDriver(outcomes)
+    return db
+
+
+def test_breaker_trips_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout_s=60)
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_success()  # a success resets the consecutive count
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 1
+    assert not breaker.allow_request() and not breaker.allow_request()
+
+
+def test_half_open_probes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0.05, half_open_max_calls=2)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+    time.sleep(0.06)
+    # cool-down over: at most half_open_max_calls probes go through
+    assert breaker.allow_request() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    # a failed probe re-opens the breaker
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 2
+    assert not breaker.allow_request()
+
+    # a successful probe closes it
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.consecutive_failures == 0
+    assert all(breaker.allow_request() for _ in range(5))
+
+
+def test_run_query_counts_timeouts_and_short_circuits():
+    db = connector([[{"n": 1}], TimedOut(), TimedOut()], failure_threshold=2, reset_timeout_s=60)
+    assert db.run_query("RETURN 1 AS n") == [{"n": 1}]
+    assert db.run_query("slow", timeout=0.5) == []
+    assert db.run_query("slow") == []
+    assert db.driver.timeouts == [5, 0.5, 5]
+
+    # open: no session is used any more, the result is degraded to empty
+    assert db.run_query("RETURN 1 AS n") == []
+    assert len(db.driver.timeouts) == 3
+    stats = db.get_stats()
+    assert {k: stats[k] for k in ("queries", "successes", "failures", "timeouts", "short_circuited")} == {
+        "queries": 4, "successes": 1, "failures": 2, "timeouts": 2, "short_circuited": 1}
+    assert stats["breaker_state"] == "open" and stats["breaker_trips"] == 1 and stats["consecutive_failures"] == 2
+
+
+def test_client_error_does_not_trip_the_breaker():
+    db = connector([ClientError("bad cypher")] * 3 + [RuntimeError("connection reset")],
+                   failure_threshold=2, reset_timeout_s=60)
+    for _ in range(3):
+        assert db.run_query("MATCH (") == []
+    assert db.breaker.state == CircuitBreaker.CLOSED and db.breaker.consecutive_failures == 0
+    db.run_query("RETURN 1")
+    stats = db.get_stats()
+    assert stats["failures"] == 4 and stats["timeouts"] == 0 and stats["consecutive_failures"] == 1
+
+
+if __name__ == "__main__":
+    test_breaker_trips_and_fails_fast()
+    test_half_open_probes()
+    test_run_query_counts_timeouts_and_short_circuits()
+    test_client_error_does_not_trip_the_breaker()
@@ -0,0 +1,77 @@
+from retrieval.baseline_retriever import BaselineRetriever
+from retrieval.pagination import decode_cursor, encode_cursor, keyset_params
+from tests.test_segment_cube import build_graph
+
+# hotel 1 averages 8.0 (ties with hotel 2), hotel 3 9.5, hotel 4 6.0; reviews 2 and 3 share a date
+REVIEWS = [
+    # review_id, user_id, hotel_id, date, overall
+    (1, 1, 1, "2024-01-01", 9.0),
+    (2, 2, 1, "2024-02-01", 7.0),
+    (3, 3, 1, "2024-02-01", 8.0),
+    (4, 1, 1, "2024-03-01", 8.0),
+    (5, 1, 2, "2024-03-01", 8.0),
+    (6, 2, 3, "2024-04-01", 9.5),
+    (7, 3, 4, "2024-05-01", 6.0),
+]
+
+graph = build_graph(REVIEWS)
+retriever = BaselineRetriever(graph)
+
+
+def all_pages(fetch):
+    """Follow next_cursor until exhausted; returns the list of pages."""
+    pages, cursor = [], None
+    while True:
+        records, _, cursor = fetch(cursor)
+        pages.append(records)
+        if cursor is None:
+            return pages
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor({"score": 8.0, "id": 2})
+    assert decode_cursor(cursor) == {"score": 8.0, "id": 2}
+    assert decode_cursor(None) == {} and decode_cursor("not a cursor") == {}
+
+
+def test_hotel_pages():
+    # city/country keyset: (score DESC, hotel_id ASC); Cairo has no reviews and comes last
+    countries = ["United States", "United Kingdom", "France", "Japan", "Egypt"]
+    pages, after = [], {}
+    while True:
+        params = dict(keyset_params(after), cities=[], countries=countries, limit=2)
+        page = [r["hotel"] for r in graph.run_template("hotel_search_by_city_or_country", params)]
+        if not page:
+            break
+        pages.append([h["hotel_id"] for h in page])
+        after = {"score": page[-1].get("average_reviews_score") or 0.0, "id": page[-1]["hotel_id"]}
+    print("Country pages:", pages)
+    assert pages == [[3, 1], [2, 4], [18]]
+
+    # several destinations are answered in grouped mode (top k per destination), without a cursor
+    records, _, cursor = retriever.retrieve_page("hotel_search", {"countries": countries, "limit": 2})
+    assert len(records) == 5 and cursor is None
+
+    # compiled rating filter
+    entities = {"rating_filter": {"type": "score", "operator": "gte", "value": 7}, "limit": 1}
+    pages = all_pages(lambda c: retriever.retrieve_page("hotel_search", entities, cursor=c))
+    assert [h["hotel_id"] for p in pages for h in p] == [3, 1, 2]
+
+    # precomputed leaderboards page by offset
+    pages = all_pages(lambda c: retriever.retrieve_page("hotel_search", {"limit": 3}, cursor=c))
+    assert [[h["hotel_id"] for h in p] for p in pages] == [[3, 1, 2], [4]]
+    worst = {"rating_filter": {"type": "cleanliness", "operator": "lte"}, "limit": 3}
+    pages = all_pages(lambda c: retriever.retrieve_page("hotel_search", worst, cursor=c))
+    assert [h["hotel_id"] for p in pages for h in p] == [4, 2, 1, 3]
+
+
+def test_review_pages():
+    pages = all_pages(lambda c: retriever.browse_reviews(1, limit=2, cursor=c))
+    print("Review pages:", [[r["review_id"] for r in p] for p in pages])
+    assert [[r["review_id"] for r in p] for p in pages] == [[4, 3], [2, 1]]
+
+
+if __name__ == "__main__":
+    test_cursor_roundtrip()
+    test_hotel_pages()
+    test_review_pages()
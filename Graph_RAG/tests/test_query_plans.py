@@ -0,0 +1,187 @@
+"""
+Query-plan regression suite.
+
+PROFILEs every QUERY_TEMPLATES entry and every variant of the filtered vector
+search (EmbeddingRetriever._search_hotels_generic) against the KG built by
+Knowledge_Graph_DB/create_kg.py, and fails when a query exceeds its db-hit
+budget, has no budget recorded, or scans a label it is not allowed to
+(tests/results/query_plan_budgets.json).
+
+Record the budgets against the seeded KG, and again after an intentional
+template change or a dataset change, with
+    PLAN_BUDGET_UPDATE=1 pytest -q tests/test_query_plans.py
+PLAN_RECORD=1 (implied by PLAN_BUDGET_UPDATE=1) also writes the db hits /
+rows / estimated rows / operators of every query to tests/results/query_plans.json.
+
+Needs a running, seeded Neo4j (skipped otherwise).
+"""
+import json
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+from neo4j_connector import Neo4jConnector
+from retrieval.embedding_retriever import build_hotel_search_query, build_review_search_query, build_scope_count_query
+from retrieval.query_templates import QUERY_TEMPLATES, name_key, name_keys
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BUDGETS_PATH = RESULTS_DIR / "query_plan_budgets.json"
+PLANS_PATH = RESULTS_DIR / "query_plans.json"
+UPDATE_BUDGETS = os.getenv("PLAN_BUDGET_UPDATE") == "1"
+RECORD_PLANS = UPDATE_BUDGETS or os.getenv("PLAN_RECORD") == "1"
+
+SCAN_OPERATORS = {"NodeByLabelScan", "AllNodesScan"}
+VECTOR_PROPERTY, VECTOR_INDEX = "embedding_minilm", "hotel_embedding_minilm_idx"
+REVIEW_INDEX = "review_embedding_minilm_idx"
+RATING_FILTER = {"type": "cleanliness", "operator": "gte", "value": 8}
+
+
+def connect():
+    try:
+        db = Neo4jConnector()
+        db.driver.verify_connectivity()
+    except Exception as e:
+        pytest.skip(f"Neo4j not reachable: {e}", allow_module_level=True)
+    if not db.run_query("MATCH (h:Hotel) RETURN h.hotel_id AS hotel_id LIMIT 1"):
+        pytest.skip("Neo4j is empty: run Knowledge_Graph_DB/create_kg.py first", allow_module_level=True)
+    return db
+
+
+db = connect()
+
+
+def sample_params():
+    """One parameter set covering every $param of QUERY_TEMPLATES, taken from the seeded data."""
+    rows = db.run_query("""
+        MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+        RETURN h.hotel_id AS hotel_id, h.name AS name, c.name AS city, co.name AS country
+        ORDER BY h.hotel_id LIMIT 2
+    """)
+    first, last = rows[0], rows[-1]
+    return {
+        "cities": name_keys(r["city"] for r in rows),
+        "countries": name_keys(r["country"] for r in rows),
+        "hotels": [name_key(first["name"])],
+        "names": [{"name": first["name"][:4], "key": name_key(first["name"][:4])}],
+        "origins": [name_key(first["country"])],
+        "destinations": [name_key(last["country"])],
+        "aliases": ["usa", "uk"],
+        "property": VECTOR_PROPERTY,
+        "hotel_id": first["hotel_id"],
+        "hotel_ids": [r["hotel_id"] for r in rows],
+        "min_score": 8.0,
+        "traveller_type": "couple",
+        "age_group": "any",
+        "gender": "any",
+        "key": "global:all:overall",
+        "descending": True,
+        "limit": 10,
+        "offset": 0,
+        "after_score": None,
+        "after_date": None,
+        "after_id": None,
+    }
+
+
+def vector_queries(params):
+    """(name, cypher, params) for every shape build_hotel_search_query / build_scope_count_query can emit."""
+    rows = db.run_query(f"MATCH (h:Hotel) WHERE h.{VECTOR_PROPERTY} IS NOT NULL "
+                        f"RETURN h.{VECTOR_PROPERTY} AS embedding LIMIT 1")
+    if not rows:
+        print(f"No {VECTOR_PROPERTY} on hotels: vector search variants not checked")
+        return []
+    scopes = {
+        "global": {},
+        "cities": {"cities": params["cities"][:1]},
+        "countries": {"countries": params["countries"][:1]},
+        "group_cities": {"cities": params["cities"]},
+        "group_countries": {"countries": params["countries"]},
+    }
+    queries = []
+    for name, scope in scopes.items():
+        for suffix, rating_filter in (("", None), ("+rating", RATING_FILTER)):
+            cypher, query_params = build_hotel_search_query(VECTOR_PROPERTY, VECTOR_INDEX, rows[0]["embedding"],
+                                                            top_k=10, rating_filter=rating_filter, **scope)
+            queries.append((f"vector:{name}{suffix}", cypher, query_params))
+            cypher, query_params = build_hotel_search_query(VECTOR_PROPERTY, VECTOR_INDEX, rows[0]["embedding"],
+                                                            top_k=10, rating_filter=rating_filter, exact=True, **scope)
+            queries.append((f"vector_exact:{name}{suffix}", cypher, query_params))
+            cypher, query_params = build_scope_count_query(VECTOR_PROPERTY, rating_filter=rating_filter, **scope)
+            queries.append((f"vector_scope:{name}{suffix}", cypher, query_params))
+
+    # review-level search (one query per destination, so no grouped variants)
+    if not db.run_query("SHOW INDEXES YIELD name WHERE name = $name RETURN name", {"name": REVIEW_INDEX}):
+        print(f"No {REVIEW_INDEX}: review search variants not checked (run embedding_indexer.py)")
+        return queries
+    for name in ("global", "cities", "countries"):
+        for suffix, rating_filter in (("", None), ("+rating", RATING_FILTER)):
+            cypher, query_params = build_review_search_query(VECTOR_PROPERTY, REVIEW_INDEX, rows[0]["embedding"],
+                                                             top_k=10, rating_filter=rating_filter, **scopes[name])
+            queries.append((f"review:{name}{suffix}", cypher, query_params))
+    return queries
+
+
+def flatten(plan):
+    """Pre-order list of plan operators, each {operator, details, db_hits, rows, estimated_rows}."""
+    args = plan.get("args", {})
+    node = {
+        "operator": plan["operatorType"].split("@")[0],
+        "details": args.get("Details", ""),
+        "db_hits": plan.get("dbHits", args.get("DbHits", 0)),
+        "rows": plan.get("rows", args.get("Rows", 0)),
+        "estimated_rows": round(args.get("EstimatedRows", 0.0), 1),
+    }
+    return [node] + [op for child in plan.get("children", []) for op in flatten(child)]
+
+
+def summarize(plan):
+    operators = flatten(plan)
+    return {
+        "db_hits": sum(op["db_hits"] for op in operators),
+        "rows": operators[0]["rows"],
+        "estimated_rows": operators[0]["estimated_rows"],
+        "label_scans": sorted({label for op in operators if op["operator"] in SCAN_OPERATORS
+                               for label in re.findall(r":(\w+)", op["details"])}
+                              | {"*" for op in operators if op["operator"] == "AllNodesScan"}),
+        "operators": operators,
+    }
+
+
+def test_query_plans():
+    budgets = json.loads(BUDGETS_PATH.read_text())
+    params = sample_params()
+    queries = [(key, cypher, params) for key, cypher in QUERY_TEMPLATES.items()] + vector_queries(params)
+
+    recorded, failures = {}, []
+    for name, cypher, query_params in queries:
+        plan = db.query_plan(cypher, query_params)
+        if plan is None:
+            failures.append(f"{name}: PROFILE failed")
+            continue
+        summary = recorded[name] = summarize(plan)
+        print(f"{name}: {summary['db_hits']} db hits, {summary['rows']} rows "
+              f"(estimated {summary['estimated_rows']}), scans {summary['label_scans']}")
+
+        budget = budgets["queries"].setdefault(name, {"allow_label_scans": [], "max_db_hits": None})
+        new_scans = sorted(set(summary["label_scans"]) - set(budget["allow_label_scans"]))
+        if new_scans:
+            failures.append(f"{name}: label scan on {new_scans}")
+        if UPDATE_BUDGETS:
+            budget["max_db_hits"] = int(summary["db_hits"] * budgets["headroom"]) + 1
+        elif budget["max_db_hits"] is None:
+            failures.append(f"{name}: no db-hit budget recorded (run with PLAN_BUDGET_UPDATE=1)")
+        elif summary["db_hits"] > budget["max_db_hits"]:
+            failures.append(f"{name}: {summary['db_hits']} db hits > budget {budget['max_db_hits']}")
+
+    if RECORD_PLANS:
+        PLANS_PATH.write_text(json.dumps(recorded, indent=2))
+    if UPDATE_BUDGETS:
+        BUDGETS_PATH.write_text(json.dumps(budgets, indent=2) + "\n")
+    print("\n".join(failures))
+    assert not failures
+
+
+if __name__ == "__main__":
+    test_query_plans()
@@ -0,0 +1,69 @@
+import time
+
+from retrieval.reranker import CrossEncoderReranker
+
+
+class KeywordModel:
+    """CrossEncoder stand-in: scores a pair by how often the hotel text mentions 'pool'."""
+
+    def __init__(self, delay_s=0.0):
+        self.delay_s = delay_s
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay_s)
+        return [text.lower().count("pool") for _, text in pairs]
+
+
+def hotel(hid, name, review):
+    return {"h": {"hotel_id": hid, "name": name}, "city_name": "Cairo", "country_name": "Egypt",
+            "review_texts": [review]}
+
+
+items = [
+    hotel(1, "Nile View", "great breakfast"),
+    hotel(2, "Pool Palace", "pool pool and another pool"),
+    hotel(3, "Desert Rose", "the pool was nice"),
+    hotel(4, "Old Town Inn", "quiet rooms"),
+    hotel(5, "Lagoon Resort", "pool with a view of the pool"),
+]
+
+
+def test_rerank_in_batches_with_cache():
+    model = KeywordModel()
+    reranker = CrossEncoderReranker(batch_size=2, budget_ms=0, model=model)
+    ranked, reranked = reranker.rerank("hotel with a pool", items)
+    assert reranked
+    assert [item["h"]["hotel_id"] for item in ranked] == [2, 5, 3, 1, 4]
+    assert ranked[0]["rerank_score"] == 4.0 and model.batches == [2, 2, 1]
+
+    # same question again: every pair comes from the cache
+    ranked_again, _ = reranker.rerank("Hotel with a  POOL", items)
+    assert [item["h"]["hotel_id"] for item in ranked_again] == [2, 5, 3, 1, 4]
+    assert model.batches == [2, 2, 1]
+    stats = reranker.get_stats()
+    assert stats["cache_hits"] == 5 and stats["scored_pairs"] == 5 and stats["reranked"] == 2
+
+
+def test_budget_falls_back_to_original_order():
+    model = KeywordModel(delay_s=0.03)
+    reranker = CrossEncoderReranker(batch_size=2, budget_ms=40, model=model)
+    ranked, reranked = reranker.rerank("hotel with a pool", items)
+    assert not reranked and ranked == items
+    assert "rerank_score" not in ranked[0]
+    # the next batch was predicted to overrun the budget, so it never started
+    assert len(model.batches) < 3 and reranker.get_stats()["fallbacks"] == 1
+
+    # pairs scored before the budget ran out are cached, so a retry gets further
+    scored = reranker.get_stats()["scored_pairs"]
+    reranker.rerank("hotel with a pool", items)
+    assert reranker.get_stats()["scored_pairs"] > scored
+
+    assert reranker.rerank("", items) == (items, False)
+    assert reranker.rerank("pool", items[:1]) == (items[:1], False)
+
+
+if __name__ == "__main__":
+    test_rerank_in_batches_with_cache()
+    test_budget_falls_back_to_original_order()
@@ -0,0 +1,42 @@
+from collections import Counter
+
+from in_memory_graph import InMemoryGraph
+from retrieval.retrieval_pipeline import RetrievalPipeline
+
+pipeline = RetrievalPipeline(InMemoryGraph())
+
+
+def test_category_scores_listed_once():
+    hotel = {"hotel_id": 1, "name": "Nile View", "avg_score_cleanliness": 8.5, "avg_score_value_for_money": 7.25,
+             "avg_score_couple": 9.0}
+    context = pipeline._build_context_text(pipeline._merge_results([], [{"h": hotel, "city_name": "Cairo",
+                                                                          "country_name": "Egypt"}]))
+    print(context)
+    assert context.count("8.5") == 1 and context.count("7.2") == 1
+    assert "[Cleanliness: 8.5, Value for money: 7.2]" in context
+    assert "Ratings: [Couple: 9.0]" in context
+
+
+def test_mixed_grouping_lists_each_hotel_once():
+    # multi-city query with a rating filter: the baseline groups per destination like the embeddings
+    entities = {"cities": ["Paris", "Rome"], "rating_filter": {"type": "stars", "operator": "gte", "value": 1},
+                "limit": 2}
+    baseline, _, _ = pipeline.baseline.retrieve_page("hotel_search", entities)
+    assert {h["group"] for h in baseline} == {"Paris", "Rome"} and len(baseline) <= 4
+    embedding = [{"h": {"hotel_id": h["hotel_id"], "name": h["name"]}, "city_name": h["city"],
+                  "country_name": h["country"], "group": h["city"]} for h in baseline]
+    combined = pipeline._merge_results(baseline, embedding)
+    assert len(combined["hotels"]) == len(baseline)
+    assert {group: len(items) for group, items in combined["groups"].items()} == dict(Counter(h["group"] for h in baseline))
+
+    # a hotel only one side grouped is still listed once
+    ungrouped = [dict(h, group=None) for h in baseline]
+    combined = pipeline._merge_results(ungrouped, embedding)
+    context = pipeline._build_context_text(combined)
+    assert len(combined["hotels"]) == len(baseline)
+    assert all(context.count(h["name"]) == 1 for h in baseline)
+
+
+if __name__ == "__main__":
+    test_category_scores_listed_once()
+    test_mixed_grouping_lists_each_hotel_once()
@@ -0,0 +1,69 @@
+import csv
+import os
+import shutil
+import tempfile
+
+from in_memory_graph import InMemoryGraph, KG_DIR
+from retrieval.baseline_retriever import BaselineRetriever
+from retrieval.query_templates import segment_params
+
+# users 1 (Female, 35-44, Solo), 2 (Male, 25-34, Solo), 3 (Female, 25-34, Family)
+REVIEWS = [
+    # review_id, user_id, hotel_id, date, overall
+    (1, 1, 1, "2024-01-01", 9.0),
+    (2, 2, 1, "2024-02-01", 7.0),
+    (3, 1, 2, "2024-03-01", 8.0),
+    (4, 3, 2, "2024-04-01", 6.0),
+    (5, 2, 3, "2024-05-01", 9.5),
+]
+
+
+def build_graph(reviews=REVIEWS) -> InMemoryGraph:
+    data_dir = tempfile.mkdtemp()
+    for name in ("hotels.csv", "users.csv", "visa.csv", "aliases.csv"):
+        shutil.copy(os.path.join(KG_DIR, name), data_dir)
+    fields = ["review_id", "user_id", "hotel_id", "review_date", "score_overall", "score_cleanliness",
+              "score_comfort", "score_facilities", "score_location", "score_staff", "score_value_for_money",
+              "review_text"]
+    with open(os.path.join(data_dir, "reviews.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for rid, uid, hid, date, score in reviews:
+            writer.writerow([rid, uid, hid, date] + [score] * 7 + [f"review {rid}"])
+    return InMemoryGraph(data_dir)
+
+
+graph = build_graph()
+
+
+def test_cube_cells():
+    assert segment_params("Solo", None, ["female"]) == {"traveller_type": "solo", "age_group": "any", "gender": "female"}
+    assert segment_params(None, "25-34", ["male", "female"])["gender"] == "any"
+
+    cell = graph.segments[("solo", "any", "any")][1]
+    print("Solo travellers at hotel 1:", cell)
+    assert cell["travellers"] == 2 and cell["reviews"] == 2 and cell["avg_overall"] == 8.0
+
+    cell = graph.segments[("any", "25-34", "female")][2]
+    assert cell["travellers"] == 1 and cell["avg_overall"] == 6.0
+    assert ("family", "35-44", "female") not in graph.segments
+
+
+def test_segment_recommendation():
+    retriever = BaselineRetriever(graph)
+    results, _ = retriever.retrieve("recommendation", {"traveller_type": "solo", "gender": ["female"], "limit": 5})
+    print("Solo female:", [(r["name"], r["segment_score"]) for r in results])
+    assert [r["hotel_id"] for r in results] == [1, 2]
+
+    rows = graph.run_template("recommend_hotels_by_traveller_type", {"traveller_type": "Solo", "limit": 5})
+    # hotel 1 has two solo travellers, then hotels 3 (9.5) and 2 (8.0) with one each
+    assert [(r["hotel"]["hotel_id"], r["freq"]) for r in rows] == [(1, 2), (3, 1), (2, 1)]
+
+    # unknown segment falls back to the generic recommendation path
+    results, _ = retriever.retrieve("recommendation", {"traveller_type": "group", "cities": ["Paris"], "limit": 5})
+    assert results and all(r["city"] == "Paris" for r in results)
+
+
+if __name__ == "__main__":
+    test_cube_cells()
+    test_segment_recommendation()
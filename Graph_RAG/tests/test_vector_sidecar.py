@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+import numpy as np
+
+from retrieval.vector_sidecar import quantize, read_sidecar, write_sidecar
+from retrieval.vector_store import VectorStore
+from tests.test_segment_cube import build_graph
+
+graph = build_graph([(hid, 1, hid, "2024-01-01", 6.0 + 0.15 * hid) for hid in range(1, 26)])
+rng = np.random.default_rng(11)
+ids = sorted(graph.hotels)
+vectors = rng.normal(size=(len(ids), 64))
+graph.set_embeddings("embedding_test", {hid: vec.tolist() for hid, vec in zip(ids, vectors)})
+reference = graph.embeddings["embedding_test"]
+queries = rng.normal(size=(20, 64))
+
+
+def sidecar_store(dtype, hotel_ids=ids, rows=vectors):
+    path = tempfile.mkdtemp()
+    write_sidecar(path, hotel_ids, rows, dtype)
+    return path, VectorStore.from_sidecar(graph, path)
+
+
+def top_ids(store, query, **kwargs):
+    return [row["h"]["hotel_id"] for row in store.search(query.tolist(), top_k=10, **kwargs)]
+
+
+def test_quantize():
+    rows, scales = quantize(vectors, "int8")
+    assert rows.dtype == np.int8 and scales.dtype == np.float32
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    assert np.abs(rows * scales[:, None] - unit).max() <= scales.max() / 2 + 1e-6
+
+
+def test_recall_against_float32():
+    for dtype, min_recall in (("float16", 1.0), ("int8", 0.9)):
+        path, store = sidecar_store(dtype)
+        assert isinstance(store.matrix, np.memmap) and str(store.matrix.dtype) == dtype
+        hits = [len(set(top_ids(store, q)) & set(top_ids(reference, q))) / 10 for q in queries]
+        print(dtype, "recall@10:", np.mean(hits), "bytes:", os.path.getsize(os.path.join(path, "vectors.npy")))
+        assert np.mean(hits) >= min_recall
+
+        # scores stay on the float32 scale, filters apply as usual
+        query = queries[0].tolist()
+        got, expected = store.search(query, top_k=1)[0], reference.search(query, top_k=1)[0]
+        assert abs(got["score"] - expected["score"]) < 0.01
+        assert all(row["city_name"] == "Rome" for row in store.search(query, cities=["Rome"]))
+
+
+def test_missing_hotels_and_absent_sidecar():
+    _, store = sidecar_store("int8", ids + [999], np.vstack([vectors, rng.normal(size=(1, 64))]))
+    assert len(store) == len(ids) and 999 not in store.row_of
+    assert top_ids(store, queries[1])[:3] == top_ids(reference, queries[1])[:3]
+    assert read_sidecar(tempfile.mkdtemp()) is None
+    assert VectorStore.from_sidecar(graph, tempfile.mkdtemp()) is None
+
+
+if __name__ == "__main__":
+    test_quantize()
+    test_recall_against_float32()
+    test_missing_hotels_and_absent_sidecar()
@@ -0,0 +1,159 @@
+import numpy as np
+
+from retrieval import vector_store
+from retrieval.filter_engine import compile_filter, normalize_conditions
+from retrieval.vector_store import VectorStore, binary_codes, hamming_distances
+from tests.test_segment_cube import build_graph
+
+# one review per hotel, scores 6.0 .. 9.6 (every category gets the same score)
+graph = build_graph([(hid, 1, hid, "2024-01-01", 6.0 + 0.15 * hid) for hid in range(1, 26)])
+rng = np.random.default_rng(7)
+vectors = {hid: rng.normal(size=16).tolist() for hid in graph.hotels}
+graph.set_embeddings("embedding_test", vectors)
+store = graph.embeddings["embedding_test"]
+
+
+def brute_force(query, cities=None, countries=None, top_k=10, rating_filter=None):
+    """Reference: filter hotel by hotel with CompiledFilter, then score every survivor."""
+    conditions = normalize_conditions(rating_filter)
+    compiled = compile_filter(conditions) if conditions else None
+    params = compiled.bind(conditions) if compiled else {}
+    q = np.asarray(query) / np.linalg.norm(query)
+    scored = []
+    for hid, vec in vectors.items():
+        if cities and graph.hotel_city[hid] not in cities:
+            continue
+        if not cities and countries and graph._country_of(hid) not in countries:
+            continue
+        if compiled and not compiled.matches(graph.hotels[hid], params):
+            continue
+        scored.append((-float(np.dot(q, vec) / np.linalg.norm(vec)), hid))
+    return [hid for _, hid in sorted(scored)[:top_k]]
+
+
+def test_exact_filtered_search():
+    query = rng.normal(size=16).tolist()
+    cases = [
+        {},
+        {"cities": ["Paris", "Rome"]},
+        {"countries": ["Egypt"]},
+        {"rating_filter": {"type": "stars", "operator": "eq", "value": 5}},
+        {"rating_filter": {"type": "stars", "operator": "lte", "value": 4}},
+        {"rating_filter": {"type": "cleanliness", "operator": "between", "min": 7.0, "max": 8.5}},
+        {"countries": ["France", "Italy"], "rating_filter": {"type": "score", "operator": "gte", "value": 7.5}},
+    ]
+    for case in cases:
+        expected = brute_force(query, top_k=5, **case)
+        got = [r["h"]["hotel_id"] for r in store.search(query, top_k=5, **case)]
+        print(case, got)
+        assert got == expected
+
+    # blocked scoring must give the same answer as one matmul
+    vector_store.BLOCK_ROWS = 4
+    try:
+        assert [r["h"]["hotel_id"] for r in store.search(query, top_k=7)] == brute_force(query, top_k=7)
+    finally:
+        vector_store.BLOCK_ROWS = 65536
+
+    assert store.search(query, cities=["Atlantis"]) == []
+
+
+def test_load_from_graph_and_refresh():
+    loaded = VectorStore.from_graph(graph, "embedding_test")
+    assert len(loaded) == len(graph.hotels)
+    query = vectors[21]
+    assert loaded.search(query, top_k=1)[0]["h"]["hotel_id"] == 21
+
+    # score columns follow incremental updates
+    hid = graph.hotel_ids_by_city["Rome"][0]
+    graph.hotels[hid]["avg_score_cleanliness"] = 1.0
+    graph.update_leaderboards_for_hotel(hid)
+    clean = {"type": "cleanliness", "operator": "gte", "value": 5}
+    assert hid not in [r["h"]["hotel_id"] for r in graph.search_hotels("embedding_test", vectors[hid], rating_filter=clean)]
+
+
+def test_review_level_pooling():
+    # three reviews for each of hotels 1-6, scores 6.0 .. 9.4
+    reviews = [(3 * hid + j, 1 + j, hid, f"2024-0{j + 1}-01", 6.0 + 0.2 * (3 * hid + j - 3))
+               for hid in range(1, 7) for j in range(3)]
+    review_graph = build_graph(reviews)
+    review_vectors = {rid: rng.normal(size=16).tolist() for rid, *_ in reviews}
+    review_graph.set_review_embeddings("embedding_test", review_vectors)
+    query = rng.normal(size=16)
+
+    def cosine(rid):
+        vec = np.asarray(review_vectors[rid])
+        return (1 + float(vec @ query / np.linalg.norm(vec) / np.linalg.norm(query))) / 2
+
+    by_hotel = {}
+    for rid, _, hid, *_ in reviews:
+        by_hotel.setdefault(hid, []).append(cosine(rid))
+    for pooling, n in (("max", 1), ("mean", 3), ("top_n", 2)):
+        expected = sorted(by_hotel, key=lambda hid: -np.mean(sorted(by_hotel[hid], reverse=True)[:n]))[:4]
+        rows = review_graph.search_reviews("embedding_test", query.tolist(), top_k=4, pooling=pooling, top_n=2)
+        print(pooling, [(r["h"]["hotel_id"], round(r["score"], 3)) for r in rows])
+        assert [r["h"]["hotel_id"] for r in rows] == expected
+
+    # evidence: the hotel's best matching reviews, best first
+    row = rows[0]
+    assert row["matched_reviews"] == 3 and len(row["evidence"]) == 3
+    assert np.allclose([e["score"] for e in row["evidence"]], sorted(by_hotel[row["h"]["hotel_id"]], reverse=True))
+    assert row["review_texts"] == [e["text"] for e in row["evidence"]]
+
+    # the hotel filter applies before pooling
+    rows = review_graph.search_reviews("embedding_test", query.tolist(), top_k=10,
+                                       rating_filter={"type": "score", "operator": "gte", "value": 8})
+    assert {r["h"]["hotel_id"] for r in rows} == {hid for hid in by_hotel
+                                                  if review_graph.hotels[hid]["average_reviews_score"] >= 8}
+
+
+def test_truncated_prefilter():
+    query = rng.normal(size=16).tolist()
+    try:
+        # a shortlist as large as the store is the exact search
+        store.set_prefilter(dims=4, oversample=len(graph.hotels))
+        assert [r["h"]["hotel_id"] for r in store.search(query, top_k=5)] == brute_force(query, top_k=5)
+
+        # a real shortlist: the survivors are rescored with their full-width cosine
+        store.set_prefilter(dims=8, oversample=2)
+        rows = store.search(query, top_k=3)
+        q = np.asarray(query) / np.linalg.norm(query)
+        for row in rows:
+            vec = np.asarray(vectors[row["h"]["hotel_id"]])
+            assert abs(row["score"] - (1 + q @ vec / np.linalg.norm(vec)) / 2) < 1e-5
+        assert [r["score"] for r in rows] == sorted((r["score"] for r in rows), reverse=True)
+        assert store.prefix_matrix().shape == (len(store), 8)
+    finally:
+        store.set_prefilter(0)
+
+
+def test_binary_prefilter():
+    codes = store.codes()
+    assert codes.dtype == np.uint64 and codes.shape == (len(store), 1)  # 16 sign bits, padded to one word
+    signs = store.matrix > 0
+    query = rng.normal(size=16)
+    expected = (signs != (query > 0)).sum(axis=1)
+    assert hamming_distances(codes, binary_codes(query[None, :])[0]).tolist() == expected.tolist()
+
+    try:
+        store.set_binary_prefilter(True, oversample=len(graph.hotels))
+        assert [r["h"]["hotel_id"] for r in store.search(query.tolist(), top_k=5)] == brute_force(query, top_k=5)
+
+        # shortlisted rows keep their full-precision score
+        store.set_binary_prefilter(True, oversample=2)
+        rows = store.search(query.tolist(), top_k=3)
+        q = query / np.linalg.norm(query)
+        for row in rows:
+            vec = np.asarray(vectors[row["h"]["hotel_id"]])
+            assert abs(row["score"] - (1 + q @ vec / np.linalg.norm(vec)) / 2) < 1e-5
+        assert len(rows) == 3
+    finally:
+        store.set_binary_prefilter(False)
+
+
+if __name__ == "__main__":
+    test_exact_filtered_search()
+    test_load_from_graph_and_refresh()
+    test_review_level_pooling()
+    test_truncated_prefilter()
+    test_binary_prefilter()
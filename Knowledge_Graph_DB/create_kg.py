@@ -1,5 +1,32 @@
 from neo4j import GraphDatabase
 import pandas as pd
+import bisect
+import unicodedata
+
+# Leaderboard categories -> hotel score property.
+# Keep in sync with LEADERBOARD_FIELDS in Graph_RAG/retrieval/query_templates.py
+LEADERBOARD_FIELDS = {
+    "overall": "average_reviews_score",
+    "cleanliness": "avg_score_cleanliness",
+    "comfort": "avg_score_comfort",
+    "facilities": "avg_score_facilities",
+    "staff": "avg_score_staff",
+    "value_for_money": "avg_score_value_for_money",
+}
+
+# Featured reviews kept per hotel (latest + most representative).
+# Keep in sync with FEATURED_REVIEWS in Graph_RAG/retrieval/query_templates.py
+FEATURED_REVIEWS = 3
+
+def name_key(name):
+    """
+    Case-folded, accent-stripped, single-spaced match key stored as `name_key` on
+    City / Country / Hotel nodes. Keep in sync with name_key in
+    Graph_RAG/retrieval/query_templates.py
+    """
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
 
 def read_config(file_path):
     config = {}
@@ -16,6 +43,14 @@ def create_identifiers(driver):
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (c:City) REQUIRE c.name IS UNIQUE")
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (c:Country) REQUIRE c.name IS UNIQUE")
         session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (r:Review) REQUIRE r.review_id IS UNIQUE")
+        session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (l:Leaderboard) REQUIRE l.key IS UNIQUE")
+        # Case / accent-insensitive lookups match on name_key: equality and IN are index seeks,
+        # hotel name CONTAINS uses the text index
+        session.run("CREATE INDEX city_name_key IF NOT EXISTS FOR (c:City) ON (c.name_key)")
+        session.run("CREATE INDEX country_name_key IF NOT EXISTS FOR (c:Country) ON (c.name_key)")
+        session.run("CREATE INDEX hotel_name_key IF NOT EXISTS FOR (h:Hotel) ON (h.name_key)")
+        session.run("CREATE TEXT INDEX hotel_name_key_text IF NOT EXISTS FOR (h:Hotel) ON (h.name_key)")
+        session.run("CREATE INDEX alias_key IF NOT EXISTS FOR (a:Alias) ON (a.key)")
 
 def load_travellers(driver):
     travellers = pd.read_csv('Knowledge_Graph_DB/users.csv')
@@ -28,6 +63,7 @@ def load_travellers(driver):
                 t.gender = $gender
                         
                 MERGE (c: Country {name: $country_name})
+                SET c.name_key = $country_key
                         
                 MERGE (t)-[:FROM_COUNTRY]->(c)
             """, parameters={
@@ -35,7 +71,8 @@ def load_travellers(driver):
                 "age": row['age_group'],
                 "type": row['traveller_type'],
                 "gender": row['user_gender'],
-                "country_name": row['country']
+                "country_name": row['country'],
+                "country_key": name_key(row['country'])
             })
 
 
@@ -46,25 +83,31 @@ def load_hotels(driver):
             session.run("""
                 MERGE (h: Hotel {hotel_id: $hotel_id})
                 SET h.name = $name,
+                h.name_key = $name_key,
                 h.star_rating = $star_rating,
                 h.cleanliness_base = $cleanliness_base,
                 h.comfort_base = $comfort_base,
                 h.facilities_base = $facilities_base
                                                 
                 MERGE (c: City {name: $city_name})
+                SET c.name_key = $city_key
                 MERGE (h)-[:LOCATED_IN]->(c)
                         
                 MERGE (b: Country {name: $country_name})
+                SET b.name_key = $country_key
                 MERGE (c)-[:LOCATED_IN]->(b)
             """, parameters={
                 "hotel_id": row['hotel_id'],
                 "name": row['hotel_name'],
+                "name_key": name_key(row['hotel_name']),
                 "star_rating": row['star_rating'],
                 "cleanliness_base": row['cleanliness_base'],
                 "comfort_base": row['comfort_base'],
                 "facilities_base": row['facilities_base'],
                 "city_name": row['city'],
-                "country_name": row['country']
+                "city_key": name_key(row['city']),
+                "country_name": row['country'],
+                "country_key": name_key(row['country'])
             })
 
 def load_reviews(driver):
@@ -75,6 +118,7 @@ def load_reviews(driver):
                 MERGE (r: Review {review_id: $review_id})
                 SET r.text = $text,
                 r.date = $date,
+                r.hotel_id = $hotel_id,
                 r.score_overall = $score_overall,
                 r.score_cleanliness = $score_cleanliness,
                 r.score_comfort = $score_comfort,
@@ -131,6 +175,232 @@ def compute_average_score_by_traveller_type(driver):
             SET h[propertyName] = avgScore
         """)
 
+def compute_average_category_scores(driver):
+    """
+    Materializes per-category review averages on each hotel
+    (h.avg_score_cleanliness, ..., h.avg_score_value_for_money) so rating
+    filters read a property instead of aggregating every review per query.
+    """
+    with driver.session() as session:
+        session.run("""
+            MATCH (h:Hotel)<-[:REVIEWED]-(r:Review)
+            WITH h,
+                 avg(r.score_cleanliness) AS cleanliness,
+                 avg(r.score_comfort) AS comfort,
+                 avg(r.score_facilities) AS facilities,
+                 avg(r.score_staff) AS staff,
+                 avg(r.score_value_for_money) AS money
+            SET h.avg_score_cleanliness = cleanliness,
+                h.avg_score_comfort = comfort,
+                h.avg_score_facilities = facilities,
+                h.avg_score_staff = staff,
+                h.avg_score_value_for_money = money
+        """)
+
+def create_score_indexes(driver):
+    """
+    Range indexes on the hotel score properties used by the filter engine
+    (Graph_RAG/retrieval/filter_engine.py), so rating predicates are index seeks.
+    """
+    score_properties = [
+        "star_rating",
+        "average_reviews_score",
+        "avg_score_cleanliness",
+        "avg_score_comfort",
+        "avg_score_facilities",
+        "avg_score_staff",
+        "avg_score_value_for_money",
+    ]
+    with driver.session() as session:
+        for prop in score_properties:
+            session.run(f"CREATE INDEX hotel_{prop} IF NOT EXISTS FOR (h:Hotel) ON (h.{prop})")
+        # Keyset pagination of a hotel's reviews (newest first) seeks this composite index
+        session.run("CREATE INDEX review_hotel_date IF NOT EXISTS FOR (r:Review) ON (r.hotel_id, r.date)")
+
+def build_segment_cube(driver, hotel_id=None):
+    """
+    Materializes the traveller-segment score cube: one (:SegmentScore) node per
+    hotel x traveller_type x age_group x gender cell, plus roll-up cells where
+    any dimension is "any". Each cell stores traveller / review counts and the
+    per-category review averages, so segment recommendations are index lookups
+    instead of scans over every Traveller-[:WROTE]->Review path.
+    Dimension values are lower-case (e.g. "solo", "25-34", "female").
+    With hotel_id set, only that hotel's cells are rebuilt.
+    """
+    with driver.session() as session:
+        session.run("""
+            MATCH (s:SegmentScore)
+            WHERE $hotel_id IS NULL OR s.hotel_id = $hotel_id
+            DETACH DELETE s
+        """, hotel_id=hotel_id)
+        session.run("""
+            MATCH (t:Traveller)-[:WROTE]->(r:Review)-[:REVIEWED]->(h:Hotel)
+            WHERE $hotel_id IS NULL OR h.hotel_id = $hotel_id
+            WITH h, t, r,
+                 toLower(coalesce(t.type, "unknown")) AS ttype,
+                 toLower(coalesce(t.age, "unknown")) AS age,
+                 toLower(coalesce(t.gender, "unknown")) AS gender
+            UNWIND [
+                [ttype, age, gender], [ttype, age, "any"], [ttype, "any", gender], ["any", age, gender],
+                [ttype, "any", "any"], ["any", age, "any"], ["any", "any", gender], ["any", "any", "any"]
+            ] AS seg
+            WITH h, seg,
+                 count(DISTINCT t) AS travellers,
+                 count(r) AS reviews,
+                 avg(r.score_overall) AS overall,
+                 avg(r.score_cleanliness) AS cleanliness,
+                 avg(r.score_comfort) AS comfort,
+                 avg(r.score_facilities) AS facilities,
+                 avg(r.score_location) AS location,
+                 avg(r.score_staff) AS staff,
+                 avg(r.score_value_for_money) AS money
+            CREATE (s:SegmentScore {
+                hotel_id: h.hotel_id,
+                traveller_type: seg[0],
+                age_group: seg[1],
+                gender: seg[2],
+                travellers: travellers,
+                reviews: reviews,
+                avg_overall: overall,
+                avg_cleanliness: cleanliness,
+                avg_comfort: comfort,
+                avg_facilities: facilities,
+                avg_location: location,
+                avg_staff: staff,
+                avg_value_for_money: money
+            })-[:SEGMENT_OF]->(h)
+        """, hotel_id=hotel_id)
+        session.run("""
+            CREATE INDEX segment_score_lookup IF NOT EXISTS
+            FOR (s:SegmentScore) ON (s.traveller_type, s.age_group, s.gender)
+        """)
+
+def build_featured_reviews(driver, hotel_id=None):
+    """
+    Maintains each hotel's featured-review set: (h)-[:FEATURED_REVIEW {rank, kind}]->(r)
+    to its latest review (rank 0, kind "latest") followed by the reviews whose
+    overall score is closest to the hotel average (kind "representative"),
+    FEATURED_REVIEWS in total. Retrieval, the embedding indexer and prompt
+    building read these edges instead of collecting every review of a hotel.
+    Pass hotel_id to rebuild a single hotel's set (e.g. after new reviews).
+    """
+    with driver.session() as session:
+        session.run("""
+            MATCH (h:Hotel)-[f:FEATURED_REVIEW]->(:Review)
+            WHERE $hotel_id IS NULL OR h.hotel_id = $hotel_id
+            DELETE f
+        """, hotel_id=hotel_id)
+        session.run("""
+            MATCH (h:Hotel)
+            WHERE $hotel_id IS NULL OR h.hotel_id = $hotel_id
+            CALL {
+                WITH h
+                MATCH (r:Review)
+                WHERE r.hotel_id = h.hotel_id
+                WITH r ORDER BY r.date DESC, r.review_id DESC
+                LIMIT 1
+                RETURN collect(r) AS latest
+            }
+            CALL {
+                WITH h
+                MATCH (r:Review)
+                WHERE r.hotel_id = h.hotel_id AND r.score_overall IS NOT NULL
+                WITH r ORDER BY abs(r.score_overall - h.average_reviews_score), r.date DESC, r.review_id DESC
+                LIMIT $n
+                RETURN collect(r) AS representative
+            }
+            WITH h, (latest + [r IN representative WHERE NOT r IN latest])[0..$n] AS featured
+            UNWIND range(0, size(featured) - 1) AS i
+            WITH h, featured[i] AS r, i
+            CREATE (h)-[:FEATURED_REVIEW {rank: i, kind: CASE WHEN i = 0 THEN "latest" ELSE "representative" END}]->(r)
+        """, hotel_id=hotel_id, n=FEATURED_REVIEWS)
+
+def build_leaderboards(driver):
+    """
+    Materializes one (:Leaderboard) node per scope (global, each city, each
+    country) and category, holding hotel_ids / scores ordered best-first
+    (score DESC, hotel_id ASC). Top/bottom-k queries then read k list entries
+    instead of sorting every hotel in scope.
+    """
+    with driver.session() as session:
+        for category, prop in LEADERBOARD_FIELDS.items():
+            session.run("""
+                MATCH (h:Hotel)-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+                WHERE h[$prop] IS NOT NULL
+                WITH h, c, co
+                ORDER BY h[$prop] DESC, h.hotel_id ASC
+                UNWIND [["global", "all"], ["city", c.name], ["country", co.name]] AS scope
+                WITH scope, collect(h.hotel_id) AS ids, collect(h[$prop]) AS scores
+                MERGE (l:Leaderboard {key: scope[0] + ":" + scope[1] + ":" + $category})
+                SET l.scope_type = scope[0],
+                    l.scope = scope[1],
+                    l.category = $category,
+                    l.hotel_ids = ids,
+                    l.scores = scores
+            """, prop=prop, category=category)
+
+def _rerank(hotel_ids, scores, hotel_id, score):
+    """Move hotel_id to its new position in a best-first leaderboard (drop it if score is None)."""
+    entries = [(-s, hid) for hid, s in zip(hotel_ids or [], scores or []) if hid != hotel_id]
+    if score is not None:
+        bisect.insort(entries, (-score, hotel_id))
+    return [hid for _, hid in entries], [-s for s, _ in entries]
+
+def update_leaderboards_for_hotel(driver, hotel_id):
+    """
+    Incremental refresh after one hotel's aggregates changed: re-positions the
+    hotel inside its global, city and country leaderboards for every category.
+    No other leaderboard is touched and nothing is re-sorted from scratch.
+    """
+    with driver.session() as session:
+        record = session.run("""
+            MATCH (h:Hotel {hotel_id: $hotel_id})-[:LOCATED_IN]->(c:City)-[:LOCATED_IN]->(co:Country)
+            RETURN properties(h) AS props, c.name AS city, co.name AS country
+        """, hotel_id=hotel_id).single()
+        if record is None:
+            return
+        scopes = [("global", "all"), ("city", record["city"]), ("country", record["country"])]
+        for category, prop in LEADERBOARD_FIELDS.items():
+            score = record["props"].get(prop)
+            for scope_type, scope in scopes:
+                key = f"{scope_type}:{scope}:{category}"
+                board = session.run(
+                    "MATCH (l:Leaderboard {key: $key}) RETURN l.hotel_ids AS ids, l.scores AS scores", key=key
+                ).single()
+                ids, scores = _rerank(board["ids"] if board else [], board["scores"] if board else [], hotel_id, score)
+                session.run("""
+                    MERGE (l:Leaderboard {key: $key})
+                    SET l.scope_type = $scope_type, l.scope = $scope, l.category = $category,
+                        l.hotel_ids = $ids, l.scores = $scores
+                """, key=key, scope_type=scope_type, scope=scope, category=category, ids=ids, scores=scores)
+
+def refresh_hotel_scores(driver, hotel_id):
+    """
+    Recomputes one hotel's overall and per-category averages (e.g. after new
+    reviews were loaded for it) and updates the affected leaderboards,
+    segment cube cells and featured reviews in place.
+    """
+    with driver.session() as session:
+        session.run("""
+            MATCH (h:Hotel {hotel_id: $hotel_id})<-[:REVIEWED]-(r:Review)
+            WITH h,
+                 avg(r.score_overall) AS overall,
+                 avg(r.score_cleanliness) AS cleanliness,
+                 avg(r.score_comfort) AS comfort,
+                 avg(r.score_facilities) AS facilities,
+                 avg(r.score_staff) AS staff,
+                 avg(r.score_value_for_money) AS money
+            SET h.average_reviews_score = overall,
+                h.avg_score_cleanliness = cleanliness,
+                h.avg_score_comfort = comfort,
+                h.avg_score_facilities = facilities,
+                h.avg_score_staff = staff,
+                h.avg_score_value_for_money = money
+        """, hotel_id=hotel_id)
+    update_leaderboards_for_hotel(driver, hotel_id)
+    build_segment_cube(driver, hotel_id=hotel_id)
+    build_featured_reviews(driver, hotel_id=hotel_id)
+
 def load_visa(driver):
     visas = pd.read_csv("Knowledge_Graph_DB/visa.csv")
 
@@ -139,10 +409,14 @@ def load_visa(driver):
 
             session.run("""
                 MERGE (fromC:Country {name: $from})
+                SET fromC.name_key = $from_key
                 MERGE (toC:Country {name: $to})
+                SET toC.name_key = $to_key
             """, parameters={
                 "from": row["from"],
-                "to": row["to"]
+                "to": row["to"],
+                "from_key": name_key(row["from"]),
+                "to_key": name_key(row["to"])
             })
 
             if row["requires_visa"] == "Yes":
@@ -158,6 +432,30 @@ def load_visa(driver):
                 })
 
 
+def load_aliases(driver):
+    """
+    (:Alias {key, kind, alias})-[:ALIAS_OF]->(:Country | :City) for every row of
+    aliases.csv (ISO codes, official names, demonyms, spelling variants), keyed by
+    name_key(alias). Graph_RAG/preprocessing/alias_index.py resolves the same file
+    locally, so extraction and retrieval never fall back to fuzzy matching.
+    """
+    aliases = pd.read_csv("Knowledge_Graph_DB/aliases.csv", keep_default_na=False)
+    with driver.session() as session:
+        for _, row in aliases.iterrows():
+            label = "Country" if row["kind"] == "country" else "City"
+            session.run(f"""
+                MATCH (n:{label} {{name: $canonical}})
+                MERGE (a:Alias {{key: $key, kind: $kind}})
+                SET a.alias = $alias
+                MERGE (a)-[:ALIAS_OF]->(n)
+            """, parameters={
+                "canonical": row["canonical"],
+                "key": name_key(row["alias"]),
+                "kind": row["kind"],
+                "alias": row["alias"]
+            })
+
+
 def main():
     config = read_config("Knowledge_Graph_DB/config.txt")
     driver = GraphDatabase.driver(
@@ -172,7 +470,13 @@ def main():
     load_reviews(driver)
     compute_average_review_scores(driver)
     compute_average_score_by_traveller_type(driver)
+    compute_average_category_scores(driver)
+    create_score_indexes(driver)
+    build_leaderboards(driver)
+    build_segment_cube(driver)
+    build_featured_reviews(driver)
     load_visa(driver)
+    load_aliases(driver)
 
     driver.close()
     print("Knowledge Graph creation complete!")